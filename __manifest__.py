@@ -1,6 +1,6 @@
 {
     'name': 'Hospital Management',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.5.0',
     'category': 'Healthcare',
     'summary': 'Complete Hospital Management System with Analytics Dashboard',
     'description': """
@@ -23,6 +23,9 @@
     'author': 'Mohamed Kandil',
     'website': 'https://github.com/MohamedKandil14/hospital_management',
     'depends': ['base', 'web', 'calendar', 'mail'],
+    'external_dependencies': {
+        'python': ['numpy'],
+    },
     'data': [
         # Security
         'security/ir.model.access.csv',
@@ -31,11 +34,13 @@
         'data/sequence.xml',
         'data/email_templates.xml',
         'data/scheduled_actions.xml',
+        'data/drug_interaction_data.xml',
         
         # Reports
         'reports/report_template.xml',
         'reports/patient_report.xml',
         'reports/doctor_report.xml',
+        'reports/prescription_report.xml',
         
         # Views - IMPORTANT: patient_views.xml must be first (contains root menu)
         'views/patient_views.xml',  # Root menu is here
@@ -43,9 +48,18 @@
         'views/appointment_views.xml',
         'views/medical_record_views.xml',
         'views/billing_views.xml',
+        'views/billing_payment_views.xml',
+        'views/billing_aging_report_views.xml',
         'views/prescription_views.xml',
+        'views/medicine_demand_views.xml',
         'views/lab_test_views.xml',
+        'views/lab_order_wizard_views.xml',
+        'views/lab_result_import_views.xml',
+        'views/lab_escalation_views.xml',
+        'views/lab_turnaround_views.xml',
         'views/dashboard_views.xml',
+        'views/audit_log_views.xml',
+        'views/data_export_views.xml',
     ],
     'assets': {
         'web.assets_backend': [
@@ -53,6 +67,12 @@
             'hospital_management/static/src/css/style.css',
             'hospital_management/static/src/css/custom_theme.css',
             
+            # Widgets
+            'hospital_management/static/src/js/lab_trend_sparkline.js',
+            'hospital_management/static/src/xml/lab_trend_sparkline.xml',
+            'hospital_management/static/src/js/vitals_chart.js',
+            'hospital_management/static/src/xml/vitals_chart.xml',
+            
             # SCSS Files (optional - will be compiled to CSS)
             # 'hospital_management/static/src/scss/custom_theme.scss',
         ],
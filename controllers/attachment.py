@@ -0,0 +1,67 @@
+import json
+import logging
+
+from werkzeug.exceptions import NotFound
+
+from odoo import http
+from odoo.exceptions import AccessError
+from odoo.http import request
+from odoo.addons.web.controllers.binary import Binary
+
+from ..models.ir_attachment import HOSPITAL_ATTACHMENT_MODELS
+
+_logger = logging.getLogger(__name__)
+
+
+class HospitalBinary(Binary):
+    """Streamed uploads of hospital attachments"""
+    
+    @http.route()
+    def upload_attachment(self, model, id, ufile, callback=None):
+        """Stream files uploaded to medical records and lab tests.
+        
+        The ``many2many_binary`` widgets post here; hospital uploads are
+        read from the request's spooled stream in chunks instead of being
+        loaded in memory. The response is the one of the standard route.
+        """
+        if model not in HOSPITAL_ATTACHMENT_MODELS or callback:
+            return super().upload_attachment(model, id, ufile, callback=callback)
+        
+        Attachment = request.env['ir.attachment']
+        result = []
+        for upload in request.httprequest.files.getlist('ufile'):
+            try:
+                attachment = Attachment._create_from_file(upload.stream, {
+                    'name': upload.filename,
+                    'res_model': model,
+                    'res_id': int(id),
+                })
+                attachment._post_add_create()
+            except AccessError:
+                result.append({'error': 'You are not allowed to upload an attachment here.'})
+            except Exception:
+                _logger.exception("Failed to upload attachment %s", upload.filename)
+                result.append({'error': 'The file could not be uploaded.'})
+            else:
+                result.append({
+                    'id': attachment.id,
+                    'filename': attachment.name,
+                    'mimetype': attachment.mimetype,
+                    'size': attachment.file_size,
+                })
+        return json.dumps(result)
+
+
+class HospitalAttachmentController(http.Controller):
+    """Cached thumbnails of hospital attachments"""
+    
+    @http.route('/hospital_management/attachment/<int:attachment_id>/thumbnail', type='http', auth='user')
+    def thumbnail(self, attachment_id, **kwargs):
+        """Serve the cached thumbnail of an image attachment"""
+        attachment = request.env['ir.binary']._find_record(res_model='ir.attachment', res_id=attachment_id)
+        thumbnail = attachment._get_thumbnail()
+        if not thumbnail:
+            raise NotFound()
+        stream = request.env['ir.binary']._get_stream_from(thumbnail.sudo())
+        stream.max_age = http.STATIC_CACHE
+        return stream.get_response()
@@ -0,0 +1,47 @@
+from odoo import http, fields, api
+from odoo.http import request, content_disposition
+
+
+class HospitalExportController(http.Controller):
+    """Streaming download of hospital data exports"""
+    
+    # Bytes read per chunk when streaming a temporary XLSX file
+    _FILE_CHUNK_SIZE = 256 * 1024
+    
+    @http.route('/hospital_management/export/<string:dataset>', type='http', auth='user')
+    def export(self, dataset, file_format='csv', date_from=None, date_to=None, **kwargs):
+        """Stream an export to the client while it is being produced"""
+        Export = request.env['hospital.data.export']
+        definition = Export._get_dataset(dataset)
+        request.env[definition['model']].check_access('read')
+        if file_format not in ('csv', 'xlsx'):
+            file_format = 'csv'
+        domain = Export._get_domain(
+            dataset,
+            fields.Date.to_date(date_from) if date_from else None,
+            fields.Date.to_date(date_to) if date_to else None,
+        )
+        
+        body = self._stream_export(
+            request.env.registry, request.env.uid, dict(request.env.context),
+            dataset, file_format, domain,
+        )
+        return request.make_response(body, headers=[
+            ('Content-Type', Export._get_mimetype(file_format)),
+            ('Content-Disposition', content_disposition(Export._get_filename(dataset, file_format))),
+        ])
+    
+    def _stream_export(self, registry, uid, context, dataset, file_format, domain):
+        """Generate the response body.
+        
+        The body is consumed after the request cursor is closed, so rows
+        are read on a dedicated cursor for the lifetime of the download.
+        """
+        with registry.cursor() as cr:
+            Export = api.Environment(cr, uid, context)['hospital.data.export']
+            if file_format == 'xlsx':
+                # The XLSX container is a zip archive: build it on disk first
+                with Export._export_to_file(dataset, file_format, domain) as fileobj:
+                    yield from iter(lambda: fileobj.read(self._FILE_CHUNK_SIZE), b'')
+            else:
+                yield from Export._iter_csv_chunks(dataset, domain)
@@ -0,0 +1,9 @@
+def migrate(cr, version):
+    """Merge the duplicate 'pediatric' specialty into 'pediatrics'"""
+    if not version:
+        return
+    cr.execute("""
+        UPDATE hospital_doctor
+           SET specialty = 'pediatrics'
+         WHERE specialty = 'pediatric'
+    """)
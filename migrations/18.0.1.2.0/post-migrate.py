@@ -0,0 +1,9 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Backfill the now stored and computed lab test result status"""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {'tracking_disable': True})
+    env['hospital.lab.test'].backfill_result_status()
@@ -0,0 +1,43 @@
+from odoo.addons.hospital_management.models.lab_range import parse_value
+from odoo.tools import split_every
+
+
+def migrate(cr, version):
+    """Store the numeric value of historical result lines in SQL.
+    
+    Creating the columns beforehand keeps the ORM from running the
+    result flags compute on every historical line, which would also
+    reset flags technicians set by hand.
+    """
+    if not version:
+        return
+    cr.execute("""
+        ALTER TABLE hospital_lab_test_line
+            ADD COLUMN IF NOT EXISTS is_numeric bool,
+            ADD COLUMN IF NOT EXISTS result_numeric float8
+    """)
+    cr.execute("""
+        SELECT id, result_value
+          FROM hospital_lab_test_line
+         WHERE result_value IS NOT NULL
+    """)
+    parsed = {}
+    for line_id, text in cr.fetchall():
+        value = parse_value(text)
+        if value is not None:
+            parsed[line_id] = value
+    for batch in split_every(10000, parsed.items()):
+        line_ids, values = zip(*batch)
+        cr.execute("""
+            UPDATE hospital_lab_test_line l
+               SET is_numeric = true,
+                   result_numeric = t.value
+              FROM unnest(%s::int[], %s::float8[]) AS t(id, value)
+             WHERE l.id = t.id
+        """, [list(line_ids), list(values)])
+    cr.execute("""
+        UPDATE hospital_lab_test_line
+           SET is_numeric = false,
+               result_numeric = 0
+         WHERE is_numeric IS NULL
+    """)
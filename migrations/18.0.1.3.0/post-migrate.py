@@ -0,0 +1,13 @@
+def migrate(cr, version):
+    """Link existing result lines to their parameter definitions by name"""
+    if not version:
+        return
+    cr.execute("""
+        UPDATE hospital_lab_test_line l
+           SET parameter_id = p.id
+          FROM hospital_lab_test t, hospital_lab_test_parameter p
+         WHERE t.id = l.test_id
+           AND p.test_type_id = t.test_type
+           AND LOWER(p.name) = LOWER(l.parameter_name)
+           AND l.parameter_id IS NULL
+    """)
@@ -0,0 +1,9 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Map free-text prescription medicines onto the medicine catalog"""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {'tracking_disable': True})
+    env['hospital.medicine']._match_prescription_lines()
@@ -0,0 +1,15 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Drop report PDFs cached as record attachments.
+    
+    Cached PDFs now live in hospital.report.cache, away from the chatter.
+    """
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['ir.attachment'].search([
+        ('res_model', 'in', ['hospital.patient', 'hospital.doctor', 'hospital.prescription']),
+        ('description', '=like', 'hospital_management.report_%@%'),
+    ]).unlink()
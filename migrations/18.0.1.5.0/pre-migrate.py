@@ -0,0 +1,29 @@
+def migrate(cr, version):
+    """Backfill numeric vital signs of medical records in SQL.
+    
+    Creating the columns beforehand keeps the ORM from recomputing the
+    new stored fields record by record during the upgrade.
+    """
+    if not version:
+        return
+    cr.execute("""
+        ALTER TABLE hospital_medical_record
+            ADD COLUMN IF NOT EXISTS systolic_bp int4,
+            ADD COLUMN IF NOT EXISTS diastolic_bp int4,
+            ADD COLUMN IF NOT EXISTS bmi numeric
+    """)
+    cr.execute(r"""
+        UPDATE hospital_medical_record r
+           SET systolic_bp = COALESCE(bp.reading[1]::int4, 0),
+               diastolic_bp = COALESCE(bp.reading[2]::int4, 0),
+               bmi = CASE
+                   WHEN r.weight > 0 AND r.height > 0
+                   THEN round((r.weight / ((r.height / 100.0) ^ 2))::numeric, 1)
+                   ELSE 0
+               END
+          FROM (
+                SELECT id, regexp_match(blood_pressure, '^\s*(\d{2,3})\s*/\s*(\d{2,3})') AS reading
+                  FROM hospital_medical_record
+               ) bp
+         WHERE bp.id = r.id
+    """)
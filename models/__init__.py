@@ -1,8 +1,23 @@
+from . import audit_log
+from . import ir_attachment
+from . import ir_sequence
+from . import mail_activity
 from . import patient
 from . import doctor
+from . import doctor_assignment
 from . import appointment
 from . import medical_record 
+from . import clinical_search
 from . import billing
+from . import billing_payment
+from . import billing_aging_report
+from . import medicine
 from . import prescription 
+from . import drug_interaction
+from . import medicine_demand
 from . import lab_test
-from . import dashboard
\ No newline at end of file
+from . import lab_result_import
+from . import lab_escalation
+from . import lab_turnaround
+from . import dashboard
+from . import data_export
\ No newline at end of file
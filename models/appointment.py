@@ -8,10 +8,13 @@ class HospitalAppointment(models.Model):
     
     _name = 'hospital.appointment'
     _description = 'Hospital Appointment'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['hospital.audit.mixin', 'mail.thread', 'mail.activity.mixin']
     _rec_name = 'reference'
     _order = 'appointment_date desc, appointment_time'
     
+    # Bookable hours (24-hour floats), as enforced by _check_appointment_time
+    _WORKING_HOURS = (8.0, 20.0)
+    
     # Basic Fields
     reference = fields.Char(
         string='Reference',
@@ -287,7 +290,25 @@ class HospitalAppointment(models.Model):
                 vals['reference'] = self.env['ir.sequence'].next_by_code(
                     'hospital.appointment'
                 ) or 'New'
-        return super().create(vals_list)
+        records = super().create(vals_list)
+        self.env['hospital.doctor.assignment']._notify_appointments(records)
+        return records
+    
+    def write(self, vals):
+        """Keep the doctor assignment queues in sync with appointment load"""
+        if not {'doctor_id', 'state', 'appointment_date', 'active'} & set(vals):
+            return super().write(vals)
+        
+        Assignment = self.env['hospital.doctor.assignment']
+        Assignment._notify_appointments(self, delta=-1)
+        result = super().write(vals)
+        Assignment._notify_appointments(self)
+        return result
+    
+    def unlink(self):
+        """Release appointment load from the doctor assignment queues"""
+        self.env['hospital.doctor.assignment']._notify_appointments(self, delta=-1)
+        return super().unlink()
     
     # ==========================================
     # Action Methods
@@ -346,6 +367,55 @@ class HospitalAppointment(models.Model):
             record.state = 'draft'
             record.message_post(body='Reset to draft.')
     
+    # ==========================================
+    # Free Slot Lookup
+    # ==========================================
+    
+    @api.model
+    def _find_free_slots(self, requests, duration=1.0, search_days=7):
+        """Find the first free slot of each (doctor_id, earliest date) request.
+        
+        Existing appointments of all requested doctors over the search
+        window are read in one query. Slots handed out are booked in
+        memory, so requests for the same doctor never get the same slot.
+        Returns a list of (date, time) pairs, or None where the doctor
+        has no free slot within ``search_days``.
+        """
+        if not requests:
+            return []
+        first_day = min(date for _doctor_id, date in requests)
+        last_day = max(date for _doctor_id, date in requests) + timedelta(days=search_days)
+        busy = {}
+        for appointment in self.search_read([
+            ('doctor_id', 'in', list({doctor_id for doctor_id, _date in requests})),
+            ('appointment_date', '>=', first_day),
+            ('appointment_date', '<=', last_day),
+            ('state', 'not in', ['cancelled', 'no_show']),
+        ], ['doctor_id', 'appointment_date', 'appointment_time', 'duration']):
+            key = (appointment['doctor_id'][0], appointment['appointment_date'])
+            start = appointment['appointment_time']
+            busy.setdefault(key, []).append((start, start + (appointment['duration'] or duration)))
+        
+        opening, closing = self._WORKING_HOURS
+        slots = []
+        for doctor_id, earliest in requests:
+            found = None
+            for offset in range(search_days + 1):
+                day = earliest + timedelta(days=offset)
+                intervals = busy.setdefault((doctor_id, day), [])
+                start = opening
+                while start + duration <= closing:
+                    end = start + duration
+                    if all(end <= busy_start or start >= busy_end for busy_start, busy_end in intervals):
+                        found = (day, start)
+                        intervals.append((start, end))
+                        break
+                    start += duration
+                if found:
+                    break
+            slots.append(found)
+        return slots
+    
     # ==========================================
     # Email Notification Methods
     # ==========================================
@@ -0,0 +1,290 @@
+import json
+
+from odoo import models, fields, api, tools
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import create_index, split_every, SQL
+from odoo.tools.misc import json_default
+
+# Precommit data key holding the entries queued by the current transaction
+_QUEUE_KEY = 'hospital.audit.log'
+
+
+class HospitalAuditLog(models.Model):
+    """Append-only log of changes, one entry per batch operation.
+    
+    Entries are queued in memory during the transaction and inserted in
+    bulk right before commit, so a write on many records costs a single
+    row and a rolled back transaction leaves no trace.
+    """
+    
+    _name = 'hospital.audit.log'
+    _description = 'Audit Log'
+    _order = 'date desc, id desc'
+    _log_access = False
+    
+    # Entries inserted per statement when the queue is flushed
+    _INSERT_BATCH_SIZE = 1000
+    
+    date = fields.Datetime(
+        string='Date',
+        required=True,
+        readonly=True,
+        index=True
+    )
+    
+    user_id = fields.Many2one(
+        comodel_name='res.users',
+        string='User',
+        readonly=True,
+        ondelete='set null'
+    )
+    
+    res_model = fields.Char(
+        string='Model',
+        required=True,
+        readonly=True,
+        index=True
+    )
+    
+    operation = fields.Selection(
+        selection=[
+            ('create', 'Created'),
+            ('write', 'Updated'),
+            ('unlink', 'Deleted'),
+        ],
+        string='Operation',
+        required=True,
+        readonly=True
+    )
+    
+    record_count = fields.Integer(
+        string='Records',
+        readonly=True
+    )
+    
+    changes = fields.Json(
+        string='Changes',
+        readonly=True,
+        help='{field: {"new": value, "old": {record id: value}}} for the records that changed'
+    )
+    
+    changed_fields = fields.Char(
+        string='Changed Fields',
+        compute='_compute_changes_display'
+    )
+    
+    changes_display = fields.Text(
+        string='Details',
+        compute='_compute_changes_display'
+    )
+    
+    # Record filter (the int[] res_ids column itself is managed in init)
+    res_id = fields.Integer(
+        string='Record ID',
+        compute='_compute_res_id',
+        search='_search_res_id'
+    )
+    
+    def init(self):
+        """Maintain the res_ids array column and its GIN index"""
+        self.env.cr.execute(SQL(
+            "ALTER TABLE %s ADD COLUMN IF NOT EXISTS res_ids int4[] NOT NULL DEFAULT '{}'",
+            SQL.identifier(self._table),
+        ))
+        create_index(
+            self.env.cr,
+            'hospital_audit_log_res_ids_idx',
+            self._table,
+            ['res_ids'],
+            method='gin',
+        )
+    
+    @api.depends('changes', 'res_model')
+    def _compute_changes_display(self):
+        """Summarize changed fields and pretty-print the JSON diff"""
+        for entry in self:
+            Model = self.env.get(entry.res_model)
+            names = list(entry.changes or {})
+            if Model is not None:
+                names = [Model._fields[name].string if name in Model._fields else name for name in names]
+            entry.changed_fields = ', '.join(names)
+            entry.changes_display = json.dumps(entry.changes, indent=2, ensure_ascii=False) if entry.changes else False
+    
+    def _compute_res_id(self):
+        """Search-only field"""
+        self.res_id = False
+    
+    def _search_res_id(self, operator, value):
+        """Filter entries touching the given record ids through the GIN index"""
+        if operator == '=' and isinstance(value, int):
+            value = [value]
+        elif operator != 'in' or not isinstance(value, (list, tuple)):
+            raise ValidationError('Audit log entries can only be filtered by record IDs.')
+        query = self._search([])
+        query.add_where(SQL(
+            "%s && %s::int4[]",
+            SQL.identifier(self._table, 'res_ids'),
+            [int(res_id) for res_id in value],
+        ))
+        return [('id', 'in', query)]
+    
+    # ==========================================
+    # Queue
+    # ==========================================
+    
+    @api.model
+    @tools.ormcache()
+    def _get_audited_models(self):
+        """Models logged here instead of chatter tracking.
+        
+        Comma-separated model names in ``hospital_management.audit_log_models``.
+        """
+        param = self.env['ir.config_parameter'].sudo().get_param(
+            'hospital_management.audit_log_models', ''
+        )
+        return frozenset(name.strip() for name in param.split(',') if name.strip())
+    
+    @api.model
+    def _enqueue(self, res_model, operation, res_ids, changes=None):
+        """Queue an entry, inserted with the others before commit"""
+        if not res_ids:
+            return
+        queue = self.env.cr.precommit.data.get(_QUEUE_KEY)
+        if queue is None:
+            queue = self.env.cr.precommit.data[_QUEUE_KEY] = []
+            self.env.cr.precommit.add(self._flush_queue)
+        queue.append((
+            fields.Datetime.now(),
+            self.env.uid,
+            res_model,
+            operation,
+            list(res_ids),
+            len(res_ids),
+            json.dumps(changes, default=json_default) if changes else None,
+        ))
+    
+    @api.model
+    def _flush_queue(self):
+        """Insert the queued entries with one statement per batch"""
+        queue = self.env.cr.precommit.data.pop(_QUEUE_KEY, [])
+        for batch in split_every(self._INSERT_BATCH_SIZE, queue):
+            self.env.cr.execute(SQL(
+                """
+                INSERT INTO hospital_audit_log
+                            (date, user_id, res_model, operation, res_ids, record_count, changes)
+                     VALUES %s
+                """,
+                SQL(", ").join(
+                    SQL("(%s, %s, %s, %s, %s::int4[], %s, %s::jsonb)", *entry)
+                    for entry in batch
+                ),
+            ))
+    
+    # ==========================================
+    # CRUD Override
+    # ==========================================
+    
+    def write(self, vals):
+        """Audit entries are append-only"""
+        raise UserError('Audit log entries cannot be modified.')
+    
+    def unlink(self):
+        """Audit entries are append-only"""
+        raise UserError('Audit log entries cannot be deleted.')
+
+
+class HospitalAuditMixin(models.AbstractModel):
+    """Log changes to the audit log instead of chatter tracking.
+    
+    Enabled per model through ``hospital_management.audit_log_models``;
+    while enabled, tracked fields no longer produce chatter messages.
+    """
+    
+    _name = 'hospital.audit.mixin'
+    _description = 'Hospital Audit Log Mixin'
+    
+    audit_log_enabled = fields.Boolean(
+        string='Audit Log Enabled',
+        compute='_compute_audit_log_enabled'
+    )
+    
+    def _compute_audit_log_enabled(self):
+        """Show the audit log button when the model is audited"""
+        self.audit_log_enabled = self._audit_log_enabled()
+    
+    @api.model
+    def _audit_log_enabled(self):
+        """Whether changes of this model go to the audit log"""
+        return self._name in self.env['hospital.audit.log']._get_audited_models()
+    
+    def _get_audit_fields(self, vals):
+        """Stored fields of the values worth logging"""
+        return [
+            name for name in vals
+            if name in self._fields
+            and self._fields[name].store
+            and self._fields[name].type != 'binary'
+            and name not in models.LOG_ACCESS_COLUMNS
+        ]
+    
+    def _read_audit_values(self, field_names):
+        """Return {record id: {field: raw value}}"""
+        return {values['id']: values for values in self.read(field_names, load=None)}
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Log created records without the chatter creation message"""
+        if not self._audit_log_enabled():
+            return super().create(vals_list)
+        records = super(
+            HospitalAuditMixin, self.with_context(mail_notrack=True, mail_create_nolog=True)
+        ).create(vals_list)
+        self.env['hospital.audit.log']._enqueue(self._name, 'create', records.ids)
+        return records.with_env(self.env)
+    
+    def write(self, vals):
+        """Log the fields that actually changed, one entry for the batch"""
+        field_names = self._get_audit_fields(vals) if self and self._audit_log_enabled() else []
+        if not field_names:
+            return super().write(vals)
+        
+        before = self._read_audit_values(field_names)
+        result = super(HospitalAuditMixin, self.with_context(mail_notrack=True)).write(vals)
+        after = self._read_audit_values(field_names)
+        changes = {}
+        changed_ids = set()
+        for name in field_names:
+            old = {
+                res_id: before[res_id][name]
+                for res_id in self.ids
+                if before[res_id][name] != after[res_id][name]
+            }
+            if old:
+                changes[name] = {'new': after[next(iter(old))][name], 'old': old}
+                changed_ids.update(old)
+        if changes:
+            self.env['hospital.audit.log']._enqueue(
+                self._name, 'write', sorted(changed_ids), changes
+            )
+        return result
+    
+    def unlink(self):
+        """Log deleted records with their last display name"""
+        if self._audit_log_enabled():
+            self.env['hospital.audit.log']._enqueue(
+                self._name, 'unlink', self.ids,
+                {'display_name': {'new': None, 'old': {record.id: record.display_name for record in self}}},
+            )
+        return super().unlink()
+    
+    def action_view_audit_log(self):
+        """Open the audit log entries of this record"""
+        self.ensure_one()
+        return {
+            'name': f'Audit Log: {self.display_name}',
+            'type': 'ir.actions.act_window',
+            'res_model': 'hospital.audit.log',
+            'view_mode': 'list,form',
+            'domain': [('res_model', '=', self._name), ('res_id', '=', self.id)],
+            'target': 'current',
+        }
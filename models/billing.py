@@ -1,5 +1,6 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.tools import float_compare, float_round, split_every
 
 
 class HospitalBilling(models.Model):
@@ -38,7 +39,8 @@ class HospitalBilling(models.Model):
     appointment_id = fields.Many2one(
         comodel_name='hospital.appointment',
         string='Related Appointment',
-        ondelete='set null'
+        ondelete='set null',
+        index=True
     )
     
     medical_record_id = fields.Many2one(
@@ -68,6 +70,12 @@ class HospitalBilling(models.Model):
         copy=True
     )
     
+    payment_ids = fields.One2many(
+        comodel_name='hospital.billing.payment',
+        inverse_name='billing_id',
+        string='Payments'
+    )
+    
     # Amounts
     subtotal = fields.Float(
         string='Subtotal',
@@ -109,12 +117,14 @@ class HospitalBilling(models.Model):
     paid_amount = fields.Float(
         string='Paid Amount',
         default=0.0,
-        tracking=True
+        readonly=True,
+        tracking=True,
+        help='Sum of the registered payments'
     )
     
     balance_amount = fields.Float(
         string='Balance',
-        compute='_compute_amounts',
+        compute='_compute_balance',
         store=True
     )
     
@@ -189,12 +199,16 @@ class HospitalBilling(models.Model):
     # Computed Fields
     # ==========================================
     
-    @api.depends('line_ids.subtotal', 'discount_percent', 'tax_percent', 'paid_amount')
+    @api.depends('line_ids.subtotal', 'discount_percent', 'tax_percent')
     def _compute_amounts(self):
-        """Compute all amounts"""
+        """Compute line-derived amounts (subtotal, discount, tax, total)"""
+        subtotals = self._get_line_subtotals()
         for record in self:
             # Subtotal from lines
-            subtotal = sum(line.subtotal for line in record.line_ids)
+            if record.id in subtotals:
+                subtotal = subtotals[record.id]
+            else:
+                subtotal = sum(line.subtotal for line in record.line_ids)
             record.subtotal = subtotal
             
             # Discount
@@ -209,21 +223,54 @@ class HospitalBilling(models.Model):
             record.tax_amount = tax
             
             # Total
-            total = amount_after_discount + tax
-            record.total_amount = total
-            
-            # Balance
-            record.balance_amount = total - record.paid_amount
+            record.total_amount = amount_after_discount + tax
+    
+    def _get_line_subtotals(self):
+        """Sum line subtotals of saved invoices with one grouped query.
+        
+        Records being edited in a form (new ids) are left out and summed
+        from their cached lines instead.
+        """
+        saved_ids = [record.id for record in self if isinstance(record.id, int)]
+        if not saved_ids:
+            return {}
+        subtotals = dict.fromkeys(saved_ids, 0.0)
+        groups = self.env['hospital.billing.line']._read_group(
+            [('billing_id', 'in', saved_ids)],
+            ['billing_id'],
+            ['subtotal:sum'],
+        )
+        for billing, subtotal in groups:
+            subtotals[billing.id] = subtotal
+        return subtotals
+    
+    @api.model
+    def _get_rounding(self):
+        """Rounding of billed amounts, the one of the company currency"""
+        return self.env.company.currency_id.rounding
+    
+    def _compare_amounts(self, amount1, amount2):
+        """float_compare of two amounts at the currency rounding"""
+        return float_compare(amount1, amount2, precision_rounding=self._get_rounding())
+    
+    @api.depends('total_amount', 'paid_amount')
+    def _compute_balance(self):
+        """Compute payment-derived balance without touching the lines"""
+        rounding = self._get_rounding()
+        for record in self:
+            record.balance_amount = float_round(
+                record.total_amount - record.paid_amount, precision_rounding=rounding
+            )
     
     @api.depends('total_amount', 'paid_amount')
     def _compute_payment_status(self):
         """Compute payment status based on paid amount"""
         for record in self:
-            if record.total_amount <= 0:
+            if record._compare_amounts(record.total_amount, 0.0) <= 0:
                 record.payment_status = 'unpaid'
-            elif record.paid_amount <= 0:
+            elif record._compare_amounts(record.paid_amount, 0.0) <= 0:
                 record.payment_status = 'unpaid'
-            elif record.paid_amount >= record.total_amount:
+            elif record._compare_amounts(record.paid_amount, record.total_amount) >= 0:
                 record.payment_status = 'paid'
             else:
                 record.payment_status = 'partial'
@@ -247,19 +294,27 @@ class HospitalBilling(models.Model):
             
             # Add consultation fee as first line
             if not self.line_ids and self.doctor_id.consultation_fee > 0:
-                self.line_ids = [(0, 0, {
-                    'service_type': 'consultation',
-                    'description': 'Medical Consultation',
-                    'quantity': 1,
-                    'unit_price': self.doctor_id.consultation_fee,
-                })]
-    
-    @api.onchange('paid_amount')
-    def _onchange_paid_amount(self):
-        """Auto-update state when fully paid"""
-        if self.paid_amount >= self.total_amount and self.total_amount > 0:
-            if self.state == 'confirmed':
-                self.state = 'paid'
+                self.line_ids = [(0, 0, self._prepare_consultation_line(self.doctor_id))]
+    
+    @api.model
+    def _prepare_consultation_line(self, doctor):
+        """Values of the consultation fee line for a doctor"""
+        return {
+            'service_type': 'consultation',
+            'description': 'Medical Consultation',
+            'quantity': 1,
+            'unit_price': doctor.consultation_fee,
+        }
+    
+    @api.model
+    def _prepare_lab_test_line(self, lab_test):
+        """Values of the billing line for a lab test"""
+        return {
+            'service_type': 'lab_test',
+            'description': lab_test.test_type.name,
+            'quantity': 1,
+            'unit_price': lab_test.test_type.cost,
+        }
     
     # ==========================================
     # Constraints
@@ -269,7 +324,7 @@ class HospitalBilling(models.Model):
     def _check_paid_amount(self):
         """Ensure paid amount doesn't exceed total"""
         for record in self:
-            if record.paid_amount > record.total_amount:
+            if record._compare_amounts(record.paid_amount, record.total_amount) > 0:
                 raise ValidationError(
                     'Paid amount cannot exceed total amount!'
                 )
@@ -306,6 +361,102 @@ class HospitalBilling(models.Model):
                 ) or 'New'
         return super().create(vals_list)
     
+    # ==========================================
+    # Batch Recompute
+    # ==========================================
+    
+    @api.model
+    def recompute_amounts(self, billing_ids=None, batch_size=1000):
+        """Recompute line-derived amounts for many invoices in chunks.
+        
+        Line subtotals are marked as modified, so every stored field
+        depending on them (amounts, balance, payment status) is recomputed
+        too. Each chunk gets its subtotals from a single grouped SUM over
+        hospital_billing_line.
+        """
+        if billing_ids is None:
+            billing_ids = self.with_context(active_test=False).search([]).ids
+        for chunk in split_every(batch_size, billing_ids):
+            self.env.invalidate_all()
+            records = self.browse(chunk)
+            records.line_ids.modified(['quantity', 'unit_price'])
+            records.modified(['line_ids'])
+            self.env.flush_all()
+        self.env.invalidate_all()
+        return True
+    
+    # ==========================================
+    # Batch Invoicing
+    # ==========================================
+    
+    @api.model
+    def _get_uninvoiced_appointment_ids(self, limit):
+        """Done appointments without any billing (anti-join)"""
+        self.env['hospital.appointment'].flush_model(['state', 'active'])
+        self.flush_model(['appointment_id'])
+        self.env.cr.execute("""
+            SELECT a.id
+              FROM hospital_appointment a
+             WHERE a.state = 'done'
+               AND a.active
+               AND NOT EXISTS (
+                       SELECT 1
+                         FROM hospital_billing b
+                        WHERE b.appointment_id = a.id
+                   )
+          ORDER BY a.id
+             LIMIT %s
+        """, [limit])
+        return [row[0] for row in self.env.cr.fetchall()]
+    
+    @api.model
+    def _create_invoices_for_appointments(self, appointment_ids):
+        """Create billings with consultation and lab test lines in one create"""
+        appointments = self.env['hospital.appointment'].browse(appointment_ids)
+        lab_tests = self.env['hospital.lab.test'].search([
+            ('appointment_id', 'in', appointment_ids),
+            ('state', '!=', 'cancelled'),
+        ])
+        tests_by_appointment = {}
+        for lab_test in lab_tests:
+            tests_by_appointment.setdefault(lab_test.appointment_id.id, []).append(lab_test)
+        
+        references = self.env['ir.sequence']._next_by_code_multi(
+            'hospital.billing', len(appointments)
+        )
+        vals_list = []
+        for appointment, reference in zip(appointments, references):
+            lines = []
+            if appointment.doctor_id.consultation_fee > 0:
+                lines.append((0, 0, self._prepare_consultation_line(appointment.doctor_id)))
+            for lab_test in tests_by_appointment.get(appointment.id, []):
+                lines.append((0, 0, self._prepare_lab_test_line(lab_test)))
+            vals_list.append({
+                'reference': reference,
+                'patient_id': appointment.patient_id.id,
+                'doctor_id': appointment.doctor_id.id,
+                'appointment_id': appointment.id,
+                'billing_date': appointment.appointment_date,
+                'line_ids': lines,
+            })
+        return self.with_context(
+            tracking_disable=True, mail_create_nolog=True
+        ).create(vals_list)
+    
+    @api.model
+    def _cron_invoice_done_appointments(self, batch_size=500, auto_commit=True):
+        """Bill all done appointments that have no billing yet (Called by Cron)"""
+        count = 0
+        while True:
+            appointment_ids = self._get_uninvoiced_appointment_ids(batch_size)
+            if not appointment_ids:
+                break
+            count += len(self._create_invoices_for_appointments(appointment_ids))
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+        return count
+    
     # ==========================================
     # Action Methods
     # ==========================================
@@ -335,12 +486,16 @@ class HospitalBilling(models.Model):
         }
     
     def action_mark_as_paid(self):
-        """Mark as fully paid"""
-        for record in self:
-            if record.state == 'confirmed':
-                record.paid_amount = record.total_amount
-                record.state = 'paid'
-                record.message_post(body='Marked as fully paid.')
+        """Mark as fully paid by registering the open balance as payments"""
+        to_pay = self.filtered(lambda r: r.state == 'confirmed')
+        self.env['hospital.billing.payment'].create([{
+            'billing_id': record.id,
+            'amount': record.balance_amount,
+            'payment_method': record.payment_method or 'cash',
+        } for record in to_pay if record._compare_amounts(record.balance_amount, 0.0) > 0])
+        for record in to_pay:
+            record.state = 'paid'
+            record.message_post(body='Marked as fully paid.')
     
     def action_cancel(self):
         """Cancel billing"""
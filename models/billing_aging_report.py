@@ -0,0 +1,115 @@
+from odoo import models, fields, api, tools
+
+
+class HospitalBillingAgingReport(models.Model):
+    """Accounts-receivable aging backed by a materialized view"""
+    
+    _name = 'hospital.billing.aging.report'
+    _description = 'Accounts Receivable Aging'
+    _auto = False
+    _rec_name = 'patient_id'
+    _order = 'balance_amount desc'
+    
+    patient_id = fields.Many2one(
+        comodel_name='hospital.patient',
+        string='Patient',
+        readonly=True
+    )
+    
+    doctor_id = fields.Many2one(
+        comodel_name='hospital.doctor',
+        string='Doctor',
+        readonly=True
+    )
+    
+    invoice_count = fields.Integer(
+        string='Open Invoices',
+        readonly=True
+    )
+    
+    oldest_due_date = fields.Date(
+        string='Oldest Due Date',
+        readonly=True,
+        aggregator='min'
+    )
+    
+    bucket_0_30 = fields.Float(
+        string='0-30 Days',
+        readonly=True
+    )
+    
+    bucket_31_60 = fields.Float(
+        string='31-60 Days',
+        readonly=True
+    )
+    
+    bucket_61_90 = fields.Float(
+        string='61-90 Days',
+        readonly=True
+    )
+    
+    bucket_90_plus = fields.Float(
+        string='90+ Days',
+        readonly=True
+    )
+    
+    balance_amount = fields.Float(
+        string='Outstanding',
+        readonly=True
+    )
+    
+    refreshed_at = fields.Datetime(
+        string='Refreshed At',
+        readonly=True,
+        aggregator='max'
+    )
+    
+    def init(self):
+        """Create the materialized view and the unique index needed for
+        concurrent refreshes"""
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE MATERIALIZED VIEW {self._table} AS (
+                SELECT MIN(b.id) AS id,
+                       b.patient_id,
+                       b.doctor_id,
+                       COUNT(*) AS invoice_count,
+                       MIN(COALESCE(b.due_date, b.billing_date)) AS oldest_due_date,
+                       SUM(b.balance_amount) FILTER (WHERE age.days <= 30) AS bucket_0_30,
+                       SUM(b.balance_amount) FILTER (WHERE age.days BETWEEN 31 AND 60) AS bucket_31_60,
+                       SUM(b.balance_amount) FILTER (WHERE age.days BETWEEN 61 AND 90) AS bucket_61_90,
+                       SUM(b.balance_amount) FILTER (WHERE age.days > 90) AS bucket_90_plus,
+                       SUM(b.balance_amount) AS balance_amount,
+                       NOW() AT TIME ZONE 'UTC' AS refreshed_at
+                  FROM hospital_billing b
+                 CROSS JOIN LATERAL (
+                       SELECT CURRENT_DATE - COALESCE(b.due_date, b.billing_date) AS days
+                       ) age
+                 WHERE b.active
+                   AND b.state = 'confirmed'
+                   AND b.balance_amount > 0
+              GROUP BY b.patient_id, b.doctor_id
+            ) WITH DATA
+        """)
+        self.env.cr.execute(
+            f"CREATE UNIQUE INDEX {self._table}_id_uniq ON {self._table} (id)"
+        )
+    
+    @api.model
+    def refresh_view(self):
+        """Refresh the aging figures without blocking readers"""
+        self.env['hospital.billing'].flush_model()
+        self.env.cr.execute(
+            f"REFRESH MATERIALIZED VIEW CONCURRENTLY {self._table}"
+        )
+        self.env.invalidate_all()
+        return True
+    
+    @api.model
+    def action_refresh(self):
+        """Refresh on demand and reload the report"""
+        self.refresh_view()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'reload',
+        }
@@ -0,0 +1,410 @@
+import base64
+import csv
+import io
+import math
+from collections import defaultdict
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import SQL
+
+from .lab_range import parse_number
+
+
+PAYMENT_METHODS = [
+    ('cash', 'Cash'),
+    ('card', 'Credit/Debit Card'),
+    ('bank_transfer', 'Bank Transfer'),
+    ('insurance', 'Insurance'),
+    ('online', 'Online Payment'),
+]
+
+
+class HospitalBillingPayment(models.Model):
+    """Model for payments registered against billings"""
+    
+    _name = 'hospital.billing.payment'
+    _description = 'Hospital Billing Payment'
+    _rec_name = 'billing_id'
+    _order = 'payment_date desc, id desc'
+    
+    billing_id = fields.Many2one(
+        comodel_name='hospital.billing',
+        string='Billing',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    
+    patient_id = fields.Many2one(
+        related='billing_id.patient_id',
+        string='Patient',
+        store=True
+    )
+    
+    batch_id = fields.Many2one(
+        comodel_name='hospital.billing.payment.batch',
+        string='Payment Batch',
+        ondelete='set null',
+        index=True
+    )
+    
+    amount = fields.Float(
+        string='Amount',
+        required=True
+    )
+    
+    payment_date = fields.Date(
+        string='Payment Date',
+        required=True,
+        default=fields.Date.today
+    )
+    
+    payment_method = fields.Selection(
+        selection=PAYMENT_METHODS,
+        string='Payment Method',
+        default='cash'
+    )
+    
+    payer = fields.Char(
+        string='Payer',
+        help='Insurer or corporate payer, if not the patient'
+    )
+    
+    memo = fields.Char(
+        string='Memo'
+    )
+    
+    @api.constrains('amount')
+    def _check_amount(self):
+        """Ensure payment amount is positive"""
+        for payment in self:
+            if not math.isfinite(payment.amount) or payment.amount <= 0:
+                raise ValidationError('Payment amount must be greater than zero!')
+    
+    # ==========================================
+    # CRUD Override
+    # ==========================================
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Add the new payments to the paid amount of their billings"""
+        payments = super().create(vals_list)
+        payments._apply_to_billings()
+        return payments
+    
+    def write(self, vals):
+        """Move paid amounts when the amount or billing of payments changes"""
+        if not {'amount', 'billing_id'} & set(vals):
+            return super().write(vals)
+        self._apply_to_billings(sign=-1)
+        result = super().write(vals)
+        self._apply_to_billings()
+        return result
+    
+    def unlink(self):
+        """Remove deleted payments from the paid amount of their billings"""
+        self._apply_to_billings(sign=-1)
+        return super().unlink()
+    
+    def _apply_to_billings(self, sign=1):
+        """Update paid amounts and states of the affected billings in bulk.
+        
+        Amounts are summed per billing first and added with a single
+        UPDATE; the stored balance and payment status are then recomputed
+        through ``modified``. Billings that become fully paid are moved to
+        'paid' with a single write.
+        """
+        totals = defaultdict(float)
+        for payment in self:
+            totals[payment.billing_id.id] += sign * payment.amount
+        if not totals:
+            return
+        
+        Billing = self.env['hospital.billing']
+        Billing.flush_model(['paid_amount'])
+        self.env.cr.execute(SQL("""
+            UPDATE hospital_billing b
+               SET paid_amount = COALESCE(b.paid_amount, 0) + t.amount,
+                   write_uid = %(uid)s,
+                   write_date = (now() at time zone 'UTC')
+              FROM unnest(%(ids)s::int[], %(amounts)s::float8[]) AS t(id, amount)
+             WHERE b.id = t.id
+        """, uid=self.env.uid, ids=list(totals), amounts=list(totals.values())))
+        billings = Billing.browse(list(totals))
+        billings.invalidate_recordset(['paid_amount', 'write_uid', 'write_date'])
+        billings.modified(['paid_amount'])
+        billings._check_paid_amount()
+        
+        if sign > 0:
+            billings.filtered(
+                lambda b: b.state == 'confirmed' and b.payment_status == 'paid'
+            ).write({'state': 'paid'})
+        else:
+            billings.filtered(
+                lambda b: b.state == 'paid' and b.payment_status != 'paid'
+            ).write({'state': 'confirmed'})
+
+
+class HospitalBillingPaymentBatch(models.Model):
+    """Model for bulk payments received from insurers and corporate payers"""
+    
+    _name = 'hospital.billing.payment.batch'
+    _description = 'Hospital Billing Payment Batch'
+    _inherit = ['mail.thread']
+    _order = 'payment_date desc, id desc'
+    
+    name = fields.Char(
+        string='Reference',
+        required=True,
+        readonly=True,
+        copy=False,
+        default='New'
+    )
+    
+    payer = fields.Char(
+        string='Payer',
+        required=True,
+        tracking=True
+    )
+    
+    payment_date = fields.Date(
+        string='Payment Date',
+        required=True,
+        default=fields.Date.today
+    )
+    
+    payment_method = fields.Selection(
+        selection=PAYMENT_METHODS,
+        string='Payment Method',
+        default='insurance'
+    )
+    
+    file = fields.Binary(
+        string='Payer File',
+        help='CSV with columns: reference, patient_reference, amount (memo optional)'
+    )
+    
+    filename = fields.Char(
+        string='File Name'
+    )
+    
+    payment_ids = fields.One2many(
+        comodel_name='hospital.billing.payment',
+        inverse_name='batch_id',
+        string='Payments'
+    )
+    
+    unmatched_ids = fields.One2many(
+        comodel_name='hospital.billing.payment.batch.unmatched',
+        inverse_name='batch_id',
+        string='Unmatched Lines'
+    )
+    
+    allocated_amount = fields.Float(
+        string='Allocated Amount',
+        readonly=True
+    )
+    
+    unallocated_amount = fields.Float(
+        string='Unallocated Amount',
+        readonly=True
+    )
+    
+    invoice_count = fields.Integer(
+        string='Invoices Paid',
+        readonly=True
+    )
+    
+    state = fields.Selection(
+        selection=[
+            ('draft', 'Draft'),
+            ('done', 'Reconciled'),
+        ],
+        string='Status',
+        default='draft',
+        tracking=True
+    )
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Generate sequence number for reference"""
+        for vals in vals_list:
+            if vals.get('name', 'New') == 'New':
+                vals['name'] = self.env['ir.sequence'].next_by_code(
+                    'hospital.billing.payment.batch'
+                ) or 'New'
+        return super().create(vals_list)
+    
+    # ==========================================
+    # Reconciliation Engine
+    # ==========================================
+    
+    def _read_rows(self):
+        """Yield (line number, row dict) from the uploaded CSV file"""
+        self.ensure_one()
+        content = io.TextIOWrapper(io.BytesIO(base64.b64decode(self.file)), encoding='utf-8-sig')
+        reader = csv.DictReader(content)
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+        if 'amount' not in reader.fieldnames:
+            raise UserError('The payer file must have an "amount" column.')
+        for line_number, row in enumerate(reader, start=2):
+            yield line_number, {key: (value or '').strip() for key, value in row.items() if key}
+    
+    def _load_open_billings(self, references, patient_references):
+        """Read all candidate billings in one query.
+        
+        Returns (billings by reference, billings by patient reference);
+        each billing is a dict with its id and open balance, and patient
+        lists are sorted oldest due first.
+        """
+        by_reference = {}
+        by_patient = defaultdict(list)
+        if not references and not patient_references:
+            return by_reference, by_patient
+        
+        billings = self.env['hospital.billing'].search_read(
+            [
+                ('state', '=', 'confirmed'),
+                ('balance_amount', '>', 0),
+                '|',
+                ('reference', 'in', list(references)),
+                ('patient_id.reference', 'in', list(patient_references)),
+            ],
+            ['reference', 'patient_reference', 'balance_amount'],
+            order='due_date asc, billing_date asc, id asc',
+        )
+        for billing in billings:
+            billing['open'] = billing['balance_amount']
+            by_reference[billing['reference']] = billing
+            if billing['patient_reference']:
+                by_patient[billing['patient_reference']].append(billing)
+        return by_reference, by_patient
+    
+    def action_process(self):
+        """Match the payer file to billings, allocate amounts and register payments"""
+        self.ensure_one()
+        if self.state != 'draft':
+            raise UserError('This payment batch has already been reconciled.')
+        if not self.file:
+            raise UserError('Please upload the payer file first.')
+        
+        rows = list(self._read_rows())
+        references = {row.get('reference') for _, row in rows if row.get('reference')}
+        patient_references = {row.get('patient_reference') for _, row in rows if row.get('patient_reference')}
+        by_reference, by_patient = self._load_open_billings(references, patient_references)
+        
+        Billing = self.env['hospital.billing']
+        payment_vals = []
+        unmatched_vals = []
+        
+        def unmatched(line_number, row, amount, reason):
+            unmatched_vals.append({
+                'batch_id': self.id,
+                'line_number': line_number,
+                'reference': row.get('reference'),
+                'patient_reference': row.get('patient_reference'),
+                'amount': amount,
+                'reason': reason,
+            })
+        
+        for line_number, row in rows:
+            amount = parse_number(row.get('amount'))
+            if amount is None:
+                unmatched(line_number, row, 0.0, 'invalid_amount')
+                continue
+            if Billing._compare_amounts(amount, 0.0) <= 0:
+                unmatched(line_number, row, amount, 'invalid_amount')
+                continue
+            
+            if row.get('reference'):
+                billing = by_reference.get(row['reference'])
+                candidates = [billing] if billing else []
+            else:
+                candidates = by_patient.get(row.get('patient_reference'), [])
+            candidates = [
+                billing for billing in candidates
+                if Billing._compare_amounts(billing['open'], 0.0) > 0
+            ]
+            if not candidates:
+                unmatched(line_number, row, amount, 'no_match')
+                continue
+            
+            remaining = amount
+            for billing in candidates:
+                allocated = min(remaining, billing['open'])
+                billing['open'] -= allocated
+                remaining -= allocated
+                payment_vals.append({
+                    'billing_id': billing['id'],
+                    'batch_id': self.id,
+                    'amount': allocated,
+                    'payment_date': self.payment_date,
+                    'payment_method': self.payment_method,
+                    'payer': self.payer,
+                    'memo': row.get('memo'),
+                })
+                if Billing._compare_amounts(remaining, 0.0) <= 0:
+                    break
+            if Billing._compare_amounts(remaining, 0.0) > 0:
+                unmatched(line_number, row, remaining, 'overpayment')
+        
+        # Bulk writes: chatter tracking per invoice is skipped, the batch
+        # keeps the summary instead.
+        payments = self.env['hospital.billing.payment'].with_context(
+            tracking_disable=True
+        ).create(payment_vals)
+        self.env['hospital.billing.payment.batch.unmatched'].create(unmatched_vals)
+        
+        allocated_amount = sum(payments.mapped('amount'))
+        self.write({
+            'state': 'done',
+            'allocated_amount': allocated_amount,
+            'unallocated_amount': sum(vals['amount'] for vals in unmatched_vals),
+            'invoice_count': len(payments.billing_id),
+        })
+        self.message_post(
+            body=f'Reconciled {len(payments)} payments over {len(payments.billing_id)} invoices '
+                 f'({allocated_amount:.2f}); {len(unmatched_vals)} unmatched lines.'
+        )
+        return True
+
+
+class HospitalBillingPaymentBatchUnmatched(models.Model):
+    """Payer file lines that could not be fully allocated"""
+    
+    _name = 'hospital.billing.payment.batch.unmatched'
+    _description = 'Unmatched Payment Line'
+    _order = 'batch_id, line_number'
+    
+    batch_id = fields.Many2one(
+        comodel_name='hospital.billing.payment.batch',
+        string='Payment Batch',
+        required=True,
+        ondelete='cascade'
+    )
+    
+    line_number = fields.Integer(
+        string='Line'
+    )
+    
+    reference = fields.Char(
+        string='Bill Reference'
+    )
+    
+    patient_reference = fields.Char(
+        string='Patient Reference'
+    )
+    
+    amount = fields.Float(
+        string='Unallocated Amount'
+    )
+    
+    reason = fields.Selection(
+        selection=[
+            ('no_match', 'No Open Billing Found'),
+            ('overpayment', 'Exceeds Open Balance'),
+            ('invalid_amount', 'Invalid Amount'),
+        ],
+        string='Reason'
+    )
@@ -0,0 +1,125 @@
+from odoo import models, fields
+
+
+class HospitalClinicalSearch(models.TransientModel):
+    """Ranked full-text search over medical records"""
+    
+    _name = 'hospital.clinical.search'
+    _description = 'Clinical Search'
+    
+    query = fields.Char(
+        string='Search',
+        required=True,
+        help='Words to find in diagnosis, symptoms, treatment and notes. '
+             'Supports "quoted phrases", OR and -excluded words.'
+    )
+    
+    patient_id = fields.Many2one(
+        comodel_name='hospital.patient',
+        string='Patient'
+    )
+    
+    doctor_id = fields.Many2one(
+        comodel_name='hospital.doctor',
+        string='Doctor'
+    )
+    
+    limit = fields.Integer(
+        string='Results',
+        default=80
+    )
+    
+    line_ids = fields.One2many(
+        comodel_name='hospital.clinical.search.line',
+        inverse_name='search_id',
+        string='Matches'
+    )
+    
+    def _get_domain(self):
+        """Medical record domain of the optional filters"""
+        self.ensure_one()
+        domain = []
+        if self.patient_id:
+            domain.append(('patient_id', '=', self.patient_id.id))
+        if self.doctor_id:
+            domain.append(('doctor_id', '=', self.doctor_id.id))
+        return domain
+    
+    def action_search(self):
+        """Run the search and list the matches by relevance"""
+        self.ensure_one()
+        self.line_ids.unlink()
+        matches = self.env['hospital.medical.record'].search_clinical(
+            self.query, domain=self._get_domain(), limit=self.limit or 80
+        )
+        self.env['hospital.clinical.search.line'].create([{
+            'search_id': self.id,
+            'record_id': match['id'],
+            'rank': match['rank'],
+            'snippet': match['snippet'],
+        } for match in matches])
+        return {
+            'name': f'Clinical Search: {self.query}',
+            'type': 'ir.actions.act_window',
+            'res_model': 'hospital.clinical.search.line',
+            'view_mode': 'list',
+            'domain': [('search_id', '=', self.id)],
+            'target': 'current',
+        }
+
+
+class HospitalClinicalSearchLine(models.TransientModel):
+    """One medical record matching a clinical search"""
+    
+    _name = 'hospital.clinical.search.line'
+    _description = 'Clinical Search Match'
+    _order = 'rank desc, id'
+    
+    search_id = fields.Many2one(
+        comodel_name='hospital.clinical.search',
+        string='Search',
+        required=True,
+        ondelete='cascade'
+    )
+    
+    record_id = fields.Many2one(
+        comodel_name='hospital.medical.record',
+        string='Medical Record',
+        required=True,
+        ondelete='cascade'
+    )
+    
+    record_date = fields.Date(
+        related='record_id.record_date',
+        string='Date'
+    )
+    
+    patient_id = fields.Many2one(
+        related='record_id.patient_id',
+        string='Patient'
+    )
+    
+    doctor_id = fields.Many2one(
+        related='record_id.doctor_id',
+        string='Doctor'
+    )
+    
+    rank = fields.Float(
+        string='Relevance',
+        digits=(16, 4)
+    )
+    
+    snippet = fields.Html(
+        string='Match'
+    )
+    
+    def action_open_record(self):
+        """Open the matching medical record"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'hospital.medical.record',
+            'res_id': self.record_id.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
@@ -67,6 +67,16 @@ class HospitalDashboard(models.TransientModel):
         compute='_compute_kpis'
     )
     
+    lab_turnaround_p50 = fields.Float(
+        string='Lab Turnaround P50 (days)',
+        compute='_compute_lab_turnaround'
+    )
+    
+    lab_turnaround_p90 = fields.Float(
+        string='Lab Turnaround P90 (days)',
+        compute='_compute_lab_turnaround'
+    )
+    
     # Gender Statistics
     male_patients = fields.Integer(
         string='Male Patients',
@@ -143,6 +153,15 @@ class HospitalDashboard(models.TransientModel):
                 ('state', 'in', ['requested', 'in_progress'])
             ])
     
+    @api.depends('date_from', 'date_to')
+    def _compute_lab_turnaround(self):
+        """Compute lab turnaround percentiles over the period"""
+        Analysis = self.env['hospital.lab.turnaround.analysis']
+        for record in self:
+            stats = Analysis.get_percentiles(record.date_from, record.date_to, by_group=False)
+            record.lab_turnaround_p50 = stats[0]['p50'] if stats else 0.0
+            record.lab_turnaround_p90 = stats[0]['p90'] if stats else 0.0
+    
     @api.depends('date_from', 'date_to')
     def _compute_patient_stats(self):
         """Compute patient statistics"""
@@ -196,6 +215,14 @@ class HospitalDashboard(models.TransientModel):
             'target': 'current',
         }
     
+    def action_view_lab_turnaround(self):
+        """Open lab turnaround analytics for the period"""
+        analysis = self.env['hospital.lab.turnaround.analysis'].create({
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+        })
+        return analysis.action_compute()
+    
     def action_view_lab_tests(self):
         """Open lab tests view"""
         return {
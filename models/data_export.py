@@ -0,0 +1,219 @@
+import csv
+import io
+import tempfile
+
+from odoo import models, api, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+
+class HospitalDataExport(models.AbstractModel):
+    """Streaming exports of billing and clinical data.
+    
+    Rows are read through a server-side (named) cursor and written one
+    by one, so memory use stays flat whatever the number of rows.
+    """
+    
+    _name = 'hospital.data.export'
+    _description = 'Hospital Data Export'
+    
+    # Rows fetched per round trip from the server-side cursor
+    _ITERSIZE = 2000
+    
+    # Bytes buffered before a CSV chunk is sent
+    _CSV_CHUNK_SIZE = 64 * 1024
+    
+    @api.model
+    def _get_datasets(self):
+        """Dataset definitions: root model, date field, header and query.
+        
+        The query selects the export columns for the root records whose
+        ids are returned by the `%(ids)s` sub-query.
+        """
+        return {
+            'billing_lines': {
+                'name': _('Billings and Lines'),
+                'model': 'hospital.billing',
+                'date_field': 'billing_date',
+                'header': [
+                    'Bill Reference', 'Billing Date', 'Due Date', 'Patient Reference',
+                    'Patient', 'Doctor', 'Status', 'Payment Status', 'Total', 'Paid',
+                    'Balance', 'Service Type', 'Description', 'Quantity', 'Unit Price',
+                    'Line Subtotal',
+                ],
+                'query': """
+                    SELECT b.reference, b.billing_date, b.due_date, p.reference, p.name,
+                           d.name, b.state, b.payment_status, b.total_amount,
+                           b.paid_amount, b.balance_amount, l.service_type,
+                           l.description, l.quantity, l.unit_price, l.subtotal
+                      FROM hospital_billing b
+                      JOIN hospital_patient p ON p.id = b.patient_id
+                 LEFT JOIN hospital_doctor d ON d.id = b.doctor_id
+                 LEFT JOIN hospital_billing_line l ON l.billing_id = b.id
+                     WHERE b.id IN %(ids)s
+                  ORDER BY b.id, l.sequence, l.id
+                """,
+            },
+            'appointments': {
+                'name': _('Appointments'),
+                'model': 'hospital.appointment',
+                'date_field': 'appointment_date',
+                'header': [
+                    'Reference', 'Date', 'Time', 'Duration', 'Patient Reference',
+                    'Patient', 'Doctor', 'Type', 'Status', 'Priority',
+                ],
+                'query': """
+                    SELECT a.reference, a.appointment_date, a.appointment_time,
+                           a.duration, p.reference, p.name, d.name,
+                           a.appointment_type, a.state, a.priority
+                      FROM hospital_appointment a
+                      JOIN hospital_patient p ON p.id = a.patient_id
+                      JOIN hospital_doctor d ON d.id = a.doctor_id
+                     WHERE a.id IN %(ids)s
+                  ORDER BY a.id
+                """,
+            },
+            'lab_results': {
+                'name': _('Lab Results'),
+                'model': 'hospital.lab.test',
+                'date_field': 'test_date',
+                'header': [
+                    'Test Reference', 'Test Date', 'Result Date', 'Patient Reference',
+                    'Patient', 'Test', 'Category', 'Priority', 'Status',
+                    'Result Status', 'Parameter', 'Result', 'Unit', 'Normal Range',
+                    'Abnormal', 'Critical',
+                ],
+                'query': """
+                    SELECT t.reference, t.test_date, t.result_date, p.reference,
+                           p.name, tt.name, t.test_category, t.priority, t.state,
+                           t.result_status, l.parameter_name, l.result_value,
+                           l.unit, l.normal_range, l.is_abnormal, l.is_critical
+                      FROM hospital_lab_test t
+                      JOIN hospital_patient p ON p.id = t.patient_id
+                      JOIN hospital_lab_test_type tt ON tt.id = t.test_type
+                 LEFT JOIN hospital_lab_test_line l ON l.test_id = t.id
+                     WHERE t.id IN %(ids)s
+                  ORDER BY t.id, l.sequence, l.id
+                """,
+            },
+        }
+    
+    @api.model
+    def _get_dataset(self, dataset):
+        """Return a dataset definition or raise for unknown names"""
+        definition = self._get_datasets().get(dataset)
+        if not definition:
+            raise UserError(_('Unknown export dataset: %s', dataset))
+        return definition
+    
+    @api.model
+    def _get_domain(self, dataset, date_from=None, date_to=None):
+        """Domain on the dataset's root model for a date range"""
+        date_field = self._get_dataset(dataset)['date_field']
+        domain = []
+        if date_from:
+            domain.append((date_field, '>=', date_from))
+        if date_to:
+            domain.append((date_field, '<=', date_to))
+        return domain
+    
+    @api.model
+    def _iter_rows(self, dataset, domain=None):
+        """Yield export rows through a server-side cursor.
+        
+        The root records are selected with the ORM (access rules apply)
+        as a sub-query; nothing is loaded in the ORM cache.
+        """
+        definition = self._get_dataset(dataset)
+        Model = self.env[definition['model']]
+        Model.check_access('read')
+        self.env.flush_all()
+        
+        query = SQL(definition['query'], ids=Model._search(domain or []).subselect())
+        with self.env.cr._cnx.cursor(name=f'hospital_export_{dataset}') as cursor:
+            cursor.itersize = self._ITERSIZE
+            cursor.execute(query.code, query.params)
+            yield from cursor
+    
+    # ==========================================
+    # Writers
+    # ==========================================
+    
+    @api.model
+    def _iter_csv_chunks(self, dataset, domain=None):
+        """Yield the CSV export as encoded chunks of about _CSV_CHUNK_SIZE bytes"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self._get_dataset(dataset)['header'])
+        for row in self._iter_rows(dataset, domain):
+            writer.writerow(row)
+            if buffer.tell() >= self._CSV_CHUNK_SIZE:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+    
+    @api.model
+    def _write_csv(self, dataset, fileobj, domain=None):
+        """Write the CSV export to a binary file object"""
+        for chunk in self._iter_csv_chunks(dataset, domain):
+            fileobj.write(chunk)
+    
+    @api.model
+    def _write_xlsx(self, dataset, fileobj, domain=None):
+        """Write the XLSX export to a binary file object.
+        
+        xlsxwriter's constant memory mode flushes every row to disk as
+        soon as the next one starts.
+        """
+        if xlsxwriter is None:
+            raise UserError(_('The xlsxwriter library is required for XLSX exports.'))
+        definition = self._get_dataset(dataset)
+        workbook = xlsxwriter.Workbook(fileobj, {
+            'constant_memory': True,
+            'default_date_format': 'yyyy-mm-dd',
+        })
+        sheet = workbook.add_worksheet(str(definition['name'])[:31])
+        bold = workbook.add_format({'bold': True})
+        sheet.write_row(0, 0, definition['header'], bold)
+        for row_index, row in enumerate(self._iter_rows(dataset, domain), start=1):
+            sheet.write_row(row_index, 0, row)
+        workbook.close()
+    
+    @api.model
+    def _export_to_file(self, dataset, file_format, domain=None):
+        """Write an export to a temporary file and return it rewound"""
+        fileobj = tempfile.TemporaryFile()
+        if file_format == 'xlsx':
+            self._write_xlsx(dataset, fileobj, domain)
+        else:
+            self._write_csv(dataset, fileobj, domain)
+        fileobj.seek(0)
+        return fileobj
+    
+    @api.model
+    def _get_filename(self, dataset, file_format):
+        """Download file name of an export"""
+        return f'{dataset}.{file_format}'
+    
+    @api.model
+    def export_to_attachment(self, dataset, file_format='csv', date_from=None, date_to=None):
+        """Run an export into an attachment and return it"""
+        domain = self._get_domain(dataset, date_from, date_to)
+        with self._export_to_file(dataset, file_format, domain) as fileobj:
+            return self.env['ir.attachment']._create_from_file(fileobj, {
+                'name': self._get_filename(dataset, file_format),
+                'mimetype': self._get_mimetype(file_format),
+            })
+    
+    @api.model
+    def _get_mimetype(self, file_format):
+        """Mimetype of an export format"""
+        if file_format == 'xlsx':
+            return 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return 'text/csv'
@@ -23,7 +23,6 @@ class HospitalDoctor(models.Model):
             ('neurology', 'Neurology'),
             ('orthopedics', 'Orthopedics'),
             ('general', 'General Medicine'),
-            ('pediatric', 'Pediatrics'),
         ],
         string='Specialty',
         default='general',
@@ -38,6 +37,12 @@ class HospitalDoctor(models.Model):
         string='Email'
     )
     
+    user_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Related User',
+        help='User receiving activities, e.g. critical lab result escalations'
+    )
+    
     # New Fields
     consultation_fee = fields.Float(
         string='Consultation Fee',
@@ -94,9 +99,12 @@ class HospitalDoctor(models.Model):
         default=True
     )
     
-    @api.depends('patient_ids')
+    # Fields that change a doctor's place in the assignment queues
+    _ASSIGNMENT_FIELDS = {'specialty', 'max_patients', 'availability', 'active'}
+    
+    @api.depends('patient_ids', 'patient_ids.active')
     def _compute_patient_count(self):
-        """Compute total number of patients"""
+        """Compute total number of active patients"""
         for record in self:
             record.patient_count = len(record.patient_ids)
     
@@ -138,4 +146,44 @@ class HospitalDoctor(models.Model):
                 from odoo.exceptions import ValidationError
                 raise ValidationError(
                     f'Doctor {record.name} cannot have more than {record.max_patients} patients!'
-                )
\ No newline at end of file
+                )
+    
+    # ==========================================
+    # Action Methods
+    # ==========================================
+    
+    def action_print_profiles_zip(self):
+        """Render the selected doctor profiles in chunks and download them as a zip"""
+        attachment = self.env['report.hospital_management.report_doctor_profile'].render_zip(self.ids)
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content/{attachment.id}?download=true',
+            'target': 'self',
+        }
+    
+    # ==========================================
+    # CRUD Override
+    # ==========================================
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Invalidate assignment queues of the new doctors' specialties"""
+        records = super().create(vals_list)
+        self.env['hospital.doctor.assignment'].invalidate(set(records.mapped('specialty')))
+        return records
+    
+    def write(self, vals):
+        """Invalidate assignment queues when capacity or specialty changes"""
+        if not self._ASSIGNMENT_FIELDS & set(vals):
+            return super().write(vals)
+        
+        specialties = set(self.mapped('specialty'))
+        result = super().write(vals)
+        specialties |= set(self.mapped('specialty'))
+        self.env['hospital.doctor.assignment'].invalidate(specialties)
+        return result
+    
+    def unlink(self):
+        """Invalidate assignment queues of the removed doctors' specialties"""
+        self.env['hospital.doctor.assignment'].invalidate(set(self.mapped('specialty')))
+        return super().unlink()
\ No newline at end of file
@@ -0,0 +1,196 @@
+import heapq
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+# Transaction data key holding the queues built by the current transaction
+_QUEUE_KEY = 'hospital.doctor.assignment'
+
+
+class _DoctorQueue:
+    """Priority queue of doctors for one specialty.
+
+    Doctors are ordered by remaining capacity (highest first), then by
+    upcoming appointment load (lowest first). Updates push a fresh entry
+    and leave the old one behind; stale entries are dropped lazily when
+    they reach the top, so reading the best doctor stays constant time.
+    """
+
+    def __init__(self, rows):
+        self.remaining = {}
+        self.load = {}
+        self.heap = []
+        for doctor_id, remaining, load in rows:
+            self.remaining[doctor_id] = remaining
+            self.load[doctor_id] = load
+            if remaining > 0:
+                self.heap.append((-remaining, load, doctor_id))
+        heapq.heapify(self.heap)
+
+    def peek(self):
+        """Return the id of the best doctor, or None when all are full"""
+        heap = self.heap
+        while heap:
+            neg_remaining, load, doctor_id = heap[0]
+            if (
+                neg_remaining < 0
+                and self.remaining.get(doctor_id) == -neg_remaining
+                and self.load.get(doctor_id) == load
+            ):
+                return doctor_id
+            heapq.heappop(heap)
+        return None
+
+    def adjust(self, doctor_id, patients=0, load=0):
+        """Account for patients/appointments added to (or removed from) a doctor"""
+        if doctor_id not in self.remaining:
+            return
+        self.remaining[doctor_id] -= patients
+        self.load[doctor_id] += load
+        if self.remaining[doctor_id] > 0:
+            heapq.heappush(
+                self.heap,
+                (-self.remaining[doctor_id], self.load[doctor_id], doctor_id)
+            )
+
+
+class HospitalDoctorAssignment(models.AbstractModel):
+    """Service for load-balanced automatic doctor assignment"""
+
+    _name = 'hospital.doctor.assignment'
+    _description = 'Doctor Assignment Service'
+
+    # Upcoming appointments counted as load (days ahead)
+    _load_horizon_days = 7
+
+    # ==========================================
+    # Queue Management
+    # ==========================================
+
+    def _get_queues(self):
+        """Queues of the current transaction: {specialty: _DoctorQueue}.
+
+        Queues are read from the database once per transaction and kept
+        in the post-commit data, which is dropped on commit and rollback,
+        so they never outlive the changes they account for nor differ
+        between workers.
+        """
+        return self.env.cr.postcommit.data.setdefault(_QUEUE_KEY, {})
+
+    def _get_queue(self, specialty):
+        """Return the queue of a specialty, building it if needed"""
+        queues = self._get_queues()
+        queue = queues.get(specialty)
+        if queue is None:
+            queue = queues[specialty] = _DoctorQueue(self._read_queue_rows(specialty))
+        return queue
+
+    def _read_queue_rows(self, specialty):
+        """Read (doctor_id, remaining capacity, upcoming load) in one query"""
+        self.env['hospital.doctor'].flush_model(
+            ['specialty', 'max_patients', 'patient_count', 'availability', 'active']
+        )
+        self.env['hospital.appointment'].flush_model(
+            ['doctor_id', 'state', 'appointment_date', 'active']
+        )
+        today = fields.Date.today()
+        self.env.cr.execute("""
+            SELECT d.id,
+                   COALESCE(d.max_patients, 0) - COALESCE(d.patient_count, 0),
+                   COUNT(a.id)
+              FROM hospital_doctor d
+         LEFT JOIN hospital_appointment a
+                ON a.doctor_id = d.id
+               AND a.active
+               AND a.state IN ('draft', 'confirmed')
+               AND a.appointment_date BETWEEN %s AND %s
+             WHERE d.active
+               AND d.specialty = %s
+               AND COALESCE(d.availability, 'available') != 'on_leave'
+          GROUP BY d.id
+        """, [today, today + timedelta(days=self._load_horizon_days), specialty])
+        return self.env.cr.fetchall()
+
+    @api.model
+    def invalidate(self, specialties=None):
+        """Drop cached queues (all of them, or only the given specialties)"""
+        queues = self._get_queues()
+        if specialties is None:
+            queues.clear()
+        else:
+            for specialty in specialties:
+                queues.pop(specialty, None)
+
+    # ==========================================
+    # Public API
+    # ==========================================
+
+    @api.model
+    def get_doctor(self, specialty):
+        """Return the least loaded doctor of a specialty (may be empty)"""
+        doctor_id = self._get_queue(specialty).peek()
+        return self.env['hospital.doctor'].browse(doctor_id or [])
+
+    @api.model
+    def assign(self, patients):
+        """Assign doctors to patients that need one, balancing the load.
+
+        Works for a single registration as well as bulk imports: each
+        patient takes the current best doctor of its specialty, and the
+        queue is updated in memory before the next patient is served.
+        Patients are then written with one write per doctor.
+        """
+        by_doctor = {}
+        for patient in patients:
+            if patient.doctor_id:
+                continue
+            specialty = patient._get_required_specialty()
+            if not specialty:
+                continue
+            queue = self._get_queue(specialty)
+            doctor_id = queue.peek()
+            if not doctor_id:
+                continue
+            queue.adjust(doctor_id, patients=1)
+            by_doctor.setdefault(doctor_id, []).append(patient.id)
+
+        Patient = self.env['hospital.patient'].with_context(hospital_doctor_assignment=True)
+        for doctor_id, patient_ids in by_doctor.items():
+            Patient.browse(patient_ids).write({'doctor_id': doctor_id})
+        return patients
+
+    # ==========================================
+    # Change Notifications
+    # ==========================================
+
+    @api.model
+    def _notify_patients(self, patients, delta=1):
+        """Update cached queues for patients added to (or removed from) their doctors"""
+        queues = self._get_queues()
+        if not queues:
+            return
+        for patient in patients:
+            doctor = patient.doctor_id
+            queue = doctor and patient.active and queues.get(doctor.specialty)
+            if queue:
+                queue.adjust(doctor.id, patients=delta)
+
+    @api.model
+    def _notify_appointments(self, appointments, delta=1):
+        """Update cached queues for upcoming appointments added or removed"""
+        queues = self._get_queues()
+        if not queues:
+            return
+        today = fields.Date.today()
+        horizon = today + timedelta(days=self._load_horizon_days)
+        for appointment in appointments:
+            doctor = appointment.doctor_id
+            queue = doctor and queues.get(doctor.specialty)
+            if (
+                queue
+                and appointment.active
+                and appointment.state in ('draft', 'confirmed')
+                and appointment.appointment_date
+                and today <= appointment.appointment_date <= horizon
+            ):
+                queue.adjust(doctor.id, load=delta)
@@ -0,0 +1,138 @@
+import re
+from collections import namedtuple
+from itertools import combinations
+
+from odoo import models, fields, api, tools
+
+# Ordered from least to most severe
+SEVERITIES = [
+    ('minor', 'Minor'),
+    ('moderate', 'Moderate'),
+    ('major', 'Major'),
+    ('contraindicated', 'Contraindicated'),
+]
+SEVERITY_RANK = {severity: rank for rank, (severity, _label) in enumerate(SEVERITIES)}
+
+_STRENGTH_RE = re.compile(r'\d.*$')
+_NON_ALPHA_RE = re.compile(r'[^a-z]+')
+
+# Dosage form words ignored when normalizing names
+_FORM_WORDS = {
+    'tablet', 'tablets', 'tab', 'capsule', 'capsules', 'cap', 'syrup', 'injection',
+    'cream', 'ointment', 'drops', 'spray', 'inhaler', 'solution', 'suspension',
+    'oral', 'iv', 'im', 'sr', 'xr', 'er', 'mr',
+}
+
+Interaction = namedtuple('Interaction', ['drug_a', 'drug_b', 'severity', 'description'])
+
+
+def normalize_drug(name):
+    """Normalized drug key of a medicine name.
+    
+    Everything from the first digit (strength) is dropped, as are case,
+    punctuation and dosage form words: ``'Warfarin 5mg tablet'`` and
+    ``'WARFARIN tablets'`` both give ``'warfarin'``.
+    """
+    if not name:
+        return ''
+    words = _NON_ALPHA_RE.sub(' ', _STRENGTH_RE.sub('', name.lower())).split()
+    return ' '.join(word for word in words if word not in _FORM_WORDS)
+
+
+class HospitalDrugInteraction(models.Model):
+    """Known interactions between two drugs"""
+    
+    _name = 'hospital.drug.interaction'
+    _description = 'Drug Interaction'
+    _order = 'drug_a, drug_b'
+    _rec_name = 'drug_a'
+    
+    drug_a = fields.Char(
+        string='Drug A',
+        required=True
+    )
+    
+    drug_b = fields.Char(
+        string='Drug B',
+        required=True
+    )
+    
+    severity = fields.Selection(
+        selection=SEVERITIES,
+        string='Severity',
+        required=True,
+        default='moderate'
+    )
+    
+    description = fields.Text(
+        string='Description',
+        help='Effect of the interaction and recommended management'
+    )
+    
+    active = fields.Boolean(
+        string='Active',
+        default=True
+    )
+    
+    # ==========================================
+    # Pair Index
+    # ==========================================
+    
+    @api.model
+    def _get_index(self):
+        """Return the interaction index, rebuilt only when interactions change.
+        
+        The cache key is the latest write date and row count of the table,
+        so edits, archiving and deletions all select a fresh index without
+        clearing any other cache of the registry.
+        """
+        self.flush_model()
+        self.env.cr.execute("SELECT MAX(write_date), COUNT(*) FROM hospital_drug_interaction")
+        stamp, count = self.env.cr.fetchone()
+        return self._build_index(stamp, count)
+    
+    @api.model
+    @tools.ormcache('stamp', 'count')
+    def _build_index(self, stamp, count):
+        """Build the in-memory interaction index.
+        
+        Drug names are mapped to small integer ids and each pair is
+        stored under the (lower id, higher id) tuple, so a lookup is one
+        dict probe. The index lives in the registry cache: it is built
+        once per worker and table state.
+        """
+        drug_ids = {}
+        pairs = {}
+        for row in self.sudo().search_read([], ['drug_a', 'drug_b', 'severity', 'description']):
+            key_a, key_b = normalize_drug(row['drug_a']), normalize_drug(row['drug_b'])
+            if not key_a or not key_b or key_a == key_b:
+                continue
+            id_a = drug_ids.setdefault(key_a, len(drug_ids))
+            id_b = drug_ids.setdefault(key_b, len(drug_ids))
+            pair = (id_a, id_b) if id_a < id_b else (id_b, id_a)
+            interaction = Interaction(row['drug_a'], row['drug_b'], row['severity'], row['description'] or '')
+            current = pairs.get(pair)
+            if not current or SEVERITY_RANK[interaction.severity] > SEVERITY_RANK[current.severity]:
+                pairs[pair] = interaction
+        return drug_ids, pairs
+    
+    @api.model
+    def _find_interactions(self, medicine_names, other_names=(), index=None):
+        """Return the interactions involving at least one of the given medicines.
+        
+        Pairs within ``medicine_names`` and between them and
+        ``other_names`` are checked; pairs made only of other names are
+        not. Names are normalized and only the drugs known to the index
+        take part in the lookups. Results are sorted most severe first.
+        """
+        drug_ids, pairs = index or self._get_index()
+        own, others = (
+            {drug_ids[key] for key in map(normalize_drug, names) if key in drug_ids}
+            for names in (medicine_names, other_names)
+        )
+        others -= own
+        candidates = list(combinations(sorted(own), 2))
+        candidates += [(min(a, b), max(a, b)) for a in own for b in others]
+        found = [pairs[pair] for pair in candidates if pair in pairs]
+        found.sort(key=lambda i: SEVERITY_RANK[i.severity], reverse=True)
+        return found
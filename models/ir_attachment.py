@@ -0,0 +1,157 @@
+import hashlib
+import os
+import shutil
+from functools import partial
+
+from psycopg2.errors import UniqueViolation
+
+from odoo import models, api
+from odoo.exceptions import UserError
+from odoo.tools import mute_logger, SQL
+from odoo.tools.image import image_process
+
+# Models whose uploaded attachments are streamed into the filestore
+HOSPITAL_ATTACHMENT_MODELS = ('hospital.medical.record', 'hospital.lab.test')
+
+# Bounding box of cached attachment thumbnails
+THUMBNAIL_SIZE = (256, 256)
+
+
+class IrAttachment(models.Model):
+    """Extend attachments with streamed, content-addressed creation and
+    cached thumbnails"""
+    
+    _inherit = 'ir.attachment'
+    
+    # Read/write block size for streamed content
+    _STREAM_CHUNK_SIZE = 1024 * 1024
+    
+    # Leading bytes used to guess the mimetype of streamed content
+    _MIMETYPE_SNIFF_SIZE = 1024
+    
+    def init(self):
+        """One cached thumbnail per attachment, even under concurrent requests"""
+        super().init()
+        self.env.cr.execute("""
+            DELETE FROM ir_attachment a
+                  USING ir_attachment b
+                  WHERE a.res_model = 'ir.attachment'
+                    AND b.res_model = 'ir.attachment'
+                    AND a.name LIKE 'thumbnail\\_%'
+                    AND a.res_id = b.res_id
+                    AND a.name = b.name
+                    AND a.id > b.id
+        """)
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS ir_attachment_hospital_thumbnail_uniq
+                ON ir_attachment (res_id, name)
+             WHERE res_model = 'ir.attachment' AND name LIKE 'thumbnail\\_%'
+        """)
+    
+    @api.model
+    def _hash_file(self, fileobj):
+        """Return the (sha1, size) of a binary file object, read in chunks"""
+        fileobj.seek(0)
+        sha1 = hashlib.sha1()
+        size = 0
+        for chunk in iter(lambda: fileobj.read(self._STREAM_CHUNK_SIZE), b''):
+            sha1.update(chunk)
+            size += len(chunk)
+        return sha1.hexdigest(), size
+    
+    @api.model
+    def _create_from_file(self, fileobj, vals):
+        """Create an attachment from a seekable binary file object.
+        
+        The content is hashed and copied into the filestore in chunks, so
+        memory use does not grow with the file size. Each upload gets its
+        own attachment, while identical content shares one filestore blob.
+        Databases storing attachments in the database fall back to a
+        regular create.
+        """
+        fileobj.seek(0)
+        if self._storage() == 'db':
+            return self.create(dict(vals, raw=fileobj.read()))
+        
+        head = fileobj.read(self._MIMETYPE_SNIFF_SIZE)
+        checksum, size = self._hash_file(fileobj)
+        fname = f'{checksum[:2]}/{checksum}'
+        full_path = self._full_path(fname)
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            fileobj.seek(0)
+            with open(full_path, 'wb') as target:
+                shutil.copyfileobj(fileobj, target, self._STREAM_CHUNK_SIZE)
+            # A new blob is only left unreferenced if the transaction fails
+            self.env.cr.postrollback.add(partial(self._mark_for_gc, fname))
+        
+        # create() drops store_fname, checksum and file_size, so the
+        # content is linked afterwards like _file_write callers do
+        attachment = self.create(dict(
+            vals,
+            mimetype=self._compute_mimetype({'name': vals.get('name'), 'mimetype': vals.get('mimetype'), 'raw': head}),
+            type='binary',
+        ))
+        attachment.flush_recordset()
+        self.env.cr.execute(SQL(
+            """
+            UPDATE ir_attachment
+               SET store_fname = %s, checksum = %s, file_size = %s, db_datas = NULL
+             WHERE id = %s
+            """,
+            fname, checksum, size, attachment.id,
+        ))
+        attachment.invalidate_recordset(['store_fname', 'checksum', 'file_size', 'db_datas', 'raw', 'datas'])
+        return attachment
+    
+    # ==========================================
+    # Thumbnails
+    # ==========================================
+    
+    def _get_thumbnail(self):
+        """Return the cached thumbnail of an image attachment, generating it once.
+        
+        Thumbnails are attachments of the source attachment, so lists of
+        attachments only ever transfer small images. Non-image content
+        has no thumbnail (an empty recordset is returned). A unique index
+        keeps concurrent requests from storing the thumbnail twice; the
+        request losing the race serves the image itself.
+        """
+        self.ensure_one()
+        if not (self.mimetype or '').startswith('image/') or self.mimetype == 'image/svg+xml':
+            return self.browse()
+        Attachment = self.sudo()
+        name = f'thumbnail_{self.checksum}'
+        thumbnail = Attachment.search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('name', '=', name),
+        ], limit=1)
+        if thumbnail:
+            return thumbnail
+        try:
+            raw = image_process(self.sudo().raw, size=THUMBNAIL_SIZE)
+        except (UserError, ValueError, OSError):
+            return self.browse()
+        try:
+            with mute_logger('odoo.sql_db'), self.env.cr.savepoint():
+                return Attachment.create({
+                    'name': name,
+                    'raw': raw,
+                    'mimetype': self.mimetype,
+                    'res_model': self._name,
+                    'res_id': self.id,
+                })
+        except UniqueViolation:
+            return self
+    
+    def unlink(self):
+        """Drop the cached thumbnails along with their attachments"""
+        thumbnails = self.sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('name', '=like', 'thumbnail_%'),
+        ])
+        result = super().unlink()
+        thumbnails.unlink()
+        return result
@@ -0,0 +1,35 @@
+from odoo import models, api
+
+
+class IrSequence(models.Model):
+    """Extend sequences with bulk reservation of references"""
+    
+    _inherit = 'ir.sequence'
+    
+    @api.model
+    def _next_by_code_multi(self, sequence_code, count):
+        """Reserve `count` references of a sequence in one round trip.
+        
+        Standard sequences draw all numbers with a single nextval() over
+        generate_series(); other implementations fall back to one call
+        per reference. Returns a list of formatted references, or
+        'New' placeholders when no sequence is defined.
+        """
+        if count <= 0:
+            return []
+        self.check_access('read')
+        company_id = self.env.company.id
+        sequence = self.sudo().search([
+            ('code', '=', sequence_code),
+            ('company_id', 'in', [company_id, False]),
+        ], order='company_id', limit=1)
+        if not sequence:
+            return ['New'] * count
+        if sequence.implementation != 'standard' or sequence.use_date_range:
+            return [sequence._next() for _ in range(count)]
+        
+        self.env.cr.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            ['ir_sequence_%03d' % sequence.id, count],
+        )
+        return [sequence.get_next_char(number) for number, in self.env.cr.fetchall()]
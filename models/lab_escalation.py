@@ -0,0 +1,323 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class HospitalLabEscalation(models.Model):
+    """Queue of critical lab results to escalate to the ordering doctor.
+    
+    Escalations are queued when a test is completed and handled by a
+    background worker, so completing tests costs a single insert.
+    """
+    
+    _name = 'hospital.lab.escalation'
+    _description = 'Critical Lab Result Escalation'
+    _rec_name = 'test_id'
+    _order = 'queued_at desc, id desc'
+    
+    # Queued escalations handled per worker batch
+    _BATCH_SIZE = 200
+    
+    test_id = fields.Many2one(
+        comodel_name='hospital.lab.test',
+        string='Lab Test',
+        required=True,
+        ondelete='cascade'
+    )
+    
+    line_id = fields.Many2one(
+        comodel_name='hospital.lab.test.line',
+        string='Result Line',
+        ondelete='set null'
+    )
+    
+    patient_id = fields.Many2one(
+        related='test_id.patient_id',
+        string='Patient',
+        store=True
+    )
+    
+    doctor_id = fields.Many2one(
+        comodel_name='hospital.doctor',
+        string='Ordering Doctor'
+    )
+    
+    parameter_name = fields.Char(
+        string='Parameter'
+    )
+    
+    result_value = fields.Char(
+        string='Result'
+    )
+    
+    dedup_key = fields.Char(
+        string='Deduplication Key',
+        required=True,
+        index=True,
+        help='Patient and parameter; one escalation per key and window is sent'
+    )
+    
+    state = fields.Selection(
+        selection=[
+            ('queued', 'Queued'),
+            ('notified', 'Notified'),
+            ('undeliverable', 'Undeliverable'),
+            ('acknowledged', 'Acknowledged'),
+            ('suppressed', 'Duplicate'),
+        ],
+        string='Status',
+        default='queued',
+        required=True,
+        index=True
+    )
+    
+    duplicate_of_id = fields.Many2one(
+        comodel_name='hospital.lab.escalation',
+        string='Duplicate Of',
+        ondelete='set null'
+    )
+    
+    activity_id = fields.Many2one(
+        comodel_name='mail.activity',
+        string='Activity',
+        ondelete='set null'
+    )
+    
+    queued_at = fields.Datetime(
+        string='Queued At',
+        required=True,
+        default=fields.Datetime.now
+    )
+    
+    notified_at = fields.Datetime(
+        string='Notified At'
+    )
+    
+    failure_reason = fields.Char(
+        string='Failure Reason',
+        readonly=True,
+        help='Why the doctor could not be notified'
+    )
+    
+    acknowledged_at = fields.Datetime(
+        string='Acknowledged At'
+    )
+    
+    acknowledged_by_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Acknowledged By'
+    )
+    
+    time_to_notify = fields.Float(
+        string='Time to Notify (min)',
+        compute='_compute_durations',
+        store=True,
+        aggregator='avg'
+    )
+    
+    time_to_ack = fields.Float(
+        string='Time to Acknowledge (min)',
+        compute='_compute_durations',
+        store=True,
+        aggregator='avg'
+    )
+    
+    @api.depends('queued_at', 'notified_at', 'acknowledged_at')
+    def _compute_durations(self):
+        """Minutes from queueing to notification and to acknowledgement"""
+        for record in self:
+            record.time_to_notify = (
+                (record.notified_at - record.queued_at).total_seconds() / 60
+                if record.notified_at and record.queued_at else 0.0
+            )
+            record.time_to_ack = (
+                (record.acknowledged_at - record.queued_at).total_seconds() / 60
+                if record.acknowledged_at and record.queued_at else 0.0
+            )
+    
+    # ==========================================
+    # Queueing
+    # ==========================================
+    
+    @api.model
+    def _enqueue(self, tests):
+        """Queue escalations for the critical results of completed tests"""
+        vals_list = []
+        for test in tests.filtered(lambda t: t.result_status == 'critical'):
+            doctor = test.doctor_id or test.patient_id.doctor_id
+            lines = test.line_ids.filtered('is_critical')
+            for line in lines:
+                key = line.parameter_id.id or (line.parameter_name or '').strip().lower()
+                vals_list.append({
+                    'test_id': test.id,
+                    'line_id': line.id,
+                    'doctor_id': doctor.id,
+                    'parameter_name': line.parameter_name,
+                    'result_value': line.result_value,
+                    'dedup_key': f'{test.patient_id.id}:{key}',
+                })
+            if not lines:
+                vals_list.append({
+                    'test_id': test.id,
+                    'doctor_id': doctor.id,
+                    'parameter_name': test.test_name,
+                    'dedup_key': f'{test.patient_id.id}:test-{test.test_type.id}',
+                })
+        if not vals_list:
+            return self.browse()
+        escalations = self.sudo().create(vals_list)
+        cron = self.env.ref('hospital_management.ir_cron_process_lab_escalations', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return escalations
+    
+    # ==========================================
+    # Worker
+    # ==========================================
+    
+    @api.model
+    def _get_dedup_window(self):
+        """Window (hours) during which repeated results are not re-escalated"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'hospital_management.critical_escalation_window_hours', 6
+        ))
+    
+    def _deduplicate(self):
+        """Split queued escalations into ones to send and duplicates.
+        
+        An escalation is a duplicate when the same key was already
+        escalated within the window, or earlier in this batch.
+        """
+        since = fields.Datetime.now() - timedelta(hours=self._get_dedup_window())
+        recent = {
+            esc['dedup_key']: esc['id']
+            for esc in self.search_read([
+                ('dedup_key', 'in', list(set(self.mapped('dedup_key')))),
+                ('state', 'in', ('notified', 'acknowledged')),
+                ('queued_at', '>=', since),
+            ], ['dedup_key'], order='queued_at asc')
+        }
+        to_send = self.browse()
+        duplicates = defaultdict(list)
+        for escalation in self.sorted(lambda e: (e.queued_at, e.id)):
+            original_id = recent.get(escalation.dedup_key)
+            if original_id:
+                duplicates[original_id].append(escalation.id)
+            else:
+                recent[escalation.dedup_key] = escalation.id
+                to_send |= escalation
+        return to_send, duplicates
+    
+    def _prepare_activity_vals(self, activity_type, model_id):
+        """Values of the to-do activity asking the doctor to acknowledge"""
+        self.ensure_one()
+        return {
+            'res_model_id': model_id,
+            'res_id': self.test_id.id,
+            'activity_type_id': activity_type.id,
+            'user_id': self.doctor_id.user_id.id,
+            'summary': f'Critical result: {self.parameter_name} = {self.result_value or "-"}',
+            'note': f'Critical lab result for {self.patient_id.name} ({self.test_id.reference}). '
+                    f'Please review and acknowledge.',
+            'date_deadline': fields.Date.context_today(self),
+        }
+    
+    def _notify(self):
+        """Fan escalations out to doctors as activities and queued emails.
+        
+        Each escalation is notified in its own savepoint: one that fails,
+        or whose doctor has neither a user nor an email, is marked
+        undeliverable with the reason and the rest of the batch goes on.
+        """
+        activity_type = self.env.ref('mail.mail_activity_data_todo')
+        model_id = self.env['ir.model']._get_id('hospital.lab.test')
+        template = self.env.ref('hospital_management.email_template_lab_critical_result', raise_if_not_found=False)
+        for escalation in self:
+            doctor = escalation.doctor_id
+            if not doctor.user_id and not (template and doctor.email):
+                escalation.write({
+                    'state': 'undeliverable',
+                    'failure_reason': f'Dr. {doctor.name} has no user or email' if doctor else 'No ordering doctor',
+                })
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    if doctor.user_id:
+                        escalation.activity_id = self.env['mail.activity'].create(
+                            escalation._prepare_activity_vals(activity_type, model_id)
+                        )
+                    if template and doctor.email:
+                        template.send_mail(escalation.id)
+                    escalation.write({'state': 'notified', 'notified_at': fields.Datetime.now()})
+            except Exception as e:
+                _logger.exception("Could not notify critical escalation %s", escalation.id)
+                escalation.write({'state': 'undeliverable', 'failure_reason': str(e)})
+    
+    @api.model
+    def _cron_process_queue(self, batch_size=None, auto_commit=True):
+        """Deduplicate and send queued escalations in batches"""
+        batch_size = batch_size or self._BATCH_SIZE
+        while True:
+            queued = self.search([('state', '=', 'queued')], order='queued_at, id', limit=batch_size)
+            if not queued:
+                break
+            to_send, duplicates = queued._deduplicate()
+            for original_id, duplicate_ids in duplicates.items():
+                self.browse(duplicate_ids).write({
+                    'state': 'suppressed',
+                    'duplicate_of_id': original_id,
+                })
+            to_send._notify()
+            if auto_commit:
+                self.env.cr.commit()
+            if len(queued) < batch_size:
+                break
+    
+    # ==========================================
+    # Acknowledgement
+    # ==========================================
+    
+    def _acknowledge(self):
+        """Record the acknowledgement of open escalations and their duplicates"""
+        pending = self.filtered(lambda e: e.state in ('queued', 'notified', 'undeliverable'))
+        pending |= self.search([
+            ('duplicate_of_id', 'in', pending.ids),
+            ('acknowledged_at', '=', False),
+        ])
+        pending.write({
+            'state': 'acknowledged',
+            'acknowledged_at': fields.Datetime.now(),
+            'acknowledged_by_id': self.env.user.id,
+        })
+        return pending
+    
+    def action_acknowledge(self):
+        """Acknowledge escalations and close their activities"""
+        pending = self._acknowledge()
+        activities = pending.activity_id
+        if activities:
+            activities.with_context(hospital_escalation_acknowledged=True).action_done()
+        return True
+    
+    @api.model
+    def get_ack_metrics(self, date_from=None):
+        """Average and worst time-to-acknowledge (minutes) per doctor"""
+        domain = [('state', '=', 'acknowledged'), ('duplicate_of_id', '=', False)]
+        if date_from:
+            domain.append(('queued_at', '>=', date_from))
+        return [
+            {
+                'doctor_id': doctor.id,
+                'doctor': doctor.name,
+                'count': count,
+                'avg_minutes': avg,
+                'max_minutes': worst,
+            }
+            for doctor, count, avg, worst in self._read_group(
+                domain, ['doctor_id'], ['__count', 'time_to_ack:avg', 'time_to_ack:max'],
+            )
+        ]
@@ -0,0 +1,123 @@
+"""Parsing and evaluation of lab reference ranges.
+
+Reference ranges are free text such as ``80-120``, ``<5.7`` or ``>100``.
+They are compiled once into a numeric interval and cached, so evaluating
+thousands of result lines only costs a dictionary lookup per distinct
+range text.
+"""
+
+import math
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# "1,200" groups thousands; any other comma is a decimal separator ("1,5")
+_THOUSANDS = r'\d{1,3}(?:,\d{3})+(?:\.\d+)?(?!\d)'
+_NUMBER = rf'[-+]?(?:{_THOUSANDS}|\d+(?:[.,]\d+)?)'
+_THOUSANDS_RE = re.compile(rf'[-+]?{_THOUSANDS}')
+_NUMBER_RE = re.compile(_NUMBER)
+
+_INTERVAL_RE = re.compile(
+    rf'^\s*(?P<low>{_NUMBER})\s*(?:-|–|—|to)\s*(?P<high>{_NUMBER})', re.IGNORECASE
+)
+_BOUND_RE = re.compile(rf'^\s*(?P<op><=|>=|=<|=>|<|>|≤|≥)\s*(?P<value>{_NUMBER})')
+_VALUE_RE = re.compile(rf'^\s*(?P<op><=|>=|=<|=>|<|>|≤|≥)?\s*(?P<value>{_NUMBER})')
+
+_LOWER_OPS = {'>': False, '>=': True, '=>': True, '≥': True}
+_UPPER_OPS = {'<': False, '<=': True, '=<': True, '≤': True}
+
+Interval = namedtuple('Interval', ['low', 'high', 'low_inclusive', 'high_inclusive'])
+Result = namedtuple('Result', ['value', 'comparator'])
+
+
+def _to_float(text):
+    if _THOUSANDS_RE.fullmatch(text):
+        return float(text.replace(',', ''))
+    return float(text.replace(',', '.'))
+
+
+def parse_number(text):
+    """Return the value of a text holding only a finite number, or None.
+
+    Commas follow the rules of reference ranges: ``1,200`` is 1200 and
+    ``1,5`` is 1.5.
+    """
+    text = (text or '').strip()
+    if not _NUMBER_RE.fullmatch(text):
+        return None
+    value = _to_float(text)
+    return value if math.isfinite(value) else None
+
+
+@lru_cache(maxsize=2048)
+def parse_range(text):
+    """Compile a reference range into an Interval, or None if not numeric.
+
+    Open bounds are None: ``<5.7`` gives ``Interval(None, 5.7, False, False)``.
+    """
+    if not text:
+        return None
+    match = _INTERVAL_RE.match(text)
+    if match:
+        low, high = _to_float(match['low']), _to_float(match['high'])
+        if low > high:
+            low, high = high, low
+        return Interval(low, high, True, True)
+    match = _BOUND_RE.match(text)
+    if match:
+        op, value = match['op'], _to_float(match['value'])
+        if op in _LOWER_OPS:
+            return Interval(value, None, _LOWER_OPS[op], False)
+        return Interval(None, value, False, _UPPER_OPS[op])
+    return None
+
+
+@lru_cache(maxsize=8192)
+def parse_result(text):
+    """Return the Result of a numeric result text, or None if not numeric.
+
+    Results at a detection limit keep their comparator (``<0.1`` gives
+    ``Result(0.1, '<')``); trailing units or flags (``12.5 H``) are
+    ignored.
+    """
+    if not text:
+        return None
+    match = _VALUE_RE.match(text)
+    return Result(_to_float(match['value']), match['op']) if match else None
+
+
+def parse_value(text):
+    """Return the numeric value of a result, or None if it is not numeric"""
+    result = parse_result(text)
+    return result.value if result else None
+
+
+def is_outside(interval, value, comparator=None):
+    """Whether a value falls outside an interval.
+
+    With a comparator, the value is a detection limit: ``<0.1`` stands
+    for anything below 0.1 and is only outside when all of those values
+    are, so it is normal against a range of ``<0.1`` but low against
+    ``0.5-1``.
+    """
+    if comparator in _UPPER_OPS:
+        # Any value below the limit: outside only when under the low bound
+        if interval.low is None:
+            return False
+        return value < interval.low or (
+            value == interval.low and not (_UPPER_OPS[comparator] and interval.low_inclusive)
+        )
+    if comparator in _LOWER_OPS:
+        # Any value above the limit: outside only when over the high bound
+        if interval.high is None:
+            return False
+        return value > interval.high or (
+            value == interval.high and not (_LOWER_OPS[comparator] and interval.high_inclusive)
+        )
+    if interval.low is not None:
+        if value < interval.low or (value == interval.low and not interval.low_inclusive):
+            return True
+    if interval.high is not None:
+        if value > interval.high or (value == interval.high and not interval.high_inclusive):
+            return True
+    return False
@@ -0,0 +1,479 @@
+import csv
+import io
+import logging
+import os
+import re
+import shutil
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import split_every, SQL
+
+_logger = logging.getLogger(__name__)
+
+# Accepted CSV header names for each result column
+CSV_COLUMNS = {
+    'reference': ('reference', 'test_reference', 'sample_id', 'specimen_id'),
+    'parameter': ('parameter', 'code', 'parameter_code', 'test_code'),
+    'value': ('value', 'result', 'result_value'),
+    'unit': ('unit', 'units'),
+}
+
+# ASTM framing characters and frame numbers around records
+_ASTM_FRAMING_RE = re.compile(r'^[\x02\x05]?\d?(?=[A-Z]\|)|[\x03\x04\x17].*$')
+
+
+class HospitalLabResultImport(models.Model):
+    """Import of analyzer result files into lab test lines"""
+    
+    _name = 'hospital.lab.result.import'
+    _description = 'Lab Result Import'
+    _inherit = ['mail.thread']
+    _order = 'create_date desc, id desc'
+    
+    # Parsed rows matched and written per chunk
+    _CHUNK_SIZE = 5000
+    
+    # Tests completed per batched transition
+    _COMPLETE_BATCH_SIZE = 1000
+    
+    name = fields.Char(
+        string='Reference',
+        required=True,
+        readonly=True,
+        copy=False,
+        default='New'
+    )
+    
+    source = fields.Selection(
+        selection=[
+            ('upload', 'Upload'),
+            ('directory', 'Drop Directory'),
+        ],
+        string='Source',
+        required=True,
+        default='upload'
+    )
+    
+    file = fields.Binary(
+        string='Result File',
+        attachment=True,
+        help='Analyzer export: CSV (reference, parameter, value, unit) or '
+             'ASTM/HL7 pipe-delimited text'
+    )
+    
+    filename = fields.Char(
+        string='File Name'
+    )
+    
+    file_format = fields.Selection(
+        selection=[
+            ('auto', 'Detect'),
+            ('csv', 'CSV'),
+            ('astm', 'ASTM / HL7'),
+        ],
+        string='Format',
+        required=True,
+        default='auto'
+    )
+    
+    unmatched_ids = fields.One2many(
+        comodel_name='hospital.lab.result.import.unmatched',
+        inverse_name='import_id',
+        string='Unmatched Rows'
+    )
+    
+    row_count = fields.Integer(
+        string='Rows Read',
+        readonly=True
+    )
+    
+    result_count = fields.Integer(
+        string='Results Written',
+        readonly=True
+    )
+    
+    test_count = fields.Integer(
+        string='Tests Completed',
+        readonly=True
+    )
+    
+    unmatched_count = fields.Integer(
+        string='Unmatched Rows',
+        readonly=True
+    )
+    
+    state = fields.Selection(
+        selection=[
+            ('draft', 'Draft'),
+            ('done', 'Imported'),
+        ],
+        string='Status',
+        default='draft',
+        tracking=True
+    )
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Generate sequence number for reference"""
+        for vals in vals_list:
+            if vals.get('name', 'New') == 'New':
+                vals['name'] = self.env['ir.sequence'].next_by_code(
+                    'hospital.lab.result.import'
+                ) or 'New'
+        return super().create(vals_list)
+    
+    # ==========================================
+    # File Parsing
+    # ==========================================
+    
+    def _open_file(self):
+        """Open the stored result file as a binary stream without loading it"""
+        self.ensure_one()
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'file'),
+        ], limit=1)
+        if not attachment:
+            raise UserError('Please upload the result file first.')
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw)
+    
+    def _detect_format(self, stream):
+        """Guess the file format from the first non-empty line"""
+        if self.file_format != 'auto':
+            return self.file_format
+        for line in stream:
+            line = _ASTM_FRAMING_RE.sub('', line).strip()
+            if line:
+                return 'astm' if re.match(r'^[A-Z][A-Z0-9]{0,2}\|', line) else 'csv'
+        return 'csv'
+    
+    @api.model
+    def _iter_csv_rows(self, stream):
+        """Yield result rows from a CSV analyzer export"""
+        reader = csv.reader(stream)
+        header = [name.strip().lower() for name in next(reader, [])]
+        positions = {}
+        for column, aliases in CSV_COLUMNS.items():
+            positions[column] = next((header.index(a) for a in aliases if a in header), None)
+        if positions['reference'] is None or positions['parameter'] is None or positions['value'] is None:
+            raise UserError('The result file needs reference, parameter and value columns.')
+        
+        for line_number, row in enumerate(reader, start=2):
+            if not any(row):
+                continue
+            yield {
+                'line_number': line_number,
+                **{
+                    column: row[position].strip() if position is not None and position < len(row) else ''
+                    for column, position in positions.items()
+                },
+            }
+    
+    @api.model
+    def _iter_astm_rows(self, stream):
+        """Yield result rows from ASTM E1394 or HL7 v2 pipe-delimited text.
+        
+        The test reference is taken from the order record (ASTM ``O``
+        specimen id, HL7 ``OBR`` placer or filler number) and applies to
+        the result records (ASTM ``R``, HL7 ``OBX``) that follow it.
+        """
+        reference = ''
+        for line_number, line in enumerate(stream, start=1):
+            line = _ASTM_FRAMING_RE.sub('', line).strip()
+            if not line:
+                continue
+            segment = line.split('|')
+            record_type = segment[0]
+            if record_type in ('O', 'OBR'):
+                reference = _component(segment, 2) or _component(segment, 3)
+            elif record_type == 'R':
+                yield {
+                    'line_number': line_number,
+                    'reference': reference,
+                    'parameter': _last_component(segment, 2),
+                    'value': _field(segment, 3),
+                    'unit': _field(segment, 4),
+                }
+            elif record_type == 'OBX':
+                yield {
+                    'line_number': line_number,
+                    'reference': reference,
+                    'parameter': _component(segment, 3),
+                    'value': _field(segment, 5),
+                    'unit': _component(segment, 6),
+                }
+    
+    def _iter_rows(self, fileobj):
+        """Stream-parse an open binary file into result rows"""
+        self.ensure_one()
+        stream = io.TextIOWrapper(fileobj, encoding='utf-8-sig', errors='replace', newline=None)
+        file_format = self._detect_format(stream)
+        stream.seek(0)
+        if file_format == 'astm':
+            return self._iter_astm_rows(stream)
+        return self._iter_csv_rows(stream)
+    
+    # ==========================================
+    # Matching and Writing
+    # ==========================================
+    
+    def _load_tests(self, references, tests):
+        """Add unknown references to the test cache in two queries.
+        
+        `tests` maps a reference to a dict with the test id, its state
+        and its lines keyed by lowercase parameter name and code.
+        """
+        missing = [ref for ref in references if ref not in tests]
+        if not missing:
+            return
+        for ref in missing:
+            tests[ref] = None
+        for test in self.env['hospital.lab.test'].search_read(
+            [('reference', 'in', missing)], ['reference', 'state'],
+        ):
+            tests[test['reference']] = {'id': test['id'], 'state': test['state'], 'lines': {}}
+        
+        by_id = {test['id']: test for test in tests.values() if test and not test['lines']}
+        if not by_id:
+            return
+        self.env['hospital.lab.test.line'].flush_model(['test_id', 'parameter_name', 'parameter_id'])
+        self.env['hospital.lab.test.parameter'].flush_model(['code'])
+        self.env.cr.execute("""
+            SELECT l.test_id, l.id, LOWER(l.parameter_name), LOWER(p.code)
+              FROM hospital_lab_test_line l
+         LEFT JOIN hospital_lab_test_parameter p ON p.id = l.parameter_id
+             WHERE l.test_id = ANY(%s)
+        """, [list(by_id)])
+        for test_id, line_id, name, code in self.env.cr.fetchall():
+            lines = by_id[test_id]['lines']
+            if name:
+                lines.setdefault(name, line_id)
+            if code:
+                lines.setdefault(code, line_id)
+    
+    def _process_chunk(self, rows, tests, updated_ids):
+        """Match one chunk of rows and bulk-write the results.
+        
+        All values of the chunk are written with a single UPDATE. Returns
+        (results written, unmatched row values).
+        """
+        self._load_tests({row['reference'] for row in rows if row['reference']}, tests)
+        
+        values_by_line = {}
+        unmatched_vals = []
+        for row in rows:
+            reason = None
+            test = tests.get(row['reference'])
+            if not row['reference'] or not test:
+                reason = 'no_test'
+            elif test['state'] not in ('requested', 'in_progress'):
+                reason = 'invalid_state'
+            elif not row['value']:
+                reason = 'no_value'
+            else:
+                line_id = test['lines'].get(row['parameter'].lower())
+                if not line_id:
+                    reason = 'no_parameter'
+                else:
+                    values_by_line[line_id] = row['value']
+                    updated_ids.add(test['id'])
+            if reason:
+                unmatched_vals.append({
+                    'import_id': self.id,
+                    'line_number': row['line_number'],
+                    'test_reference': row['reference'],
+                    'parameter': row['parameter'],
+                    'value': row['value'],
+                    'reason': reason,
+                })
+        
+        self._write_results(values_by_line)
+        self.env['hospital.lab.result.import.unmatched'].create(unmatched_vals)
+        return len(values_by_line), len(unmatched_vals)
+    
+    def _write_results(self, values_by_line):
+        """Write {line id: result value} with one UPDATE.
+        
+        Result flags and other fields depending on the value are then
+        recomputed through ``modified``.
+        """
+        if not values_by_line:
+            return
+        Line = self.env['hospital.lab.test.line']
+        Line.flush_model(['result_value'])
+        self.env.cr.execute(SQL("""
+            UPDATE hospital_lab_test_line l
+               SET result_value = t.value,
+                   write_uid = %(uid)s,
+                   write_date = (now() at time zone 'UTC')
+              FROM unnest(%(ids)s::int[], %(values)s::varchar[]) AS t(id, value)
+             WHERE l.id = t.id
+        """, uid=self.env.uid, ids=list(values_by_line), values=list(values_by_line.values())))
+        lines = Line.browse(list(values_by_line))
+        lines.invalidate_recordset(['result_value', 'write_uid', 'write_date'])
+        lines.modified(['result_value'])
+    
+    def _complete_tests(self, test_ids):
+        """Move the tests that received results forward in batches.
+        
+        Tests start once they have a result and are only completed when
+        every line has a value. Returns the number of tests completed.
+        """
+        Test = self.env['hospital.lab.test'].with_context(
+            tracking_disable=True, hospital_lab_result_import=True,
+        )
+        completed_count = 0
+        for chunk in split_every(self._COMPLETE_BATCH_SIZE, sorted(test_ids)):
+            tests = Test.browse(chunk)
+            tests.filtered(lambda t: t.state == 'requested').write({'state': 'in_progress'})
+            complete = tests.filtered(lambda t: all(t.line_ids.mapped('result_value')))
+            complete.action_complete()
+            completed_count += len(complete.filtered(lambda t: t.state == 'completed'))
+        return completed_count
+    
+    def _import(self, fileobj):
+        """Import an open result file and record the outcome"""
+        self.ensure_one()
+        tests = {}
+        updated_ids = set()
+        row_count = result_count = unmatched_count = 0
+        
+        for rows in split_every(self._CHUNK_SIZE, self._iter_rows(fileobj), list):
+            written, unmatched = self._process_chunk(rows, tests, updated_ids)
+            row_count += len(rows)
+            result_count += written
+            unmatched_count += unmatched
+        completed_count = self._complete_tests(updated_ids)
+        
+        self.write({
+            'state': 'done',
+            'row_count': row_count,
+            'result_count': result_count,
+            'test_count': completed_count,
+            'unmatched_count': unmatched_count,
+        })
+        self.message_post(
+            body=f'Imported {result_count} results into {len(updated_ids)} tests, '
+                 f'{completed_count} of them completed; {unmatched_count} unmatched rows.'
+        )
+    
+    def action_import(self):
+        """Parse the uploaded file and write its results"""
+        for record in self:
+            if record.state != 'draft':
+                raise UserError('This result file has already been imported.')
+            with record._open_file() as fileobj:
+                record._import(fileobj)
+        return True
+    
+    # ==========================================
+    # Drop Directory
+    # ==========================================
+    
+    @api.model
+    def _get_drop_directory(self):
+        """Directory watched for analyzer exports (empty to disable)"""
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'hospital_management.lab_result_drop_dir', ''
+        )
+    
+    @api.model
+    def _cron_import_drop_directory(self, auto_commit=True):
+        """Import every file found in the drop directory.
+        
+        Each file is imported in its own transaction, then moved to the
+        ``processed`` (or ``failed``) sub-directory.
+        """
+        directory = self._get_drop_directory()
+        if not directory or not os.path.isdir(directory):
+            return
+        
+        for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+            if not entry.is_file() or entry.name.startswith('.'):
+                continue
+            target = 'processed'
+            try:
+                with open(entry.path, 'rb') as fileobj:
+                    record = self.create({
+                        'source': 'directory',
+                        'filename': entry.name,
+                    })
+                    self.env['ir.attachment']._create_from_file(fileobj, {
+                        'name': entry.name,
+                        'res_model': self._name,
+                        'res_id': record.id,
+                        'res_field': 'file',
+                    })
+                    fileobj.seek(0)
+                    record._import(fileobj)
+                if auto_commit:
+                    self.env.cr.commit()
+            except Exception:
+                _logger.exception('Lab result import of %s failed', entry.path)
+                if not auto_commit:
+                    raise
+                self.env.cr.rollback()
+                target = 'failed'
+            os.makedirs(os.path.join(directory, target), exist_ok=True)
+            shutil.move(entry.path, os.path.join(directory, target, entry.name))
+            self.env.invalidate_all()
+
+
+class HospitalLabResultImportUnmatched(models.Model):
+    """Result file rows that could not be written to a test line"""
+    
+    _name = 'hospital.lab.result.import.unmatched'
+    _description = 'Unmatched Lab Result Row'
+    _order = 'import_id, line_number'
+    
+    import_id = fields.Many2one(
+        comodel_name='hospital.lab.result.import',
+        string='Import',
+        required=True,
+        ondelete='cascade'
+    )
+    
+    line_number = fields.Integer(
+        string='Line'
+    )
+    
+    test_reference = fields.Char(
+        string='Test Reference'
+    )
+    
+    parameter = fields.Char(
+        string='Parameter'
+    )
+    
+    value = fields.Char(
+        string='Value'
+    )
+    
+    reason = fields.Selection(
+        selection=[
+            ('no_test', 'No Lab Test Found'),
+            ('invalid_state', 'Test Not Awaiting Results'),
+            ('no_parameter', 'No Matching Parameter'),
+            ('no_value', 'Empty Result'),
+        ],
+        string='Reason'
+    )
+
+
+def _field(segment, index):
+    """Field of a pipe-delimited record, or an empty string"""
+    return segment[index].strip() if index < len(segment) else ''
+
+
+def _component(segment, index):
+    """First non-empty ``^`` component of a field"""
+    return next((part for part in _field(segment, index).split('^') if part), '')
+
+
+def _last_component(segment, index):
+    """Last non-empty ``^`` component of a field (ASTM universal test id)"""
+    return next((part for part in reversed(_field(segment, index).split('^')) if part), '')
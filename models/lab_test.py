@@ -1,5 +1,11 @@
-from odoo import models, fields, api
-from odoo.exceptions import ValidationError
+from odoo import models, fields, api, tools
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import create_index, drop_index, split_every, SQL
+
+from .lab_range import Interval, parse_range, parse_result, is_outside
+
+# Worklist rank of each priority (lowest is served first)
+PRIORITY_RANKS = {'stat': 0, 'urgent': 1, 'routine': 2}
 
 
 class HospitalLabTest(models.Model):
@@ -7,10 +13,13 @@ class HospitalLabTest(models.Model):
     
     _name = 'hospital.lab.test'
     _description = 'Laboratory Test'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['hospital.audit.mixin', 'mail.thread', 'mail.activity.mixin']
     _rec_name = 'reference'
     _order = 'test_date desc'
     
+    # Worklist order: STAT first, then oldest first
+    _WORKLIST_ORDER = 'priority_rank, test_date, id'
+    
     # Basic Fields
     reference = fields.Char(
         string='Test Reference',
@@ -76,6 +85,12 @@ class HospitalLabTest(models.Model):
         tracking=True
     )
     
+    completed_at = fields.Datetime(
+        string='Completed On',
+        readonly=True,
+        copy=False
+    )
+    
     line_ids = fields.One2many(
         comodel_name='hospital.lab.test.line',
         inverse_name='test_id',
@@ -160,6 +175,9 @@ class HospitalLabTest(models.Model):
             ('critical', 'Critical'),
         ],
         string='Result Status',
+        compute='_compute_result_status',
+        store=True,
+        readonly=False,
         tracking=True
     )
     
@@ -174,6 +192,28 @@ class HospitalLabTest(models.Model):
         tracking=True
     )
     
+    escalation_ids = fields.One2many(
+        comodel_name='hospital.lab.escalation',
+        inverse_name='test_id',
+        string='Critical Escalations'
+    )
+    
+    escalation_count = fields.Integer(
+        string='Escalation Count',
+        compute='_compute_critical_pending'
+    )
+    
+    critical_pending = fields.Boolean(
+        string='Critical Result Unacknowledged',
+        compute='_compute_critical_pending'
+    )
+    
+    priority_rank = fields.Integer(
+        string='Priority Rank',
+        compute='_compute_priority_rank',
+        store=True
+    )
+    
     active = fields.Boolean(
         string='Active',
         default=True
@@ -193,6 +233,21 @@ class HospitalLabTest(models.Model):
         for record in self:
             record.attachment_count = len(record.attachment_ids)
     
+    @api.depends('escalation_ids.state')
+    def _compute_critical_pending(self):
+        """Whether a critical result still waits for the doctor"""
+        for record in self:
+            record.escalation_count = len(record.escalation_ids)
+            record.critical_pending = any(
+                escalation.state in ('queued', 'notified', 'undeliverable') for escalation in record.escalation_ids
+            )
+    
+    @api.depends('priority')
+    def _compute_priority_rank(self):
+        """Rank used to serve STAT tests first in the worklist"""
+        for record in self:
+            record.priority_rank = PRIORITY_RANKS.get(record.priority, len(PRIORITY_RANKS))
+    
     # ==========================================
     # Onchange Methods
     # ==========================================
@@ -213,16 +268,10 @@ class HospitalLabTest(models.Model):
     @api.onchange('test_type')
     def _onchange_test_type(self):
         """Auto-create test lines based on test type"""
-        if self.test_type and self.test_type.parameter_ids:
-            lines = []
-            for param in self.test_type.parameter_ids:
-                lines.append((0, 0, {
-                    'parameter_name': param.name,
-                    'unit': param.unit,
-                    'normal_range': param.normal_range,
-                    'sequence': param.sequence,
-                }))
-            self.line_ids = lines
+        if self.test_type:
+            lines = self.test_type._get_line_commands()
+            if lines:
+                self.line_ids = lines
     
     # ==========================================
     # Constraints
@@ -244,14 +293,53 @@ class HospitalLabTest(models.Model):
     
     @api.model_create_multi
     def create(self, vals_list):
-        """Generate sequence number for reference"""
+        """Generate sequence numbers for references and result lines from
+        the test type when none are given"""
+        to_number = [vals for vals in vals_list if vals.get('reference', 'New') == 'New']
+        references = self.env['ir.sequence']._next_by_code_multi(
+            'hospital.lab.test', len(to_number)
+        )
+        for vals, reference in zip(to_number, references):
+            vals['reference'] = reference
+        
+        TestType = self.env['hospital.lab.test.type']
         for vals in vals_list:
-            if vals.get('reference', 'New') == 'New':
-                vals['reference'] = self.env['ir.sequence'].next_by_code(
-                    'hospital.lab.test'
-                ) or 'New'
+            if vals.get('test_type') and 'line_ids' not in vals:
+                vals['line_ids'] = TestType.browse(vals['test_type'])._get_line_commands()
         return super().create(vals_list)
     
+    @api.model
+    def create_orders(self, patient_ids, test_type_ids, doctor_id=None,
+                      priority='routine', test_date=None, request=True):
+        """Order every test type for every patient in one batched create.
+        
+        Each patient's own doctor orders the test unless a doctor is
+        given; patients without a doctor then raise a UserError. With
+        `request`, tests are created directly as requested.
+        """
+        patients = self.env['hospital.patient'].browse(patient_ids)
+        test_types = self.env['hospital.lab.test.type'].browse(test_type_ids)
+        if not doctor_id:
+            without_doctor = patients.filtered(lambda p: not p.doctor_id)
+            if without_doctor:
+                raise UserError(
+                    'Please choose the ordering doctor: these patients have no assigned doctor:\n'
+                    + '\n'.join(without_doctor.mapped('display_name'))
+                )
+        vals_list = [
+            {
+                'patient_id': patient.id,
+                'doctor_id': doctor_id or patient.doctor_id.id,
+                'test_type': test_type.id,
+                'priority': priority,
+                'test_date': test_date or fields.Date.context_today(self),
+                'state': 'requested' if request else 'draft',
+            }
+            for patient in patients
+            for test_type in test_types
+        ]
+        return self.create(vals_list)
+    
     # ==========================================
     # Action Methods
     # ==========================================
@@ -271,16 +359,41 @@ class HospitalLabTest(models.Model):
                 record.message_post(body='Test processing started.')
     
     def action_complete(self):
-        """Complete lab test"""
-        for record in self:
-            if record.state == 'in_progress':
-                if not record.result_date:
-                    record.result_date = fields.Date.today()
-                record.state = 'completed'
-                record.message_post(body='Test completed.')
-                
-                # Auto-determine result status based on line results
-                record._compute_result_status()
+        """Complete lab tests.
+        
+        Works on whole batches: line flags are evaluated for all tests in
+        one pass before the result status is derived from them.
+        """
+        tests = self.filtered(lambda t: t.state == 'in_progress')
+        if not tests:
+            return
+        tests.line_ids._evaluate_results()
+        tests.filtered(lambda t: not t.result_date).write({
+            'result_date': fields.Date.today(),
+        })
+        tests.write({'state': 'completed', 'completed_at': fields.Datetime.now()})
+        self.env['hospital.lab.escalation']._enqueue(tests)
+        if self.env.context.get('hospital_lab_result_import'):
+            # Result imports post one summary on the import instead
+            return
+        for record in tests:
+            record.message_post(body='Test completed.')
+    
+    def action_view_escalations(self):
+        """Open the critical result escalations of the test"""
+        self.ensure_one()
+        return {
+            'name': 'Critical Escalations',
+            'type': 'ir.actions.act_window',
+            'res_model': 'hospital.lab.escalation',
+            'view_mode': 'list,form',
+            'domain': [('test_id', '=', self.id)],
+        }
+    
+    def action_acknowledge_critical(self):
+        """Acknowledge the critical results of the tests"""
+        self.escalation_ids.action_acknowledge()
+        return True
     
     def action_cancel(self):
         """Cancel lab test"""
@@ -303,17 +416,34 @@ class HospitalLabTest(models.Model):
             'type': 'ir.actions.act_window',
             'res_model': 'ir.attachment',
             'view_mode': 'kanban,list,form',
-            'domain': [('id', 'in', self.attachment_ids.ids)],
+            'views': [
+                (self.env.ref('hospital_management.view_hospital_attachment_kanban').id, 'kanban'),
+                (False, 'list'),
+                (False, 'form'),
+            ],
+            'domain': [
+                '|', ('id', 'in', self.attachment_ids.ids),
+                '&', ('res_model', '=', self._name), ('res_id', '=', self.id),
+            ],
             'context': {
                 'default_res_model': self._name,
                 'default_res_id': self.id,
             }
         }
     
+    @api.depends('state', 'line_ids.result_value', 'line_ids.is_abnormal', 'line_ids.is_critical')
     def _compute_result_status(self):
-        """Automatically determine result status based on test lines"""
+        """Automatically determine result status based on test lines.
+        
+        The status stays as is until a result is entered or the test is
+        completed.
+        """
         for record in self:
-            if not record.line_ids:
+            if not record.line_ids or (
+                record.state != 'completed'
+                and not any(record.line_ids.mapped('result_value'))
+            ):
+                record.result_status = record.result_status
                 continue
             
             has_abnormal = any(line.is_abnormal for line in record.line_ids)
@@ -325,6 +455,136 @@ class HospitalLabTest(models.Model):
                 record.result_status = 'abnormal'
             else:
                 record.result_status = 'normal'
+    
+    # ==========================================
+    # Worklist
+    # ==========================================
+    
+    @api.model
+    def _worklist_domain(self, category=None):
+        """Domain of tests waiting in the worklist"""
+        domain = [('state', '=', 'requested')]
+        if category:
+            domain.append(('test_category', '=', category))
+        return domain
+    
+    @api.model
+    def get_worklist(self, limit=20, category=None):
+        """Return the next tests to process, STAT first, then oldest first"""
+        return self.search_read(
+            self._worklist_domain(category),
+            ['reference', 'patient_name', 'test_name', 'test_category', 'priority', 'test_date'],
+            limit=limit,
+            order=self._WORKLIST_ORDER,
+        )
+    
+    @api.model
+    def get_queue_depth(self):
+        """Number of waiting tests per category and priority"""
+        depth = {}
+        for category, priority, count in self._read_group(
+            self._worklist_domain(), ['test_category', 'priority'], ['__count'],
+        ):
+            counts = depth.setdefault(category or 'other', {'total': 0})
+            counts[priority] = count
+            counts['total'] += count
+        return depth
+    
+    def _lock_claimable(self, domain, limit=None):
+        """Lock requested tests matching a domain, skipping rows other
+        technicians are claiming, and return them"""
+        self.flush_model(['state', 'priority_rank', 'test_date', 'test_category', 'active'])
+        query = self._search(domain, limit=limit, order=self._WORKLIST_ORDER)
+        self.env.cr.execute(SQL(
+            "%s FOR UPDATE OF %s SKIP LOCKED",
+            query.select(SQL.identifier(self._table, 'id')),
+            SQL.identifier(self._table),
+        ))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+    
+    def _claim(self):
+        """Move locked tests to processing under the current technician"""
+        self.write({
+            'state': 'in_progress',
+            'lab_technician': self.env.user.name,
+        })
+        for record in self:
+            record.message_post(body=f'Test claimed by {self.env.user.name}.')
+        return self
+    
+    @api.model
+    def claim_next(self, count=1, category=None):
+        """Claim the next tests of the worklist.
+        
+        Concurrent technicians never block on each other or get the same
+        test: rows locked by another transaction are skipped.
+        """
+        return self._lock_claimable(self._worklist_domain(category), limit=count)._claim().ids
+    
+    def action_claim(self):
+        """Claim the selected tests that are still waiting"""
+        tests = self._lock_claimable(self._worklist_domain() + [('id', 'in', self.ids)])
+        if not tests:
+            raise UserError('These tests have already been claimed by another technician.')
+        tests._claim()
+        return True
+    
+    @api.model
+    def action_claim_next(self):
+        """Claim the next test of the worklist and open it"""
+        test_ids = self.claim_next()
+        if not test_ids:
+            raise UserError('The worklist is empty.')
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': test_ids[0],
+            'view_mode': 'form',
+            'target': 'current',
+        }
+    
+    # ==========================================
+    # Indexes and Backfill
+    # ==========================================
+    
+    def init(self):
+        """Partial indexes for recent critical results, the worklist and
+        turnaround analytics"""
+        drop_index(self.env.cr, 'hospital_lab_test_critical_result_date_idx', self._table)
+        create_index(
+            self.env.cr,
+            'hospital_lab_test_critical_completed_idx',
+            self._table,
+            ['completed_at DESC'],
+            where="result_status = 'critical' AND active",
+        )
+        create_index(
+            self.env.cr,
+            'hospital_lab_test_worklist_idx',
+            self._table,
+            ['priority_rank', 'test_date', 'id'],
+            where="state = 'requested' AND active",
+        )
+        create_index(
+            self.env.cr,
+            'hospital_lab_test_turnaround_idx',
+            self._table,
+            ['test_date', 'result_date', 'test_category', 'priority'],
+            where="state = 'completed' AND active AND result_date IS NOT NULL",
+        )
+    
+    @api.model
+    def backfill_result_status(self, test_ids=None, batch_size=1000):
+        """Recompute the stored result status of historical tests in chunks"""
+        if test_ids is None:
+            test_ids = self.with_context(active_test=False).search([]).ids
+        field = self._fields['result_status']
+        for chunk in split_every(batch_size, test_ids):
+            records = self.browse(chunk)
+            self.env.add_to_compute(field, records)
+            records.flush_recordset(['result_status'])
+            self.env.invalidate_all()
+        return True
 
 
 class HospitalLabTestLine(models.Model):
@@ -346,6 +606,24 @@ class HospitalLabTestLine(models.Model):
         default=10
     )
     
+    parameter_id = fields.Many2one(
+        comodel_name='hospital.lab.test.parameter',
+        string='Parameter Definition',
+        ondelete='set null'
+    )
+    
+    patient_id = fields.Many2one(
+        related='test_id.patient_id',
+        string='Patient',
+        store=True
+    )
+    
+    test_date = fields.Date(
+        related='test_id.test_date',
+        string='Test Date',
+        store=True
+    )
+    
     parameter_name = fields.Char(
         string='Parameter',
         required=True
@@ -365,19 +643,145 @@ class HospitalLabTestLine(models.Model):
         help='e.g., 80-120, <5.7, >100'
     )
     
+    result_numeric = fields.Float(
+        string='Numeric Result',
+        compute='_compute_result_flags',
+        store=True
+    )
+    
+    is_numeric = fields.Boolean(
+        string='Numeric',
+        compute='_compute_result_flags',
+        store=True
+    )
+    
     is_abnormal = fields.Boolean(
         string='Abnormal',
+        compute='_compute_result_flags',
+        store=True,
+        readonly=False,
         default=False
     )
     
     is_critical = fields.Boolean(
         string='Critical',
+        compute='_compute_result_flags',
+        store=True,
+        readonly=False,
         default=False
     )
     
     notes = fields.Text(
         string='Notes'
     )
+    
+    @api.depends(
+        'result_value', 'normal_range',
+        'parameter_id.has_critical_low', 'parameter_id.critical_low',
+        'parameter_id.has_critical_high', 'parameter_id.critical_high',
+    )
+    def _compute_result_flags(self):
+        """Flag numeric results against the normal range and critical bounds.
+        
+        Flags no range or bound applies to keep their manually set value,
+        as do both flags of non-numeric results.
+        """
+        for line in self:
+            result = parse_result(line.result_value)
+            line.is_numeric = result is not None
+            line.result_numeric = result.value if result else 0.0
+            if result is None:
+                line.is_abnormal = line.is_abnormal
+                line.is_critical = line.is_critical
+                continue
+            
+            parameter = line.parameter_id
+            if parameter.has_critical_low or parameter.has_critical_high:
+                bounds = Interval(
+                    parameter.critical_low if parameter.has_critical_low else None,
+                    parameter.critical_high if parameter.has_critical_high else None,
+                    True, True,
+                )
+                is_critical = is_outside(bounds, *result)
+            else:
+                is_critical = line.is_critical
+            interval = parse_range(line.normal_range)
+            is_abnormal = is_outside(interval, *result) if interval else line.is_abnormal
+            line.is_critical = is_critical
+            line.is_abnormal = is_critical or is_abnormal
+    
+    def _evaluate_results(self):
+        """Recompute the result flags of all lines in self at once"""
+        self.env.add_to_compute(self._fields['is_abnormal'], self)
+        self.flush_recordset(['is_abnormal', 'is_critical', 'result_numeric', 'is_numeric'])
+    
+    def init(self):
+        """Composite index serving per patient/parameter time series"""
+        create_index(
+            self.env.cr,
+            'hospital_lab_test_line_trend_idx',
+            self._table,
+            ['patient_id', 'parameter_id', 'test_date'],
+            where='is_numeric AND parameter_id IS NOT NULL',
+        )
+    
+    # ==========================================
+    # Trend API
+    # ==========================================
+    
+    @api.model
+    def get_trend(self, patient_id, parameter_id, date_from=None, limit=None):
+        """Return a patient's numeric results for one parameter as arrays.
+        
+        Result: {'dates': [...], 'values': [...], 'unit', 'low', 'high'},
+        oldest first; low/high come from the parameter's normal range.
+        With a limit, the most recent results are returned.
+        """
+        domain = [
+            ('patient_id', '=', patient_id),
+            ('parameter_id', '=', parameter_id),
+            ('is_numeric', '=', True),
+            ('test_id.state', '!=', 'cancelled'),
+        ]
+        if date_from:
+            domain.append(('test_date', '>=', date_from))
+        query = self._search(domain, limit=limit, order='test_date desc, id desc')
+        self.env.cr.execute(query.select(
+            SQL.identifier(self._table, 'test_date'),
+            SQL.identifier(self._table, 'result_numeric'),
+        ))
+        rows = self.env.cr.fetchall()[::-1]
+        
+        parameter = self.env['hospital.lab.test.parameter'].browse(parameter_id)
+        interval = parse_range(parameter.normal_range)
+        return {
+            'parameter': parameter.name,
+            'unit': parameter.unit or '',
+            'low': interval.low if interval else None,
+            'high': interval.high if interval else None,
+            'dates': [fields.Date.to_string(date) for date, _value in rows],
+            'values': [value for _date, value in rows],
+        }
+    
+    @api.model
+    def get_trends(self, patient_id, parameter_ids=None, limit=50):
+        """Trends of several parameters for a patient.
+        
+        Without parameter_ids, every parameter with numeric results for
+        the patient is returned, most recently measured first.
+        """
+        if parameter_ids is None:
+            groups = self._read_group(
+                [('patient_id', '=', patient_id), ('is_numeric', '=', True),
+                 ('parameter_id', '!=', False)],
+                ['parameter_id'], ['test_date:max'],
+            )
+            groups.sort(key=lambda group: group[1] or fields.Date.today(), reverse=True)
+            parameter_ids = [parameter.id for parameter, _last_date in groups]
+        return [
+            dict(self.get_trend(patient_id, parameter_id, limit=limit), parameter_id=parameter_id)
+            for parameter_id in parameter_ids
+        ]
 
 
 class HospitalLabTestType(models.Model):
@@ -434,6 +838,50 @@ class HospitalLabTestType(models.Model):
         string='Active',
         default=True
     )
+    
+    @api.model
+    def _get_parameter_template(self, test_type_id):
+        """Result line values of a test type, cached until its parameters change.
+        
+        The cache key is the latest write date and count of the type's
+        parameters, so parameter edits select a fresh template without
+        clearing any other cache of the registry.
+        """
+        self.env['hospital.lab.test.parameter'].flush_model()
+        self.env.cr.execute(SQL(
+            "SELECT MAX(write_date), COUNT(*) FROM hospital_lab_test_parameter WHERE test_type_id = %s",
+            test_type_id,
+        ))
+        stamp, count = self.env.cr.fetchone()
+        return self._build_parameter_template(test_type_id, stamp, count)
+    
+    @api.model
+    @tools.ormcache('test_type_id', 'stamp', 'count')
+    def _build_parameter_template(self, test_type_id, stamp, count):
+        """Read the result line values of a test type's parameters"""
+        parameters = self.env['hospital.lab.test.parameter'].sudo().search_read(
+            [('test_type_id', '=', test_type_id)],
+            ['name', 'unit', 'normal_range', 'sequence'],
+        )
+        return tuple(
+            (param['id'], param['name'], param['unit'], param['normal_range'], param['sequence'])
+            for param in parameters
+        )
+    
+    def _get_line_commands(self):
+        """Create commands for the result lines of a test of this type"""
+        self.ensure_one()
+        return [
+            (0, 0, {
+                'parameter_id': parameter_id,
+                'parameter_name': name,
+                'unit': unit,
+                'normal_range': normal_range,
+                'sequence': sequence,
+            })
+            for parameter_id, name, unit, normal_range, sequence
+            in self._get_parameter_template(self.id)
+        ]
 
 
 class HospitalLabTestParameter(models.Model):
@@ -460,6 +908,11 @@ class HospitalLabTestParameter(models.Model):
         required=True
     )
     
+    code = fields.Char(
+        string='Code',
+        help='Analyzer code used in result files, e.g., GLU'
+    )
+    
     unit = fields.Char(
         string='Unit',
         help='e.g., mg/dL, mmol/L, %'
@@ -470,6 +923,42 @@ class HospitalLabTestParameter(models.Model):
         help='e.g., 80-120, <5.7, >100'
     )
     
+    has_critical_low = fields.Boolean(
+        string='Has Critical Low',
+        compute='_compute_has_critical_bounds',
+        store=True,
+        readonly=False,
+        help='Flag results below Critical Low as critical, including a bound of 0.'
+    )
+    
+    critical_low = fields.Float(
+        string='Critical Low',
+        help='Results below this value are critical.'
+    )
+    
+    has_critical_high = fields.Boolean(
+        string='Has Critical High',
+        compute='_compute_has_critical_bounds',
+        store=True,
+        readonly=False,
+        help='Flag results above Critical High as critical, including a bound of 0.'
+    )
+    
+    critical_high = fields.Float(
+        string='Critical High',
+        help='Results above this value are critical.'
+    )
+    
     notes = fields.Text(
         string='Notes'
-    )
\ No newline at end of file
+    )
+    
+    @api.depends('critical_low', 'critical_high')
+    def _compute_has_critical_bounds(self):
+        """Enable a bound once a non-zero value is entered.
+        
+        A bound of 0 is only used when enabled explicitly.
+        """
+        for parameter in self:
+            parameter.has_critical_low = parameter.has_critical_low or bool(parameter.critical_low)
+            parameter.has_critical_high = parameter.has_critical_high or bool(parameter.critical_high)
@@ -0,0 +1,184 @@
+from dateutil.relativedelta import relativedelta
+
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+# Percentiles reported for turnaround times
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+class HospitalLabTurnaroundAnalysis(models.TransientModel):
+    """Lab turnaround time (test date to result date) percentiles"""
+    
+    _name = 'hospital.lab.turnaround.analysis'
+    _description = 'Lab Turnaround Analysis'
+    
+    date_from = fields.Date(
+        string='From',
+        required=True,
+        default=lambda self: fields.Date.today() - relativedelta(years=1)
+    )
+    
+    date_to = fields.Date(
+        string='To',
+        required=True,
+        default=fields.Date.today
+    )
+    
+    period = fields.Selection(
+        selection=[
+            ('day', 'Day'),
+            ('week', 'Week'),
+            ('month', 'Month'),
+            ('quarter', 'Quarter'),
+            ('year', 'Year'),
+        ],
+        string='Period',
+        required=True,
+        default='month'
+    )
+    
+    line_ids = fields.One2many(
+        comodel_name='hospital.lab.turnaround.line',
+        inverse_name='analysis_id',
+        string='Results'
+    )
+    
+    @api.constrains('date_from', 'date_to')
+    def _check_dates(self):
+        """Ensure the date range is valid"""
+        for record in self:
+            if record.date_from > record.date_to:
+                raise ValidationError('The start date must be before the end date!')
+    
+    @api.model
+    def get_percentiles(self, date_from, date_to, period=None, by_group=True):
+        """Turnaround percentiles (days) of completed tests in a date range.
+        
+        Rows are grouped by period start (when a period is given) and by
+        category and priority (when by_group is set). Percentiles are
+        computed by PostgreSQL with percentile_cont over an index scan of
+        completed tests, so a year of tests aggregates in one query.
+        """
+        self.env['hospital.lab.test'].check_access('read')
+        self.env['hospital.lab.test'].flush_model(
+            ['state', 'active', 'test_date', 'result_date', 'test_category', 'priority']
+        )
+        columns = []
+        if period:
+            columns.append(SQL("date_trunc(%s, t.test_date)::date", period))
+        if by_group:
+            columns += [SQL("t.test_category"), SQL("t.priority")]
+        select = SQL(", ").join(columns + [SQL("")]) if columns else SQL("")
+        groupby = SQL("GROUP BY %s", SQL(", ").join(columns)) if columns else SQL("")
+        orderby = SQL("ORDER BY %s", SQL(", ").join(columns)) if columns else SQL("")
+        
+        self.env.cr.execute(SQL("""
+            SELECT %(select)s
+                   COUNT(*),
+                   AVG(t.result_date - t.test_date),
+                   percentile_cont(%(percentiles)s::float8[])
+                       WITHIN GROUP (ORDER BY t.result_date - t.test_date)
+              FROM hospital_lab_test t
+             WHERE t.state = 'completed'
+               AND t.active
+               AND t.result_date IS NOT NULL
+               AND t.test_date BETWEEN %(date_from)s AND %(date_to)s
+             %(groupby)s
+             %(orderby)s
+        """,
+            select=select,
+            percentiles=list(PERCENTILES),
+            date_from=date_from,
+            date_to=date_to,
+            groupby=groupby,
+            orderby=orderby,
+        ))
+        
+        result = []
+        for row in self.env.cr.fetchall():
+            *keys, count, average, percentiles = row
+            if not count:
+                continue
+            values = dict(zip(('p50', 'p90', 'p99'), percentiles))
+            item = {'count': count, 'avg': float(average), **values}
+            if period:
+                item['period_start'] = keys.pop(0)
+            if by_group:
+                item['test_category'], item['priority'] = keys
+            result.append(item)
+        return result
+    
+    def action_compute(self):
+        """Compute the percentiles and open them in pivot and graph views"""
+        self.ensure_one()
+        self.line_ids.unlink()
+        self.env['hospital.lab.turnaround.line'].create([
+            dict(item, analysis_id=self.id)
+            for item in self.get_percentiles(self.date_from, self.date_to, self.period)
+        ])
+        return {
+            'name': 'Lab Turnaround',
+            'type': 'ir.actions.act_window',
+            'res_model': 'hospital.lab.turnaround.line',
+            'view_mode': 'pivot,graph,list',
+            'domain': [('analysis_id', '=', self.id)],
+            'target': 'current',
+        }
+
+
+class HospitalLabTurnaroundLine(models.TransientModel):
+    """Turnaround percentiles of one period, category and priority"""
+    
+    _name = 'hospital.lab.turnaround.line'
+    _description = 'Lab Turnaround Result'
+    _order = 'period_start, test_category, priority'
+    
+    analysis_id = fields.Many2one(
+        comodel_name='hospital.lab.turnaround.analysis',
+        string='Analysis',
+        required=True,
+        ondelete='cascade'
+    )
+    
+    period_start = fields.Date(
+        string='Period'
+    )
+    
+    test_category = fields.Selection(
+        selection=lambda self: self.env['hospital.lab.test.type']._fields['category'].selection,
+        string='Category'
+    )
+    
+    priority = fields.Selection(
+        selection=lambda self: self.env['hospital.lab.test']._fields['priority'].selection,
+        string='Priority'
+    )
+    
+    count = fields.Integer(
+        string='Tests'
+    )
+    
+    avg = fields.Float(
+        string='Average (days)',
+        aggregator='avg'
+    )
+    
+    p50 = fields.Float(
+        string='P50 (days)',
+        aggregator='max',
+        help='Median turnaround; merged groups show the largest value'
+    )
+    
+    p90 = fields.Float(
+        string='P90 (days)',
+        aggregator='max',
+        help='Merged groups show the largest value'
+    )
+    
+    p99 = fields.Float(
+        string='P99 (days)',
+        aggregator='max',
+        help='Merged groups show the largest value'
+    )
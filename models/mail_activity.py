@@ -0,0 +1,17 @@
+from odoo import models
+
+
+class MailActivity(models.Model):
+    """Acknowledge critical lab escalations when their activity is done"""
+    
+    _inherit = 'mail.activity'
+    
+    def _action_done(self, *args, **kwargs):
+        """Mark escalations linked to the activities as acknowledged"""
+        if not self.env.context.get('hospital_escalation_acknowledged'):
+            escalations = self.env['hospital.lab.escalation'].sudo().search([
+                ('activity_id', 'in', self.ids),
+            ])
+            if escalations:
+                escalations.with_user(self.env.user)._acknowledge()
+        return super()._action_done(*args, **kwargs)
@@ -1,5 +1,40 @@
-from odoo import models, fields, api
+import re
+
+from markupsafe import Markup
+
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
+from odoo.tools import create_index, html_escape, SQL
+
+# Text columns indexed for full-text search, with their ts_rank weight
+SEARCH_COLUMNS = [
+    ('diagnosis', 'A'),
+    ('symptoms', 'B'),
+    ('treatment', 'C'),
+    ('notes', 'D'),
+]
+
+# Text search configurations, in order of preference for snippets
+SEARCH_CONFIGS = ('english', 'arabic')
+
+_ARABIC_RE = re.compile('[\u0600-\u06ff]')
+
+# Placeholders around snippet matches, turned into <mark> after escaping
+_MARK_START, _MARK_STOP = '\x02', '\x03'
+
+# Systolic/diastolic reading at the start of blood_pressure, e.g. "120/80 sitting"
+_BLOOD_PRESSURE_RE = re.compile(r'^\s*(\d{2,3})\s*/\s*(\d{2,3})')
+
+# Numeric vital signs charted on the patient form: (field, label, unit)
+VITAL_SIGNS = [
+    ('systolic_bp', 'Systolic', 'mmHg'),
+    ('diastolic_bp', 'Diastolic', 'mmHg'),
+    ('pulse', 'Pulse', 'bpm'),
+    ('temperature', 'Temperature', '°C'),
+    ('weight', 'Weight', 'kg'),
+    ('bmi', 'BMI', 'kg/m²'),
+]
 
 
 class MedicalRecord(models.Model):
@@ -7,7 +42,7 @@ class MedicalRecord(models.Model):
     
     _name = 'hospital.medical.record'
     _description = 'Medical Record'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['hospital.audit.mixin', 'mail.thread', 'mail.activity.mixin']
     _rec_name = 'reference'
     _order = 'record_date desc'
     
@@ -108,6 +143,26 @@ class MedicalRecord(models.Model):
         string='Height (cm)'
     )
     
+    systolic_bp = fields.Integer(
+        string='Systolic (mmHg)',
+        compute='_compute_blood_pressure_values',
+        store=True
+    )
+    
+    diastolic_bp = fields.Integer(
+        string='Diastolic (mmHg)',
+        compute='_compute_blood_pressure_values',
+        store=True
+    )
+    
+    bmi = fields.Float(
+        string='BMI',
+        compute='_compute_bmi',
+        store=True,
+        digits=(5, 1),
+        help='Body mass index: weight (kg) / height (m)²'
+    )
+    
     # Attachments
     attachment_ids = fields.Many2many(
         comodel_name='ir.attachment',
@@ -153,13 +208,213 @@ class MedicalRecord(models.Model):
         default=True
     )
     
+    # Full-text filter (the tsvector column itself is managed in init)
+    search_text = fields.Char(
+        string='Clinical Text',
+        compute='_compute_search_text',
+        search='_search_search_text',
+        help='Search diagnosis, symptoms, treatment and notes by words'
+    )
+    
     # Computed Fields
+    def _compute_search_text(self):
+        """Search-only field"""
+        self.search_text = False
+    
+    @api.depends('blood_pressure')
+    def _compute_blood_pressure_values(self):
+        """Parse systolic and diastolic pressure from the free-text reading"""
+        for record in self:
+            match = _BLOOD_PRESSURE_RE.match(record.blood_pressure or '')
+            record.systolic_bp = int(match[1]) if match else 0
+            record.diastolic_bp = int(match[2]) if match else 0
+    
+    @api.depends('weight', 'height')
+    def _compute_bmi(self):
+        """Compute body mass index from weight and height"""
+        for record in self:
+            if record.weight > 0 and record.height > 0:
+                record.bmi = round(record.weight / (record.height / 100) ** 2, 1)
+            else:
+                record.bmi = 0.0
+    
     @api.depends('attachment_ids')
     def _compute_attachment_count(self):
         """Compute number of attachments"""
         for record in self:
             record.attachment_count = len(record.attachment_ids)
     
+    # Full-Text Search
+    def init(self):
+        """Maintain the search_vector column and its GIN index.
+        
+        The column is generated by PostgreSQL from the clinical text
+        columns, so every insert and update keeps it current without any
+        ORM involvement. One vector holds the English and Arabic lexemes.
+        Vital sign charts read a patient's records by date through the
+        (patient_id, record_date) index.
+        """
+        self.env.cr.execute("""
+            SELECT 1
+              FROM information_schema.columns
+             WHERE table_name = %s AND column_name = 'search_vector'
+        """, [self._table])
+        if not self.env.cr.fetchone():
+            vectors = SQL(" || ").join(
+                SQL(
+                    "setweight(to_tsvector(%s::regconfig, COALESCE(%s, '')), %s)",
+                    config, SQL.identifier(column), weight,
+                )
+                for config in self._get_search_configs()
+                for column, weight in SEARCH_COLUMNS
+            )
+            self.env.cr.execute(SQL(
+                "ALTER TABLE %s ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (%s) STORED",
+                SQL.identifier(self._table), vectors,
+            ))
+        create_index(
+            self.env.cr,
+            'hospital_medical_record_search_vector_idx',
+            self._table,
+            ['search_vector'],
+            method='gin',
+        )
+        create_index(
+            self.env.cr,
+            'hospital_medical_record_patient_date_idx',
+            self._table,
+            ['patient_id', 'record_date'],
+            where='active',
+        )
+    
+    @api.model
+    @tools.ormcache()
+    def _get_search_configs(self):
+        """Text search configurations available on this server (Arabic needs PostgreSQL 13+)"""
+        self.env.cr.execute(
+            "SELECT cfgname FROM pg_ts_config WHERE cfgname IN %s",
+            [SEARCH_CONFIGS],
+        )
+        available = {row[0] for row in self.env.cr.fetchall()}
+        return tuple(config for config in SEARCH_CONFIGS if config in available)
+    
+    @api.model
+    def _get_tsquery(self, text):
+        """tsquery matching the text in any configuration (web search syntax)"""
+        return SQL(" || ").join(
+            SQL("websearch_to_tsquery(%s::regconfig, %s)", config, text)
+            for config in self._get_search_configs()
+        )
+    
+    def _search_search_text(self, operator, value):
+        """Filter on the search_vector column through its GIN index"""
+        if operator not in ('ilike', 'like', '=') or not isinstance(value, str) or not value.strip():
+            raise ValidationError('Clinical text search only supports searching for words.')
+        self.flush_model([column for column, _weight in SEARCH_COLUMNS])
+        query = self._search([])
+        query.add_where(SQL(
+            "%s @@ (%s)",
+            SQL.identifier(self._table, 'search_vector'),
+            self._get_tsquery(value),
+        ))
+        return [('id', 'in', query)]
+    
+    @api.model
+    def search_clinical(self, text, domain=None, limit=80, offset=0):
+        """Records matching the text, best ts_rank first, with snippets.
+        
+        Matches come from the GIN index; only the returned page gets a
+        ts_headline snippet, which is the expensive part. Returns a list
+        of {'id', 'rank', 'snippet'} dicts, snippets being escaped HTML.
+        """
+        if not text or not text.strip():
+            return []
+        configs = self._get_search_configs()
+        snippet_config = 'arabic' if _ARABIC_RE.search(text) and 'arabic' in configs else configs[0]
+        self.flush_model([column for column, _weight in SEARCH_COLUMNS])
+        query = self._search(domain or [])
+        self.env.cr.execute(SQL("""
+            WITH q AS (SELECT (%(tsquery)s) AS tsquery)
+            SELECT top.id,
+                   top.rank,
+                   ts_headline(
+                       %(config)s::regconfig,
+                       concat_ws(' ... ', r.diagnosis, r.symptoms, r.treatment, r.notes),
+                       websearch_to_tsquery(%(config)s::regconfig, %(text)s),
+                       %(options)s
+                   )
+              FROM (
+                    SELECT r.id, ts_rank(r.search_vector, q.tsquery) AS rank
+                      FROM hospital_medical_record r, q
+                     WHERE r.search_vector @@ q.tsquery
+                       AND r.id IN %(ids)s
+                  ORDER BY rank DESC, r.id DESC
+                     LIMIT %(limit)s OFFSET %(offset)s
+                   ) top
+              JOIN hospital_medical_record r ON r.id = top.id
+          ORDER BY top.rank DESC, top.id DESC
+        """,
+            tsquery=self._get_tsquery(text),
+            config=snippet_config,
+            text=text,
+            options=f'StartSel="{_MARK_START}", StopSel="{_MARK_STOP}", MaxFragments=2, MaxWords=25, MinWords=8',
+            ids=query.subselect(),
+            limit=limit,
+            offset=offset,
+        ))
+        return [
+            {'id': record_id, 'rank': rank, 'snippet': self._format_snippet(snippet)}
+            for record_id, rank, snippet in self.env.cr.fetchall()
+        ]
+    
+    @api.model
+    def _format_snippet(self, snippet):
+        """Escape a raw ts_headline snippet and highlight its matches"""
+        return Markup(
+            html_escape(snippet or '')
+            .replace(_MARK_START, Markup('<mark>'))
+            .replace(_MARK_STOP, Markup('</mark>'))
+        )
+    
+    # Vital Signs
+    @api.model
+    def get_vitals(self, patient_id, date_from=None, limit=100):
+        """Return a patient's vital signs as column arrays, oldest first.
+        
+        Result: {'dates': [...], 'series': [{'field', 'label', 'unit',
+        'values'}]}, one value per date and None where a sign was not
+        measured. Only records with at least one vital sign are read,
+        through the (patient_id, record_date) index. With a limit, the
+        most recent records are returned.
+        """
+        domain = expression.OR([[(field, '>', 0)] for field, _label, _unit in VITAL_SIGNS])
+        domain = expression.AND([domain, [('patient_id', '=', patient_id)]])
+        if date_from:
+            domain = expression.AND([domain, [('record_date', '>=', date_from)]])
+        query = self._search(domain, limit=limit, order='record_date desc, id desc')
+        self.env.cr.execute(query.select(
+            SQL.identifier(self._table, 'record_date'),
+            *(
+                SQL("NULLIF(%s, 0)", SQL.identifier(self._table, field))
+                for field, _label, _unit in VITAL_SIGNS
+            ),
+        ))
+        rows = self.env.cr.fetchall()[::-1]
+        columns = list(zip(*rows)) or [()] * (len(VITAL_SIGNS) + 1)
+        return {
+            'dates': [fields.Date.to_string(date) for date in columns[0]],
+            'series': [
+                {
+                    'field': field,
+                    'label': label,
+                    'unit': unit,
+                    'values': [float(value) if value is not None else None for value in values],
+                }
+                for (field, label, unit), values in zip(VITAL_SIGNS, columns[1:])
+                if any(value is not None for value in values)
+            ],
+        }
+    
     # CRUD Override
     @api.model_create_multi
     def create(self, vals_list):
@@ -200,7 +455,15 @@ class MedicalRecord(models.Model):
             'type': 'ir.actions.act_window',
             'res_model': 'ir.attachment',
             'view_mode': 'kanban,list,form',
-            'domain': [('id', 'in', self.attachment_ids.ids)],
+            'views': [
+                (self.env.ref('hospital_management.view_hospital_attachment_kanban').id, 'kanban'),
+                (False, 'list'),
+                (False, 'form'),
+            ],
+            'domain': [
+                '|', ('id', 'in', self.attachment_ids.ids),
+                '&', ('res_model', '=', self._name), ('res_id', '=', self.id),
+            ],
             'context': {
                 'default_res_model': self._name,
                 'default_res_id': self.id,
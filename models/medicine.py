@@ -0,0 +1,348 @@
+import difflib
+from collections import defaultdict
+
+from odoo import models, fields, api, tools
+from odoo.exceptions import UserError
+from odoo.tools import SQL, split_every
+from odoo.tools.sql import escape_psql
+
+from .drug_interaction import normalize_drug
+
+MEDICINE_TYPES = [
+    ('tablet', 'Tablet'),
+    ('capsule', 'Capsule'),
+    ('syrup', 'Syrup'),
+    ('injection', 'Injection'),
+    ('cream', 'Cream/Ointment'),
+    ('drops', 'Drops'),
+    ('inhaler', 'Inhaler'),
+    ('other', 'Other'),
+]
+
+
+class HospitalMedicine(models.Model):
+    """Catalog of medicines prescribed by the hospital"""
+    
+    _name = 'hospital.medicine'
+    _description = 'Medicine'
+    _order = 'name'
+    
+    # Largest autocomplete limit served from the cache
+    _autocomplete_max_limit = 256
+    
+    name = fields.Char(
+        string='Medicine Name',
+        required=True,
+        index='trigram'
+    )
+    
+    code = fields.Char(
+        string='Code',
+        index=True,
+        help='Internal or national drug code'
+    )
+    
+    normalized_name = fields.Char(
+        string='Normalized Name',
+        compute='_compute_normalized_name',
+        store=True,
+        index=True,
+        help='Name without case, strength and dosage form, used for matching'
+    )
+    
+    medicine_type = fields.Selection(
+        selection=MEDICINE_TYPES,
+        string='Type',
+        required=True,
+        default='tablet'
+    )
+    
+    strength = fields.Char(
+        string='Strength',
+        help='Default dosage, e.g., 500mg, 10ml, 1 puff'
+    )
+    
+    active = fields.Boolean(
+        string='Active',
+        default=True
+    )
+    
+    _sql_constraints = [
+        ('code_unique', 'UNIQUE(code)', 'Medicine code must be unique!'),
+    ]
+    
+    @api.depends('name')
+    def _compute_normalized_name(self):
+        for medicine in self:
+            medicine.normalized_name = normalize_drug(medicine.name)
+    
+    # ==========================================
+    # Autocomplete
+    # ==========================================
+    
+    @api.model
+    def name_search(self, name='', domain=None, operator='ilike', limit=100):
+        """Serve plain autocomplete queries from the cache"""
+        name = (name or '').strip()
+        if (
+            name and not domain and operator == 'ilike'
+            and limit and limit <= self._autocomplete_max_limit
+        ):
+            return list(self._autocomplete(self._get_catalog_stamp(), name.lower(), limit))
+        return super().name_search(name, domain, operator, limit)
+    
+    @api.model
+    def _get_catalog_stamp(self):
+        """Latest write date and row count of the catalog.
+        
+        Part of the autocomplete cache key, so edits, archiving and
+        deletions select fresh results without clearing any other cache
+        of the registry.
+        """
+        self.flush_model()
+        self.env.cr.execute("SELECT MAX(write_date), COUNT(*) FROM hospital_medicine")
+        return self.env.cr.fetchone()
+    
+    @api.model
+    @tools.ormcache('stamp', 'name', 'limit')
+    def _autocomplete(self, stamp, name, limit):
+        """Return (id, display name) pairs matching a typed prefix.
+        
+        Name and code prefixes come first, then names containing the text
+        anywhere; both use the trigram index on ``name``. Results live in
+        the registry LRU cache until the catalog changes.
+        """
+        Medicine = self.sudo().with_context(active_test=True)
+        pattern = escape_psql(name)
+        medicines = Medicine.search_fetch(
+            ['|', ('name', '=ilike', pattern + '%'), ('code', '=ilike', pattern + '%')],
+            ['display_name'],
+            limit=limit
+        )
+        if len(medicines) < limit:
+            medicines |= Medicine.search_fetch(
+                [('name', '=ilike', '%' + pattern + '%'), ('id', 'not in', medicines.ids)],
+                ['display_name'],
+                limit=limit - len(medicines)
+            )
+        return tuple((medicine.id, medicine.display_name) for medicine in medicines)
+    
+    # ==========================================
+    # Free Text Matching
+    # ==========================================
+    
+    @api.model
+    def _match_prescription_lines(self, batch_size=1000, cutoff=0.85):
+        """Link free-text prescription lines to catalog medicines.
+        
+        Distinct names are grouped by normalized key, most used first.
+        Keys found in the catalog are linked; keys close to a catalog (or
+        earlier new) key are queued for review in hospital.medicine.match
+        instead, since similar names are often different drugs
+        (prednisone, prednisolone). Other keys become new medicines. Lines
+        are updated with one statement per batch of names.
+        """
+        self.flush_model()
+        self.env['hospital.prescription.line'].flush_model(['medicine_name', 'medicine_type', 'medicine_id'])
+        self.env.cr.execute("""
+            SELECT medicine_name, medicine_type, COUNT(*)
+              FROM hospital_prescription_line
+             WHERE medicine_id IS NULL
+               AND medicine_name IS NOT NULL
+          GROUP BY medicine_name, medicine_type
+        """)
+        names_by_key = defaultdict(list)
+        usage = defaultdict(int)
+        types = defaultdict(lambda: defaultdict(int))
+        for medicine_name, medicine_type, count in self.env.cr.fetchall():
+            key = normalize_drug(medicine_name)
+            if not key:
+                continue
+            names_by_key[key].append(medicine_name)
+            usage[key] += count
+            types[key][medicine_type] += count
+        if not names_by_key:
+            return 0
+        
+        Match = self.env['hospital.medicine.match']
+        queued = set(Match.search([('state', '=', 'pending')]).mapped('name'))
+        catalog = {}
+        for medicine in self.with_context(active_test=False).search_fetch([], ['normalized_name'], order='active desc, id'):
+            catalog.setdefault(medicine.normalized_name, medicine.id)
+        keys_by_letter = defaultdict(list)
+        for key in catalog:
+            keys_by_letter[key[0]].append(key)
+        
+        linked_keys = []
+        new_keys = []
+        candidates = {}
+        for key in sorted(names_by_key, key=usage.get, reverse=True):
+            if key in catalog:
+                linked_keys.append(key)
+                continue
+            if key in queued:
+                continue
+            close = difflib.get_close_matches(key, keys_by_letter[key[0]], n=1, cutoff=cutoff)
+            if close:
+                candidates[key] = close[0]
+                continue
+            catalog[key] = None
+            keys_by_letter[key[0]].append(key)
+            new_keys.append(key)
+        
+        for chunk in split_every(batch_size, new_keys):
+            medicines = self.create([{
+                'name': key.title(),
+                'medicine_type': self._most_used_type(types[key]),
+            } for key in chunk])
+            for key, medicine in zip(chunk, medicines):
+                catalog[key] = medicine.id
+        self.flush_model()
+        
+        Match.create([{
+            'name': key,
+            'medicine_names': names_by_key[key],
+            'medicine_type': self._most_used_type(types[key]),
+            'line_count': usage[key],
+            'suggested_medicine_id': catalog[close_key],
+            'similarity': difflib.SequenceMatcher(None, key, close_key).ratio(),
+        } for key, close_key in candidates.items()])
+        
+        return self._link_names([
+            (medicine_name, catalog[key])
+            for key in linked_keys + new_keys
+            for medicine_name in names_by_key[key]
+        ], batch_size)
+    
+    @api.model
+    def _most_used_type(self, counts):
+        """Medicine type used by most lines, from {type: line count}"""
+        return max(counts, key=counts.get) or 'other'
+    
+    @api.model
+    def _link_names(self, pairs, batch_size=1000):
+        """Link unlinked lines by exact name from (medicine name, medicine id) pairs.
+        
+        Returns the number of lines linked.
+        """
+        self.env['hospital.prescription.line'].flush_model(['medicine_name', 'medicine_id'])
+        updated = 0
+        for chunk in split_every(batch_size, pairs):
+            names, medicine_ids = zip(*chunk)
+            self.env.cr.execute(SQL("""
+                UPDATE hospital_prescription_line l
+                   SET medicine_id = m.medicine_id
+                  FROM unnest(%(names)s::varchar[], %(medicine_ids)s::int[]) AS m(name, medicine_id)
+                 WHERE l.medicine_name = m.name
+                   AND l.medicine_id IS NULL
+            """, names=list(names), medicine_ids=list(medicine_ids)))
+            updated += self.env.cr.rowcount
+        self.env['hospital.prescription.line'].invalidate_model(['medicine_id'])
+        return updated
+    
+    @api.model
+    def _link_prescription_lines(self, lines):
+        """Link free-text lines to the catalog medicine of the same normalized name.
+        
+        Lines are linked in SQL, so the name, type and dosage the
+        prescriber entered stay as they are.
+        """
+        lines = lines.filtered(lambda line: not line.medicine_id and line.medicine_name)
+        keys = {line.id: normalize_drug(line.medicine_name) for line in lines}
+        if not any(keys.values()):
+            return
+        catalog = {}
+        for medicine in self.search_fetch([('normalized_name', 'in', list(set(keys.values())))], ['normalized_name'], order='id'):
+            catalog.setdefault(medicine.normalized_name, medicine.id)
+        pairs = [(line_id, catalog[key]) for line_id, key in keys.items() if key in catalog]
+        if not pairs:
+            return
+        lines.flush_recordset(['medicine_id'])
+        line_ids, medicine_ids = zip(*pairs)
+        self.env.cr.execute(SQL("""
+            UPDATE hospital_prescription_line l
+               SET medicine_id = m.medicine_id
+              FROM unnest(%(line_ids)s::int[], %(medicine_ids)s::int[]) AS m(id, medicine_id)
+             WHERE l.id = m.id
+               AND l.medicine_id IS NULL
+        """, line_ids=list(line_ids), medicine_ids=list(medicine_ids)))
+        lines.invalidate_recordset(['medicine_id'])
+
+
+class HospitalMedicineMatch(models.Model):
+    """Free-text medicine names waiting for a pharmacist's decision.
+    
+    Names close to, but not the same as, a catalog medicine are never
+    linked automatically: the reviewer either links them to the
+    suggested medicine or adds them to the catalog.
+    """
+    
+    _name = 'hospital.medicine.match'
+    _description = 'Medicine Name Review'
+    _order = 'state, line_count desc, id'
+    
+    name = fields.Char(
+        string='Prescribed Name',
+        required=True,
+        readonly=True,
+        help='Normalized name written on the prescription lines'
+    )
+    
+    medicine_names = fields.Json(
+        string='Spellings',
+        readonly=True
+    )
+    
+    medicine_type = fields.Selection(
+        selection=MEDICINE_TYPES,
+        string='Type',
+        default='other'
+    )
+    
+    line_count = fields.Integer(
+        string='Lines',
+        readonly=True
+    )
+    
+    suggested_medicine_id = fields.Many2one(
+        comodel_name='hospital.medicine',
+        string='Suggested Medicine',
+        ondelete='set null'
+    )
+    
+    similarity = fields.Float(
+        string='Similarity',
+        digits=(16, 2),
+        readonly=True
+    )
+    
+    state = fields.Selection(
+        selection=[
+            ('pending', 'To Review'),
+            ('linked', 'Linked'),
+            ('created', 'Added to Catalog'),
+        ],
+        string='Status',
+        default='pending',
+        readonly=True
+    )
+    
+    def action_link(self):
+        """Link the lines to the suggested medicine"""
+        Medicine = self.env['hospital.medicine']
+        for record in self.filtered(lambda r: r.state == 'pending'):
+            if not record.suggested_medicine_id:
+                raise UserError(f'Please choose the medicine for "{record.name}" first.')
+            Medicine._link_names([(name, record.suggested_medicine_id.id) for name in record.medicine_names or []])
+            record.state = 'linked'
+    
+    def action_create_medicine(self):
+        """Add the name to the catalog and link the lines to it"""
+        Medicine = self.env['hospital.medicine']
+        for record in self.filtered(lambda r: r.state == 'pending'):
+            medicine = Medicine.create({
+                'name': record.name.title(),
+                'medicine_type': record.medicine_type or 'other',
+            })
+            Medicine._link_names([(name, medicine.id) for name in record.medicine_names or []])
+            record.state = 'created'
@@ -1,5 +1,6 @@
 from odoo import models, fields, api
-from datetime import date
+from odoo.tools import split_every
+from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 
 
@@ -8,7 +9,7 @@ class HospitalPatient(models.Model):
     
     _name = 'hospital.patient'
     _description = 'Hospital Patient'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['hospital.audit.mixin', 'mail.thread', 'mail.activity.mixin']
     _rec_name = 'name'
     _order = 'name'
     
@@ -39,6 +40,11 @@ class HospitalPatient(models.Model):
         string='Date of Birth'
     )
     
+    email = fields.Char(
+        string='Email',
+        help='Address follow-up appointment notices are sent to'
+    )
+    
     # Relation with Doctor (Many2one)
     doctor_id = fields.Many2one(
         comodel_name='hospital.doctor',
@@ -128,27 +134,34 @@ class HospitalPatient(models.Model):
     def _onchange_date_of_birth(self):
         """Calculate age automatically when date of birth changes"""
         if self.date_of_birth:
-            today = date.today()
-            dob = self.date_of_birth
-            
             # حساب العمر بالسنوات
-            age = relativedelta(today, dob).years
-            self.age = age
+            self.age = self._age_from_date_of_birth(self.date_of_birth)
         else:
             self.age = 0
     
     # Onchange: Suggest doctor based on age
     @api.onchange('age')
     def _onchange_age(self):
-        """Suggest doctor based on patient age"""
+        """Suggest the least loaded doctor of the required specialty"""
+        specialty = self._get_required_specialty()
+        if specialty:
+            doctor = self.env['hospital.doctor.assignment'].get_doctor(specialty)
+            if doctor:
+                self.doctor_id = doctor
+    
+    def _get_required_specialty(self):
+        """Return the specialty a patient should be assigned to, if any"""
+        self.ensure_one()
         if self.age and self.age < 18:
-            # ابحث عن دكتور أطفال
-            pediatric_doctor = self.env['hospital.doctor'].search([
-                ('specialty', 'ilike', 'pediatric')
-            ], limit=1)
-            
-            if pediatric_doctor:
-                self.doctor_id = pediatric_doctor.id
+            return 'pediatrics'
+        return False
+    
+    @api.model
+    def _age_from_date_of_birth(self, date_of_birth):
+        """Return age in years for a date of birth"""
+        if not date_of_birth:
+            return 0
+        return relativedelta(date.today(), fields.Date.to_date(date_of_birth)).years
     
     @api.depends('age')
     def _compute_is_child(self):
@@ -184,11 +197,14 @@ class HospitalPatient(models.Model):
                 record.message_post(body='Consultation started.')
     
     def action_done(self):
-        """Move patient to done state"""
+        """Move patient to done state and pre-render their patient card"""
         for record in self:
             if record.state == 'consultation':
                 record.state = 'done'
                 record.message_post(body='Consultation completed.')
+        cron = self.env.ref('hospital_management.ir_cron_prerender_patient_cards', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
     
     def action_cancel(self):
         """Cancel patient appointment"""
@@ -206,21 +222,75 @@ class HospitalPatient(models.Model):
     # Override create to generate reference
     @api.model_create_multi
     def create(self, vals_list):
-        """Generate sequence number for reference and send welcome email"""
+        """Generate sequence number for reference, assign a doctor and send welcome email"""
         for vals in vals_list:
             if vals.get('reference', 'New') == 'New':
                 vals['reference'] = self.env['ir.sequence'].next_by_code(
                     'hospital.patient'
                 ) or 'New'
+            # Imports and RPC calls do not trigger the onchange
+            if not vals.get('age') and vals.get('date_of_birth'):
+                vals['age'] = self._age_from_date_of_birth(vals['date_of_birth'])
         
         records = super().create(vals_list)
         
+        Assignment = self.env['hospital.doctor.assignment']
+        Assignment._notify_patients(records)
+        Assignment.assign(records)
+        
         # Send welcome email to new patients
         for record in records:
             record.send_welcome_email()
         
         return records
     
+    def write(self, vals):
+        """Keep the doctor assignment queues in sync with manual changes.
+        
+        Archiving a patient releases its doctor's capacity, restoring it
+        takes it again.
+        """
+        if not {'doctor_id', 'active'} & set(vals) or self.env.context.get('hospital_doctor_assignment'):
+            return super().write(vals)
+        
+        Assignment = self.env['hospital.doctor.assignment']
+        Assignment._notify_patients(self, delta=-1)
+        result = super().write(vals)
+        Assignment._notify_patients(self)
+        return result
+    
+    def unlink(self):
+        """Release the doctor capacity held by the removed patients"""
+        self.env['hospital.doctor.assignment']._notify_patients(self, delta=-1)
+        return super().unlink()
+    
+    # ==========================================
+    # Reports
+    # ==========================================
+    
+    def action_print_card(self):
+        """Print patient cards, reusing cached PDFs when unchanged"""
+        return self.env['hospital.report.renderer'].action_download(
+            'hospital_management.action_report_patient_card', self.ids, 'patient_cards'
+        )
+    
+    @api.model
+    def _cron_prerender_cards(self, batch_size=50, auto_commit=True):
+        """Render the cards of recently discharged patients ahead of printing (Called by Cron).
+        
+        Cards already cached for the current documents are skipped by the
+        renderer, so repeated runs only render what changed.
+        """
+        since = fields.Datetime.now() - timedelta(days=1)
+        patient_ids = self.search([('state', '=', 'done'), ('write_date', '>=', since)], order='id').ids
+        Renderer = self.env['hospital.report.renderer']
+        for batch_ids in split_every(batch_size, patient_ids):
+            Renderer.render('hospital_management.action_report_patient_card', list(batch_ids))
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+        return len(patient_ids)
+    
     # ==========================================
     # Email Notification Methods
     # ==========================================
@@ -1,5 +1,44 @@
+import logging
+import math
+from datetime import timedelta
+
 from odoo import models, fields, api
-from odoo.exceptions import ValidationError
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import create_index
+
+from .medicine import MEDICINE_TYPES
+
+_logger = logging.getLogger(__name__)
+
+# Doses taken per day for each frequency (as needed has no fixed count)
+DOSES_PER_DAY = {
+    'once_daily': 1,
+    'twice_daily': 2,
+    'three_times': 3,
+    'four_times': 4,
+    'every_4_hours': 6,
+    'every_6_hours': 4,
+    'every_8_hours': 3,
+    'every_12_hours': 2,
+    'as_needed': 0,
+    'before_meals': 3,
+    'after_meals': 3,
+    'at_bedtime': 1,
+}
+
+# Medicine types dispensed per dose (one unit per dose); other forms
+# such as syrups, creams or inhalers are dispensed in packs set by hand
+COUNTABLE_TYPES = ('tablet', 'capsule')
+
+# Prescription states the follow-up scheduler books appointments for
+FOLLOW_UP_STATES = ('confirmed', 'dispensed', 'completed')
+
+# Length of a duration unit in days
+DURATION_DAYS = {
+    'days': 1,
+    'weeks': 7,
+    'months': 30,
+}
 
 
 class HospitalPrescription(models.Model):
@@ -7,7 +46,7 @@ class HospitalPrescription(models.Model):
     
     _name = 'hospital.prescription'
     _description = 'Medical Prescription'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['hospital.audit.mixin', 'mail.thread', 'mail.activity.mixin']
     _rec_name = 'reference'
     _order = 'prescription_date desc'
     
@@ -75,6 +114,11 @@ class HospitalPrescription(models.Model):
         compute='_compute_medicine_count'
     )
     
+    interaction_warning = fields.Text(
+        string='Drug Interactions',
+        compute='_compute_interaction_warning'
+    )
+    
     # Instructions
     general_instructions = fields.Text(
         string='General Instructions',
@@ -96,6 +140,21 @@ class HospitalPrescription(models.Model):
         help='Next appointment date'
     )
     
+    course_end_date = fields.Date(
+        string='Course End Date',
+        compute='_compute_course_end_date',
+        store=True,
+        help='Date the longest medicine course of the prescription ends'
+    )
+    
+    follow_up_appointment_id = fields.Many2one(
+        comodel_name='hospital.appointment',
+        string='Follow-up Appointment',
+        copy=False,
+        ondelete='set null',
+        help='Draft appointment booked by the follow-up scheduler'
+    )
+    
     # Related Fields
     patient_name = fields.Char(
         related='patient_id.name',
@@ -160,6 +219,71 @@ class HospitalPrescription(models.Model):
         for record in self:
             record.medicine_count = len(record.medicine_line_ids)
     
+    @api.depends('prescription_date', 'medicine_line_ids.duration_number', 'medicine_line_ids.duration_unit')
+    def _compute_course_end_date(self):
+        """Prescription date plus the longest line duration"""
+        for record in self:
+            days = max((line._get_course_days() for line in record.medicine_line_ids), default=0)
+            if record.prescription_date and days:
+                record.course_end_date = record.prescription_date + timedelta(days=days)
+            else:
+                record.course_end_date = False
+    
+    @api.depends('patient_id', 'medicine_line_ids.medicine_name')
+    def _compute_interaction_warning(self):
+        """Summarize interactions with the patient's other active medicines"""
+        interactions = self._get_interactions()
+        for record in self:
+            record.interaction_warning = self._format_interactions(interactions.get(record.id, []))
+    
+    # ==========================================
+    # Drug Interactions
+    # ==========================================
+    
+    def _get_active_medicines(self):
+        """Medicine names of the patients' other active prescriptions.
+        
+        Returns {patient_id: [medicine names]}, read in one grouped query.
+        """
+        patient_ids = self.patient_id.ids
+        if not patient_ids:
+            return {}
+        groups = self.env['hospital.prescription.line']._read_group(
+            [
+                ('patient_id', 'in', patient_ids),
+                ('prescription_id.state', 'in', ('confirmed', 'dispensed')),
+                ('prescription_id', 'not in', self._origin.ids),
+            ],
+            ['patient_id'],
+            ['medicine_name:array_agg'],
+        )
+        return {patient.id: names for patient, names in groups}
+    
+    def _get_interactions(self):
+        """Interactions of each prescription's medicines with each other and
+        with the patient's other active prescriptions, by prescription id"""
+        active_medicines = self._get_active_medicines()
+        Interaction = self.env['hospital.drug.interaction']
+        index = Interaction._get_index()
+        return {
+            record.id: Interaction._find_interactions(
+                record.medicine_line_ids.mapped('medicine_name'),
+                active_medicines.get(record.patient_id.id, []),
+                index=index,
+            )
+            for record in self
+        }
+    
+    @api.model
+    def _format_interactions(self, interactions):
+        """Human readable list of interactions"""
+        labels = dict(self.env['hospital.drug.interaction']._fields['severity'].selection)
+        return '\n'.join(
+            f'{labels[i.severity]}: {i.drug_a} + {i.drug_b}'
+            + (f' - {i.description}' if i.description else '')
+            for i in interactions
+        )
+    
     # ==========================================
     # Onchange Methods
     # ==========================================
@@ -215,18 +339,161 @@ class HospitalPrescription(models.Model):
                 ) or 'New'
         return super().create(vals_list)
     
+    def init(self):
+        """Partial indexes for the medicine demand forecast and the
+        follow-up scheduler"""
+        create_index(
+            self.env.cr,
+            'hospital_prescription_demand_idx',
+            self._table,
+            ['prescription_date', 'id'],
+            where="state IN ('confirmed', 'dispensed', 'completed') AND active",
+        )
+        create_index(
+            self.env.cr,
+            'hospital_prescription_follow_up_idx',
+            self._table,
+            ['follow_up_date'],
+            where="follow_up_appointment_id IS NULL AND active",
+        )
+        create_index(
+            self.env.cr,
+            'hospital_prescription_course_end_idx',
+            self._table,
+            ['course_end_date'],
+            where="follow_up_appointment_id IS NULL AND follow_up_date IS NULL AND active",
+        )
+    
+    # ==========================================
+    # Follow-up Scheduling
+    # ==========================================
+    
+    @api.model
+    def _get_follow_up_lead_days(self):
+        """Days ahead the follow-up scheduler books appointments"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'hospital_management.follow_up_lead_days', 3
+        ))
+    
+    @api.model
+    def _get_due_follow_up_domain(self, date_from, date_to):
+        """Prescriptions with a follow-up due by the end of the window
+        (overdue ones included), or without one a course ending in it"""
+        return [
+            ('state', 'in', FOLLOW_UP_STATES),
+            ('follow_up_appointment_id', '=', False),
+            '|',
+            ('follow_up_date', '<=', date_to),
+            '&', '&', ('follow_up_date', '=', False),
+            ('course_end_date', '>=', date_from), ('course_end_date', '<=', date_to),
+        ]
+    
+    def _get_follow_up_target(self, tomorrow):
+        """Earliest date for the follow-up (a refill visit the day before the course ends)"""
+        self.ensure_one()
+        target = self.follow_up_date or self.course_end_date - timedelta(days=1)
+        return max(target, tomorrow)
+    
+    def _schedule_follow_ups(self):
+        """Book draft follow-up appointments with the prescribing doctors.
+        
+        Slots come from one free-slot lookup for the whole batch; overdue
+        follow-ups get the next free slot from tomorrow on. Each
+        appointment is created in its own savepoint, so one rejected by
+        the appointment constraints does not hold back the others.
+        Patient notifications are queued, not sent inline. Returns the
+        prescriptions booked.
+        """
+        tomorrow = fields.Date.today() + timedelta(days=1)
+        Appointment = self.env['hospital.appointment'].with_context(
+            tracking_disable=True, mail_create_nolog=True
+        )
+        slots = Appointment._find_free_slots([
+            (record.doctor_id.id, record._get_follow_up_target(tomorrow))
+            for record in self
+        ])
+        booked = self.browse()
+        appointments = Appointment.browse()
+        for record, slot in zip(self, slots):
+            if not slot:
+                continue
+            day, time = slot
+            reason = 'Follow-up' if record.follow_up_date else 'Refill review'
+            try:
+                with self.env.cr.savepoint():
+                    appointment = Appointment.create({
+                        'patient_id': record.patient_id.id,
+                        'doctor_id': record.doctor_id.id,
+                        'appointment_date': day,
+                        'appointment_time': time,
+                        'appointment_type': 'followup',
+                        'notes': f'{reason} for prescription {record.reference}',
+                    })
+                    record.follow_up_appointment_id = appointment
+            except UserError as e:
+                _logger.warning('Follow-up of prescription %s not booked: %s', record.reference, e)
+                continue
+            booked |= record
+            appointments |= appointment
+        
+        template = self.env.ref('hospital_management.email_template_follow_up_appointment', raise_if_not_found=False)
+        to_notify = appointments.filtered(lambda a: a.patient_id.email)
+        if template and to_notify:
+            try:
+                template.send_mail_batch(to_notify.ids)
+            except Exception:
+                _logger.exception('Failed to queue follow-up appointment emails')
+        return booked
+    
+    @api.model
+    def _cron_schedule_follow_ups(self, batch_size=200, auto_commit=True):
+        """Book follow-ups and refill reviews that fall due soon (Called by Cron)"""
+        today = fields.Date.today()
+        domain = self._get_due_follow_up_domain(today, today + timedelta(days=self._get_follow_up_lead_days()))
+        skipped = []
+        count = 0
+        while True:
+            batch = self.search(domain + [('id', 'not in', skipped)], order='id', limit=batch_size)
+            if not batch:
+                break
+            booked = batch._schedule_follow_ups()
+            skipped += (batch - booked).ids
+            count += len(booked)
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+        return count
+    
     # ==========================================
     # Action Methods
     # ==========================================
     
     def action_confirm(self):
-        """Confirm prescription"""
-        for record in self:
-            if record.state == 'draft':
-                if not record.medicine_line_ids:
-                    raise ValidationError('Please add at least one medicine!')
-                record.state = 'confirmed'
-                record.message_post(body='Prescription confirmed.')
+        """Confirm prescription.
+        
+        Each prescription's medicines are checked against each other and
+        against the patient's active prescriptions at once; contraindicated
+        combinations involving the prescription block confirmation and
+        other interactions are logged on it.
+        """
+        drafts = self.filtered(lambda r: r.state == 'draft')
+        interactions = drafts._get_interactions()
+        for record in drafts:
+            if not record.medicine_line_ids:
+                raise ValidationError('Please add at least one medicine!')
+            blocking = [i for i in interactions[record.id] if i.severity == 'contraindicated']
+            if blocking:
+                raise UserError(
+                    f'{record.reference}: contraindicated drug combination!\n'
+                    + self._format_interactions(blocking)
+                )
+        for record in drafts:
+            record.state = 'confirmed'
+            record.message_post(body='Prescription confirmed.')
+            if interactions[record.id]:
+                record.message_post(
+                    body='Drug interactions found:\n' + self._format_interactions(interactions[record.id])
+                )
     
     def action_dispense(self):
         """Mark prescription as dispensed"""
@@ -256,9 +523,10 @@ class HospitalPrescription(models.Model):
             record.message_post(body='Reset to draft.')
     
     def action_print_prescription(self):
-        """Print prescription report"""
-        self.ensure_one()
-        return self.env.ref('hospital_management.action_report_prescription').report_action(self)
+        """Print prescriptions, reusing cached PDFs when unchanged"""
+        return self.env['hospital.report.renderer'].action_download(
+            'hospital_management.action_report_prescription', self.ids, 'prescriptions'
+        )
 
 
 class HospitalPrescriptionLine(models.Model):
@@ -280,29 +548,46 @@ class HospitalPrescriptionLine(models.Model):
         default=10
     )
     
+    medicine_id = fields.Many2one(
+        comodel_name='hospital.medicine',
+        string='Medicine',
+        index=True,
+        ondelete='restrict'
+    )
+    
     medicine_name = fields.Char(
         string='Medicine Name',
+        compute='_compute_from_medicine',
+        store=True,
+        readonly=False,
+        precompute=True,
         required=True
     )
     
+    patient_id = fields.Many2one(
+        related='prescription_id.patient_id',
+        string='Patient',
+        store=True,
+        index=True
+    )
+    
     medicine_type = fields.Selection(
-        selection=[
-            ('tablet', 'Tablet'),
-            ('capsule', 'Capsule'),
-            ('syrup', 'Syrup'),
-            ('injection', 'Injection'),
-            ('cream', 'Cream/Ointment'),
-            ('drops', 'Drops'),
-            ('inhaler', 'Inhaler'),
-            ('other', 'Other'),
-        ],
+        selection=MEDICINE_TYPES,
         string='Type',
+        compute='_compute_from_medicine',
+        store=True,
+        readonly=False,
+        precompute=True,
         required=True,
         default='tablet'
     )
     
     dosage = fields.Char(
         string='Dosage',
+        compute='_compute_from_medicine',
+        store=True,
+        readonly=False,
+        precompute=True,
         required=True,
         help='e.g., 500mg, 10ml, 1 puff'
     )
@@ -345,8 +630,11 @@ class HospitalPrescriptionLine(models.Model):
     
     quantity = fields.Integer(
         string='Quantity',
-        default=1,
-        help='Number of units to dispense'
+        compute='_compute_quantity',
+        store=True,
+        readonly=False,
+        precompute=True,
+        help='Number of units to dispense, computed from frequency and duration for tablets and capsules'
     )
     
     timing = fields.Selection(
@@ -370,6 +658,36 @@ class HospitalPrescriptionLine(models.Model):
         string='Notes'
     )
     
+    @api.depends('medicine_id')
+    def _compute_from_medicine(self):
+        """Take name, type and default strength from the catalog medicine"""
+        for line in self:
+            medicine = line.medicine_id
+            if not medicine:
+                continue
+            line.medicine_name = medicine.name
+            line.medicine_type = medicine.medicine_type
+            line.dosage = medicine.strength or line.dosage
+    
+    def _get_course_days(self):
+        """Length of the medicine course in days"""
+        self.ensure_one()
+        return max(self.duration_number or 0, 0) * DURATION_DAYS.get(self.duration_unit or 'days', 1)
+    
+    @api.depends('medicine_type', 'frequency', 'duration_number', 'duration_unit')
+    def _compute_quantity(self):
+        """One unit per dose over the whole course for tablets and capsules.
+        
+        Other medicine types and as needed lines keep their quantity.
+        """
+        for line in self:
+            doses = DOSES_PER_DAY.get(line.frequency, 0)
+            days = line._get_course_days()
+            if line.medicine_type in COUNTABLE_TYPES and doses and days > 0:
+                line.quantity = math.ceil(doses * days)
+            elif not line.quantity:
+                line.quantity = 1
+    
     @api.constrains('duration_number', 'quantity')
     def _check_positive_values(self):
         """Ensure duration and quantity are positive"""
@@ -377,4 +695,18 @@ class HospitalPrescriptionLine(models.Model):
             if line.duration_number <= 0:
                 raise ValidationError('Duration must be greater than zero!')
             if line.quantity <= 0:
-                raise ValidationError('Quantity must be greater than zero!')
\ No newline at end of file
+                raise ValidationError('Quantity must be greater than zero!')
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Link free-text medicines to the catalog"""
+        lines = super().create(vals_list)
+        self.env['hospital.medicine']._link_prescription_lines(lines)
+        return lines
+    
+    def write(self, vals):
+        """Link free-text medicines to the catalog when renamed"""
+        result = super().write(vals)
+        if 'medicine_name' in vals and not vals.get('medicine_id'):
+            self.env['hospital.medicine']._link_prescription_lines(self)
+        return result
@@ -0,0 +1,3 @@
+from . import doctor_report
+from . import patient_report
+from . import report_renderer
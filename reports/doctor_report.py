@@ -0,0 +1,108 @@
+from odoo import models, api
+
+
+class DoctorProfileReport(models.AbstractModel):
+    """Data loader for the doctor profile report"""
+    
+    _name = 'report.hospital_management.report_doctor_profile'
+    _description = 'Doctor Profile Report'
+    
+    @api.model
+    def _get_patient_limit(self):
+        """Maximum number of patient rows printed per doctor"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'hospital_management.doctor_report_patient_limit', 200
+        ))
+    
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        """Load everything the template needs in a few batched reads"""
+        doctors = self.env['hospital.doctor'].browse(docids)
+        doctors.fetch([
+            'name', 'specialty', 'phone', 'email', 'consultation_fee',
+            'max_patients', 'patient_count', 'availability', 'active',
+        ])
+        limit = self._get_patient_limit()
+        
+        return {
+            'doc_ids': docids,
+            'doc_model': 'hospital.doctor',
+            'docs': doctors,
+            'patient_limit': limit,
+            'patient_stats': self._get_patient_stats(doctors),
+            'patient_rows': self._get_patient_rows(doctors, limit),
+        }
+    
+    @api.model
+    def _get_patient_stats(self, doctors):
+        """Per-doctor patient aggregates from one grouped query"""
+        stats = {
+            doctor.id: {'total': 0, 'children': 0, 'male': 0, 'female': 0, 'other': 0}
+            for doctor in doctors
+        }
+        groups = self.env['hospital.patient']._read_group(
+            [('doctor_id', 'in', doctors.ids)],
+            ['doctor_id', 'gender', 'is_child'],
+            ['__count'],
+        )
+        for doctor, gender, is_child, count in groups:
+            doctor_stats = stats[doctor.id]
+            doctor_stats['total'] += count
+            if is_child:
+                doctor_stats['children'] += count
+            if gender in ('male', 'female', 'other'):
+                doctor_stats[gender] += count
+        return stats
+    
+    @api.model
+    def _get_patient_rows(self, doctors, limit):
+        """First `limit` patients of each doctor, read in a single batch"""
+        rows = {doctor.id: [] for doctor in doctors}
+        if not doctors:
+            return rows
+        
+        Patient = self.env['hospital.patient']
+        Patient.flush_model(['doctor_id', 'name', 'active'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM (
+                    SELECT id,
+                           ROW_NUMBER() OVER (PARTITION BY doctor_id ORDER BY name, id) AS rank
+                      FROM hospital_patient
+                     WHERE doctor_id = ANY(%s)
+                       AND active
+                   ) ranked
+             WHERE rank <= %s
+        """, [doctors.ids, limit])
+        patient_ids = [row[0] for row in self.env.cr.fetchall()]
+        
+        patients = Patient.search_read(
+            [('id', 'in', patient_ids)],
+            ['doctor_id', 'reference', 'name', 'age', 'is_child',
+             'gender', 'admission_date', 'active'],
+            order='name, id',
+        )
+        for patient in patients:
+            rows[patient['doctor_id'][0]].append(patient)
+        return rows
+    
+    # ==========================================
+    # Batch Rendering
+    # ==========================================
+    
+    @api.model
+    def _get_chunk_size(self):
+        """Number of doctors rendered per PDF in batch jobs"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'hospital_management.doctor_report_chunk_size', 20
+        ))
+    
+    @api.model
+    def render_zip(self, doctor_ids):
+        """Render doctor profiles in chunks and pack them in a zip attachment"""
+        return self.env['hospital.report.renderer'].render_zip(
+            'hospital_management.action_report_doctor_profile',
+            doctor_ids,
+            'doctor_profiles',
+            chunk_size=self._get_chunk_size()
+        )
@@ -0,0 +1,96 @@
+from collections import defaultdict
+
+from odoo import models, api
+from odoo.tools import SQL
+
+
+class PatientCardReport(models.AbstractModel):
+    """Data loader for the patient card report"""
+    
+    _name = 'report.hospital_management.report_patient_card'
+    _description = 'Patient Card Report'
+    
+    # Patient documents printed on the card: {key: (model, date field, fields)}
+    _history = {
+        'records': (
+            'hospital.medical.record', 'record_date',
+            ['reference', 'record_date', 'record_type', 'diagnosis', 'doctor_id', 'patient_id'],
+        ),
+        'prescriptions': (
+            'hospital.prescription', 'prescription_date',
+            ['reference', 'prescription_date', 'state', 'doctor_id', 'medicine_line_ids', 'patient_id'],
+        ),
+        'lab_tests': (
+            'hospital.lab.test', 'test_date',
+            ['reference', 'test_date', 'test_name', 'state', 'result_status', 'patient_id'],
+        ),
+    }
+    
+    @api.model
+    def _get_history_limit(self):
+        """Maximum number of documents of each kind printed per patient"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'hospital_management.patient_report_history_limit', 10
+        ))
+    
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        """Load everything the template needs in a few batched reads"""
+        patients = self.env['hospital.patient'].browse(docids)
+        patients.fetch([
+            'reference', 'name', 'gender', 'date_of_birth', 'age', 'is_child',
+            'admission_date', 'active', 'notes', 'doctor_id',
+        ])
+        patients.doctor_id.fetch([
+            'name', 'specialty', 'phone', 'email', 'consultation_fee', 'availability',
+        ])
+        limit = self._get_history_limit()
+        values = {
+            'doc_ids': docids,
+            'doc_model': 'hospital.patient',
+            'docs': patients,
+            'history_limit': limit,
+        }
+        for key, (model_name, date_field, field_names) in self._history.items():
+            values[key] = self._get_latest(model_name, date_field, field_names, patients, limit)
+        prescriptions = self.env['hospital.prescription'].concat(*values['prescriptions'].values())
+        prescriptions.medicine_line_ids.fetch(['medicine_name', 'dosage', 'frequency'])
+        return values
+    
+    @api.model
+    def _get_latest(self, model_name, date_field, field_names, patients, limit):
+        """Latest `limit` documents of each patient, read in a single batch.
+        
+        Returns {patient id: recordset}, most recent first. Ranking runs
+        in one window query over all patients, which honours record rules
+        and archiving through ``_search``.
+        """
+        Model = self.env[model_name]
+        latest = {patient.id: Model.browse() for patient in patients}
+        if not patients:
+            return latest
+        
+        Model.flush_model(['patient_id', date_field])
+        query = Model._search([('patient_id', 'in', patients.ids)])
+        ranked = query.select(
+            SQL.identifier(Model._table, 'id'),
+            SQL(
+                "ROW_NUMBER() OVER (PARTITION BY %s ORDER BY %s DESC NULLS LAST, %s DESC)",
+                SQL.identifier(Model._table, 'patient_id'),
+                SQL.identifier(Model._table, date_field),
+                SQL.identifier(Model._table, 'id'),
+            ),
+        )
+        self.env.cr.execute(SQL(
+            "SELECT id FROM (%s) AS ranked (id, rank) WHERE rank <= %s ORDER BY rank",
+            ranked, limit,
+        ))
+        documents = Model.browse([row[0] for row in self.env.cr.fetchall()])
+        documents.fetch(field_names)
+        
+        by_patient = defaultdict(list)
+        for document in documents:
+            by_patient[document.patient_id.id].append(document.id)
+        for patient_id, document_ids in by_patient.items():
+            latest[patient_id] = documents.browse(document_ids).with_prefetch(documents._prefetch_ids)
+        return latest
@@ -0,0 +1,333 @@
+import base64
+import hashlib
+import io
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote as url_quote
+
+from odoo import models, fields, api
+from odoo.tools import split_every
+
+
+class HospitalReportCache(models.Model):
+    """Rendered PDF of one record, kept until the record changes.
+    
+    Cached PDFs live here rather than as attachments of the printed
+    records, so they never show up in their chatter or attachment lists.
+    """
+    
+    _name = 'hospital.report.cache'
+    _description = 'Cached Report PDF'
+    
+    report_name = fields.Char(
+        string='Report',
+        required=True,
+        index=True
+    )
+    
+    res_model = fields.Char(
+        string='Model',
+        required=True
+    )
+    
+    res_id = fields.Many2oneReference(
+        string='Record ID',
+        model_field='res_model',
+        required=True,
+        index=True
+    )
+    
+    key = fields.Char(
+        string='Cache Key',
+        required=True,
+        help='Report name, latest write date and document counts of the printed data'
+    )
+    
+    scope = fields.Char(
+        string='Scope',
+        required=True,
+        help='Language and access rights the PDF was rendered with'
+    )
+    
+    name = fields.Char(
+        string='File Name',
+        required=True
+    )
+    
+    pdf = fields.Binary(
+        string='PDF',
+        attachment=True
+    )
+    
+    @api.autovacuum
+    def _gc_deleted_records(self):
+        """Drop cached PDFs of records that no longer exist"""
+        for res_model, entries in self._read_group([], ['res_model'], ['id:recordset']):
+            if res_model not in self.env:
+                entries.unlink()
+                continue
+            records = self.env[res_model].with_context(active_test=False).browse(entries.mapped('res_id'))
+            existing = set(records.exists().ids)
+            entries.filtered(lambda entry: entry.res_id not in existing).unlink()
+
+
+class HospitalReportRenderer(models.AbstractModel):
+    """Batch PDF rendering with per-record caching"""
+    
+    _name = 'hospital.report.renderer'
+    _description = 'Hospital Report Renderer'
+    
+    # Reports that also print child records: {model: [(child model, link field)]}.
+    # Child changes then invalidate the cached PDF of their parent.
+    _stamp_dependencies = {
+        'hospital.doctor': [('hospital.patient', 'doctor_id')],
+        'hospital.patient': [
+            ('hospital.medical.record', 'patient_id'),
+            ('hospital.prescription', 'patient_id'),
+            ('hospital.prescription.line', 'patient_id'),
+            ('hospital.lab.test', 'patient_id'),
+        ],
+        'hospital.prescription': [('hospital.prescription.line', 'prescription_id')],
+    }
+    
+    # Reports that also print linked records: {model: [many2one field]}
+    _stamp_parents = {
+        'hospital.patient': ['doctor_id'],
+        'hospital.prescription': ['patient_id', 'doctor_id'],
+    }
+    
+    @api.model
+    def _get_workers(self):
+        """Maximum number of chunks rendered in parallel"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'hospital_management.report_render_workers', 4
+        ))
+    
+    @api.model
+    def _get_chunk_size(self):
+        """Number of records rendered per wkhtmltopdf run"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'hospital_management.report_render_chunk_size', 20
+        ))
+    
+    # ==========================================
+    # Cache
+    # ==========================================
+    
+    @api.model
+    def _get_cache_scope(self):
+        """Language and access rights the current user renders with.
+        
+        Reports are translated and only list the documents the user may
+        read (record rules apply to the printed children), so PDFs are
+        shared only between users with the same language, groups and
+        companies, and never with superuser renders.
+        """
+        rights = 'su' if self.env.su else ','.join(map(str, sorted(self.env.user._get_group_ids())))
+        companies = ','.join(map(str, sorted(self.env.companies.ids)))
+        digest = hashlib.sha1(f'{rights}|{companies}'.encode()).hexdigest()[:16]
+        return f'{self.env.lang or "en_US"}:{digest}'
+    
+    @api.model
+    def _get_cache_keys(self, report, records):
+        """Cache key of each record: report name, latest write date and
+        number of child documents.
+        
+        The write date also covers the linked and child records listed
+        in the report (see ``_stamp_parents`` and ``_stamp_dependencies``),
+        with one grouped query per child model. Archived children count
+        too, so archiving a printed document invalidates the PDF, and the
+        child counts catch deleted documents, which leave no write date.
+        """
+        stamps = {record.id: record.write_date for record in records}
+        counts = {record.id: [] for record in records}
+        for field_name in self._stamp_parents.get(report.model, []):
+            for record in records:
+                write_date = record[field_name].write_date
+                if write_date and write_date > stamps[record.id]:
+                    stamps[record.id] = write_date
+        for child_model, link_field in self._stamp_dependencies.get(report.model, []):
+            groups = self.env[child_model].sudo().with_context(active_test=False)._read_group(
+                [(link_field, 'in', records.ids)],
+                [link_field],
+                ['write_date:max', '__count'],
+            )
+            child_counts = {}
+            for parent, write_date, count in groups:
+                child_counts[parent.id] = count
+                if write_date and write_date > stamps[parent.id]:
+                    stamps[parent.id] = write_date
+            for res_id in counts:
+                counts[res_id].append(str(child_counts.get(res_id, 0)))
+        return {
+            res_id: f'{report.report_name}@{fields.Datetime.to_string(stamp)}#{"/".join(counts[res_id])}'
+            for res_id, stamp in stamps.items()
+        }
+    
+    @api.model
+    def _get_cached(self, report, keys):
+        """Return {res_id: cache entry} for records with an up-to-date PDF
+        rendered in the current scope (see ``_get_cache_scope``)"""
+        entries = self.env['hospital.report.cache'].sudo().search([
+            ('report_name', '=', report.report_name),
+            ('res_model', '=', report.model),
+            ('scope', '=', self._get_cache_scope()),
+            ('res_id', 'in', list(keys)),
+            ('key', 'in', list(set(keys.values()))),
+        ])
+        return {
+            entry.res_id: entry
+            for entry in entries
+            if keys[entry.res_id] == entry.key
+        }
+    
+    @api.model
+    def _store(self, report, keys, pdfs):
+        """Save rendered PDFs in the cache, replacing outdated versions of the same scope"""
+        Cache = self.env['hospital.report.cache'].sudo()
+        scope = self._get_cache_scope()
+        Cache.search([
+            ('report_name', '=', report.report_name),
+            ('res_model', '=', report.model),
+            ('scope', '=', scope),
+            ('res_id', 'in', list(pdfs)),
+        ]).unlink()
+        records = self.env[report.model].browse(list(pdfs))
+        entries = Cache.create([{
+            'report_name': report.report_name,
+            'res_model': report.model,
+            'res_id': record.id,
+            'key': keys[record.id],
+            'scope': scope,
+            'name': f'{report.name} - {record.display_name}.pdf',
+            'pdf': base64.b64encode(pdfs[record.id]),
+        } for record in records])
+        return {entry.res_id: entry for entry in entries}
+    
+    # ==========================================
+    # Rendering
+    # ==========================================
+    
+    @api.model
+    def _render_chunk(self, report, res_ids):
+        """Render records in one wkhtmltopdf run and split it per record.
+        
+        Records the PDF could not be split for are rendered on their own.
+        """
+        Report = self.env['ir.actions.report'].with_context(report_pdf_no_attachment=True)
+        streams = Report._render_qweb_pdf_prepare_streams(
+            report.report_name, {'report_type': 'pdf'}, res_ids=list(res_ids)
+        )
+        pdfs = {
+            res_id: data['stream'].getvalue()
+            for res_id, data in streams.items()
+            if res_id and data['stream']
+        }
+        for res_id in res_ids:
+            if res_id not in pdfs:
+                pdfs[res_id] = Report._render_qweb_pdf(report.report_name, [res_id])[0]
+        return pdfs
+    
+    def _render_chunk_in_thread(self, report_id, res_ids):
+        """Render a chunk on a dedicated cursor (pool threads cannot share ours)"""
+        with self.env.registry.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, self.env.context)
+            report = env['ir.actions.report'].browse(report_id)
+            return env[self._name]._render_chunk(report, res_ids)
+    
+    @api.model
+    def _has_pending_writes(self):
+        """Whether the current transaction changed data not committed yet.
+        
+        Pool threads render on their own cursors and only see committed
+        data, so they would cache PDFs older than their keys.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("SELECT txid_current_if_assigned() IS NOT NULL")
+        return self.env.cr.fetchone()[0]
+    
+    @api.model
+    def _render_pdfs(self, report, res_ids, chunk_size):
+        """Render one PDF per record, spreading chunks over a bounded pool.
+        
+        wkhtmltopdf runs as a subprocess, so threads render chunks in
+        parallel. Chunks are rendered inline on the current cursor when
+        there is a single one, or when the transaction has pending
+        writes that the threads' cursors could not see.
+        """
+        chunks = [list(chunk) for chunk in split_every(chunk_size, res_ids)]
+        if len(chunks) == 1 or self._has_pending_writes():
+            pdfs = {}
+            for chunk in chunks:
+                pdfs.update(self._render_chunk(report, chunk))
+            return pdfs
+        
+        pdfs = {}
+        workers = max(1, min(self._get_workers(), len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._render_chunk_in_thread, report.id, chunk)
+                for chunk in chunks
+            ]
+            for future in futures:
+                pdfs.update(future.result())
+        return pdfs
+    
+    # ==========================================
+    # Public API
+    # ==========================================
+    
+    @api.model
+    def render(self, report_ref, res_ids, chunk_size=None):
+        """Return {res_id: cache entry} holding the PDF of each record.
+        
+        Up-to-date PDFs come from the cache; the others are rendered in
+        parallel chunks and cached.
+        """
+        report = self.env['ir.actions.report']._get_report(report_ref)
+        records = self.env[report.model].browse(res_ids).exists()
+        records.check_access('read')
+        keys = self._get_cache_keys(report, records)
+        entries = self._get_cached(report, keys)
+        missing = [res_id for res_id in records.ids if res_id not in entries]
+        if missing:
+            pdfs = self._render_pdfs(report, missing, chunk_size or self._get_chunk_size())
+            entries.update(self._store(report, keys, pdfs))
+        return entries
+    
+    @api.model
+    def render_zip(self, report_ref, res_ids, filename, chunk_size=None):
+        """Render records and pack one PDF per record in a zip attachment"""
+        report = self.env['ir.actions.report']._get_report(report_ref)
+        entries = self.render(report, res_ids, chunk_size=chunk_size)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for res_id in res_ids:
+                entry = entries.get(res_id)
+                if entry:
+                    archive.writestr(
+                        f'{res_id:06d}_{entry.name}',
+                        base64.b64decode(entry.with_context(bin_size=False).pdf),
+                    )
+        
+        return self.env['ir.attachment'].create({
+            'name': f'{filename}_{fields.Date.today()}.zip',
+            'datas': base64.b64encode(buffer.getvalue()),
+            'mimetype': 'application/zip',
+            'res_model': report.model,
+        })
+    
+    @api.model
+    def action_download(self, report_ref, res_ids, filename):
+        """Download the PDF of one record, or a zip of several"""
+        if len(res_ids) == 1:
+            entry = self.render(report_ref, res_ids)[res_ids[0]]
+            url = f'/web/content/hospital.report.cache/{entry.id}/pdf/{url_quote(entry.name)}?download=true'
+        else:
+            attachment = self.render_zip(report_ref, res_ids, filename)
+            url = f'/web/content/{attachment.id}?download=true'
+        return {
+            'type': 'ir.actions.act_url',
+            'url': url,
+            'target': 'self',
+        }
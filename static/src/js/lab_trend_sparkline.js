@@ -0,0 +1,125 @@
+/** @odoo-module **/
+
+import { Component, useState, onWillStart, onWillUpdateProps } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+
+const WIDTH = 160;
+const HEIGHT = 32;
+const PADDING = 3;
+
+function many2oneId(value) {
+    if (!value) {
+        return false;
+    }
+    return Array.isArray(value) ? value[0] : value.id;
+}
+
+export class LabTrendSparkline extends Component {
+    static template = "hospital_management.LabTrendSparkline";
+    static props = {
+        record: Object,
+        patientField: { type: String, optional: true },
+        limit: { type: Number, optional: true },
+        "*": true,
+    };
+
+    setup() {
+        this.orm = useService("orm");
+        this.width = WIDTH;
+        this.height = HEIGHT;
+        this.state = useState({ trends: [], loading: true });
+        this.key = null;
+
+        onWillStart(() => this.loadTrends(this.props));
+        onWillUpdateProps((nextProps) => this.loadTrends(nextProps));
+    }
+
+    getQuery(props) {
+        const record = props.record;
+        if (!props.patientField) {
+            return { patientId: record.resId, parameterIds: null };
+        }
+        const parameterIds = record.data.line_ids
+            ? [...new Set(
+                record.data.line_ids.records
+                    .map((line) => many2oneId(line.data.parameter_id))
+                    .filter(Boolean)
+            )]
+            : null;
+        return { patientId: many2oneId(record.data[props.patientField]), parameterIds };
+    }
+
+    async loadTrends(props) {
+        const { patientId, parameterIds } = this.getQuery(props);
+        const key = JSON.stringify([patientId, parameterIds]);
+        if (key === this.key) {
+            return;
+        }
+        this.key = key;
+        if (!patientId || (parameterIds && !parameterIds.length)) {
+            this.state.trends = [];
+            this.state.loading = false;
+            return;
+        }
+        const trends = await this.orm.call(
+            "hospital.lab.test.line",
+            "get_trends",
+            [patientId],
+            { parameter_ids: parameterIds, limit: props.limit || 50 }
+        );
+        this.state.trends = trends
+            .filter((trend) => trend.values.length)
+            .map((trend) => this.prepareTrend(trend));
+        this.state.loading = false;
+    }
+
+    prepareTrend(trend) {
+        const values = trend.values;
+        let min = Math.min(...values);
+        let max = Math.max(...values);
+        if (trend.low !== null) {
+            min = Math.min(min, trend.low);
+        }
+        if (trend.high !== null) {
+            max = Math.max(max, trend.high);
+        }
+        const span = max - min || 1;
+        const x = (index) =>
+            values.length > 1
+                ? PADDING + (index * (WIDTH - 2 * PADDING)) / (values.length - 1)
+                : WIDTH / 2;
+        const y = (value) => HEIGHT - PADDING - ((value - min) * (HEIGHT - 2 * PADDING)) / span;
+
+        const last = values.length - 1;
+        const band = trend.low !== null || trend.high !== null
+            ? {
+                y: y(trend.high !== null ? trend.high : max),
+                height: y(trend.low !== null ? trend.low : min) - y(trend.high !== null ? trend.high : max),
+            }
+            : null;
+        const lastValue = values[last];
+        return {
+            ...trend,
+            points: values.map((value, index) => `${x(index)},${y(value)}`).join(" "),
+            band,
+            lastX: x(last),
+            lastY: y(lastValue),
+            lastValue,
+            lastDate: trend.dates[last],
+            outOfRange:
+                (trend.low !== null && lastValue < trend.low) ||
+                (trend.high !== null && lastValue > trend.high),
+        };
+    }
+}
+
+export const labTrendSparkline = {
+    component: LabTrendSparkline,
+    extractProps: ({ options }) => ({
+        patientField: options.patient_field,
+        limit: options.limit,
+    }),
+};
+
+registry.category("view_widgets").add("hospital_lab_trends", labTrendSparkline);
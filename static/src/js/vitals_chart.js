@@ -0,0 +1,124 @@
+/** @odoo-module **/
+
+import { Component, useState, onWillStart, onWillUpdateProps } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+
+const WIDTH = 240;
+const HEIGHT = 48;
+const PADDING = 4;
+const COLORS = ["#4e73df", "#e74a3b"];
+
+// Series drawn together on one chart (systolic and diastolic share an axis)
+const CHARTS = [
+    { key: "blood_pressure", label: "Blood Pressure", fields: ["systolic_bp", "diastolic_bp"] },
+    { key: "pulse", label: "Pulse", fields: ["pulse"] },
+    { key: "temperature", label: "Temperature", fields: ["temperature"] },
+    { key: "weight", label: "Weight", fields: ["weight"] },
+    { key: "bmi", label: "BMI", fields: ["bmi"] },
+];
+
+function lastIndex(values) {
+    for (let index = values.length - 1; index >= 0; index--) {
+        if (values[index] !== null) {
+            return index;
+        }
+    }
+    return -1;
+}
+
+export class VitalsChart extends Component {
+    static template = "hospital_management.VitalsChart";
+    static props = {
+        record: Object,
+        limit: { type: Number, optional: true },
+        "*": true,
+    };
+
+    setup() {
+        this.orm = useService("orm");
+        this.width = WIDTH;
+        this.height = HEIGHT;
+        this.state = useState({ charts: [], loading: true });
+        this.patientId = null;
+
+        onWillStart(() => this.loadVitals(this.props));
+        onWillUpdateProps((nextProps) => this.loadVitals(nextProps));
+    }
+
+    async loadVitals(props) {
+        const patientId = props.record.resId;
+        if (patientId === this.patientId) {
+            return;
+        }
+        this.patientId = patientId;
+        if (!patientId) {
+            this.state.charts = [];
+            this.state.loading = false;
+            return;
+        }
+        const vitals = await this.orm.call(
+            "hospital.medical.record",
+            "get_vitals",
+            [patientId],
+            { limit: props.limit || 100 }
+        );
+        this.state.charts = this.prepareCharts(vitals);
+        this.state.loading = false;
+    }
+
+    prepareCharts(vitals) {
+        const seriesByField = Object.fromEntries(
+            vitals.series.map((series) => [series.field, series])
+        );
+        const count = vitals.dates.length;
+        const x = (index) =>
+            count > 1 ? PADDING + (index * (WIDTH - 2 * PADDING)) / (count - 1) : WIDTH / 2;
+        const charts = [];
+        for (const chart of CHARTS) {
+            const series = chart.fields.map((field) => seriesByField[field]).filter(Boolean);
+            if (!series.length) {
+                continue;
+            }
+            const measured = series.flatMap((item) => item.values.filter((value) => value !== null));
+            const min = Math.min(...measured);
+            const max = Math.max(...measured);
+            const span = max - min || 1;
+            const y = (value) => HEIGHT - PADDING - ((value - min) * (HEIGHT - 2 * PADDING)) / span;
+            const lines = series.map((item, position) => {
+                const last = lastIndex(item.values);
+                return {
+                    field: item.field,
+                    color: COLORS[position % COLORS.length],
+                    points: item.values
+                        .map((value, index) => (value === null ? null : `${x(index)},${y(value)}`))
+                        .filter(Boolean)
+                        .join(" "),
+                    lastX: x(last),
+                    lastY: y(item.values[last]),
+                    lastValue: item.values[last],
+                };
+            });
+            const lastDate = vitals.dates[Math.max(...series.map((item) => lastIndex(item.values)))];
+            charts.push({
+                key: chart.key,
+                label: chart.label,
+                unit: series[0].unit,
+                lines,
+                lastValue: lines.map((line) => line.lastValue).join("/"),
+                lastDate,
+                title: `${vitals.dates[0]} - ${lastDate}`,
+            });
+        }
+        return charts;
+    }
+}
+
+export const vitalsChart = {
+    component: VitalsChart,
+    extractProps: ({ options }) => ({
+        limit: options.limit,
+    }),
+};
+
+registry.category("view_widgets").add("hospital_vitals_chart", vitalsChart);
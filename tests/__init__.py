@@ -0,0 +1,7 @@
+from . import test_billing
+from . import test_doctor_assignment
+from . import test_attachment
+from . import test_follow_up
+from . import test_lab_results
+from . import test_medicine
+from . import test_report_cache
@@ -0,0 +1,55 @@
+import io
+
+from odoo.tests.common import TransactionCase
+
+
+class TestStreamedAttachment(TransactionCase):
+    """Attachments created from file objects"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Attachment = cls.env['ir.attachment']
+        cls.patient = cls.env['hospital.patient'].create({'name': 'Test Patient'})
+    
+    def test_raw_round_trip(self):
+        """Streamed content is stored in the filestore and read back"""
+        content = b'%PDF-1.4 streamed scan ' * 1000
+        attachment = self.Attachment._create_from_file(io.BytesIO(content), {
+            'name': 'scan.pdf',
+            'res_model': 'hospital.patient',
+            'res_id': self.patient.id,
+        })
+        
+        self.assertTrue(attachment.store_fname)
+        self.assertEqual(attachment.file_size, len(content))
+        self.assertEqual(attachment.checksum, self.Attachment._compute_checksum(content))
+        self.assertEqual(attachment.mimetype, 'application/pdf')
+        self.assertEqual(attachment.raw, content)
+        attachment.invalidate_recordset()
+        self.assertEqual(attachment.raw, content)
+    
+    def test_identical_content_shares_blob(self):
+        """Each upload gets its own attachment on a shared filestore file"""
+        content = b'identical lab report'
+        first = self.Attachment._create_from_file(io.BytesIO(content), {'name': 'a.txt'})
+        second = self.Attachment._create_from_file(io.BytesIO(content), {'name': 'b.txt'})
+        
+        self.assertNotEqual(first, second)
+        self.assertEqual(first.store_fname, second.store_fname)
+        first.unlink()
+        self.assertEqual(second.raw, content)
+    
+    def test_thumbnail_created_once(self):
+        """An image gets a single cached thumbnail"""
+        image = self.Attachment.create({
+            'name': 'xray.png',
+            'datas': 'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==',
+            'res_model': 'hospital.patient',
+            'res_id': self.patient.id,
+        })
+        thumbnail = image._get_thumbnail()
+        
+        self.assertTrue(thumbnail)
+        self.assertNotEqual(thumbnail, image)
+        self.assertEqual(image._get_thumbnail(), thumbnail)
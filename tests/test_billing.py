@@ -0,0 +1,95 @@
+import base64
+
+from odoo.tests.common import TransactionCase
+
+
+class TestBillingRecompute(TransactionCase):
+    """Batch recompute of invoice amounts"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.patient = cls.env['hospital.patient'].create({'name': 'Test Patient'})
+        cls.billing = cls.env['hospital.billing'].create({
+            'patient_id': cls.patient.id,
+            'line_ids': [(0, 0, {
+                'description': 'Consultation',
+                'quantity': 1,
+                'unit_price': 100.0,
+            })],
+        })
+        cls.env['hospital.billing.payment'].create({
+            'billing_id': cls.billing.id,
+            'amount': 50.0,
+        })
+    
+    def test_recompute_updates_balance_and_status(self):
+        """A line price fixed in SQL flows into balance and payment status"""
+        self.assertEqual(self.billing.balance_amount, 50.0)
+        self.assertEqual(self.billing.payment_status, 'partial')
+        
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE hospital_billing_line SET unit_price = 50.0 WHERE billing_id = %s",
+            [self.billing.id],
+        )
+        self.env['hospital.billing'].recompute_amounts([self.billing.id])
+        
+        self.assertEqual(self.billing.line_ids.subtotal, 50.0)
+        self.assertEqual(self.billing.total_amount, 50.0)
+        self.assertEqual(self.billing.balance_amount, 0.0)
+        self.assertEqual(self.billing.payment_status, 'paid')
+
+
+class TestPaymentBatch(TransactionCase):
+    """Reconciliation of payer files"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.patient = cls.env['hospital.patient'].create({'name': 'Batch Patient'})
+        cls.billing = cls._create_billing(0.3)
+        cls.other_billing = cls._create_billing(10.0)
+    
+    @classmethod
+    def _create_billing(cls, price):
+        billing = cls.env['hospital.billing'].create({
+            'patient_id': cls.patient.id,
+            'line_ids': [(0, 0, {
+                'description': 'Consultation',
+                'quantity': 1,
+                'unit_price': price,
+            })],
+        })
+        billing.action_confirm()
+        return billing
+    
+    def _process(self, rows):
+        content = 'reference,amount\n' + ''.join(f'{reference},"{amount}"\n' for reference, amount in rows)
+        batch = self.env['hospital.billing.payment.batch'].create({
+            'payer': 'Test Insurer',
+            'file': base64.b64encode(content.encode()),
+        })
+        batch.action_process()
+        return batch
+    
+    def test_rounding_residual_pays_invoice(self):
+        """Payments summing to the total up to float noise settle the invoice"""
+        self._process([(self.billing.reference, '0.1'), (self.billing.reference, '0.2')])
+        
+        self.assertEqual(self.billing.balance_amount, 0.0)
+        self.assertEqual(self.billing.payment_status, 'paid')
+        self.assertEqual(self.billing.state, 'paid')
+    
+    def test_invalid_amounts_rejected(self):
+        """Non-finite amounts are reported, decimal commas are understood"""
+        batch = self._process([
+            (self.other_billing.reference, 'nan'),
+            (self.other_billing.reference, 'inf'),
+            (self.other_billing.reference, '1,5'),
+        ])
+        
+        self.assertEqual(batch.state, 'done')
+        self.assertEqual(batch.unmatched_ids.mapped('reason'), ['invalid_amount', 'invalid_amount'])
+        self.assertEqual(batch.unallocated_amount, 0.0)
+        self.assertEqual(self.other_billing.paid_amount, 1.5)
@@ -0,0 +1,46 @@
+from odoo.tests.common import TransactionCase
+
+
+class TestDoctorAssignment(TransactionCase):
+    """Load-balanced assignment of new patients to doctors"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['hospital.doctor'].search([('specialty', '=', 'pediatrics')]).active = False
+        cls.first, cls.second = cls.env['hospital.doctor'].create([
+            {'name': 'First Pediatrician', 'specialty': 'pediatrics', 'max_patients': 2},
+            {'name': 'Second Pediatrician', 'specialty': 'pediatrics', 'max_patients': 3},
+        ])
+    
+    def setUp(self):
+        super().setUp()
+        # Queues live in the transaction data, which test rollbacks keep
+        self.env['hospital.doctor.assignment'].invalidate()
+    
+    def _create_children(self, count):
+        return self.env['hospital.patient'].create([
+            {'name': f'Child {index}', 'age': 5} for index in range(count)
+        ])
+    
+    def test_bulk_assignment_balances_capacity(self):
+        """Children go to the doctor with the most room, never above capacity"""
+        children = self._create_children(4)
+        self.assertEqual(len(children.filtered(lambda p: p.doctor_id == self.first)), 2)
+        self.assertEqual(len(children.filtered(lambda p: p.doctor_id == self.second)), 2)
+        
+        self.assertEqual(self._create_children(1).doctor_id, self.second)
+        self.assertFalse(self._create_children(1).doctor_id)
+    
+    def test_archived_patient_releases_capacity(self):
+        """Archiving a patient frees a place for the next one"""
+        children = self._create_children(5)
+        self.assertFalse(self._create_children(1).doctor_id)
+        
+        children.filtered(lambda p: p.doctor_id == self.first)[0].active = False
+        self.assertEqual(self._create_children(1).doctor_id, self.first)
+    
+    def test_adults_not_assigned(self):
+        """Patients without a required specialty keep no doctor"""
+        adult = self.env['hospital.patient'].create({'name': 'Adult', 'age': 40})
+        self.assertFalse(adult.doctor_id)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.hospital_management.models.appointment import HospitalAppointment
+
+
+class TestFollowUpScheduling(TransactionCase):
+    """Follow-up appointments booked by the scheduler"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.today = fields.Date.today()
+        cls.doctor = cls.env['hospital.doctor'].create({'name': 'Follow-up Doctor'})
+        cls.patient = cls.env['hospital.patient'].create({
+            'name': 'Follow-up Patient',
+            'email': 'patient@example.com',
+            'doctor_id': cls.doctor.id,
+        })
+    
+    def _create_prescription(self, follow_up_date):
+        return self.env['hospital.prescription'].create({
+            'patient_id': self.patient.id,
+            'doctor_id': self.doctor.id,
+            'diagnosis': 'Check-up',
+            'state': 'confirmed',
+            'follow_up_date': follow_up_date,
+        })
+    
+    def test_overdue_follow_up_booked_and_notified(self):
+        """A follow-up whose date passed gets the next free slot and an email"""
+        prescription = self._create_prescription(self.today - timedelta(days=2))
+        
+        self.env['hospital.prescription']._cron_schedule_follow_ups(auto_commit=False)
+        
+        appointment = prescription.follow_up_appointment_id
+        self.assertTrue(appointment)
+        self.assertGreater(appointment.appointment_date, self.today)
+        mail = self.env['mail.mail'].search([
+            ('model', '=', 'hospital.appointment'),
+            ('res_id', '=', appointment.id),
+        ])
+        self.assertEqual(mail.email_to, 'patient@example.com')
+    
+    def test_rejected_appointment_does_not_block_others(self):
+        """An appointment failing its constraints only skips its prescription"""
+        first = self._create_prescription(self.today + timedelta(days=1))
+        second = self._create_prescription(self.today + timedelta(days=1))
+        yesterday = self.today - timedelta(days=1)
+        tomorrow = self.today + timedelta(days=1)
+        
+        with patch.object(
+            HospitalAppointment, '_find_free_slots',
+            lambda self, requests, **kwargs: [(yesterday, 9.0), (tomorrow, 9.0)],
+        ):
+            booked = (first | second)._schedule_follow_ups()
+        
+        self.assertEqual(booked, second)
+        self.assertFalse(first.follow_up_appointment_id)
+        self.assertTrue(second.follow_up_appointment_id)
@@ -0,0 +1,227 @@
+import io
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+from odoo.tools import mute_logger
+
+from odoo.addons.hospital_management.models.lab_range import parse_range, parse_result, parse_value
+
+
+class TestLabResultFlags(TransactionCase):
+    """Range parsing and automatic flags of lab result lines"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.doctor = cls.env['hospital.doctor'].create({'name': 'Lab Doctor'})
+        cls.patient = cls.env['hospital.patient'].create({
+            'name': 'Lab Patient',
+            'doctor_id': cls.doctor.id,
+        })
+        cls.test_type = cls.env['hospital.lab.test.type'].create({
+            'name': 'Glucose Panel',
+            'code': 'GLU-T',
+            'category': 'biochemistry',
+        })
+        cls.parameter = cls.env['hospital.lab.test.parameter'].create({
+            'test_type_id': cls.test_type.id,
+            'name': 'Glucose',
+            'normal_range': '80-120',
+        })
+    
+    def _create_line(self, normal_range='80-120'):
+        test = self.env['hospital.lab.test'].create({
+            'patient_id': self.patient.id,
+            'doctor_id': self.doctor.id,
+            'test_type': self.test_type.id,
+        })
+        test.line_ids.normal_range = normal_range
+        return test.line_ids
+    
+    def test_number_parsing(self):
+        """A comma before three digits groups thousands, others are decimal"""
+        self.assertEqual(parse_value('1,200'), 1200.0)
+        self.assertEqual(parse_value('1,5'), 1.5)
+        self.assertEqual(parse_value('12.5 H'), 12.5)
+        self.assertEqual(parse_result('<0.1'), (0.1, '<'))
+        self.assertEqual(parse_range('1,000-1,500')[:2], (1000.0, 1500.0))
+    
+    def test_range_flags(self):
+        """Numeric results are flagged against the normal range"""
+        line = self._create_line()
+        line.result_value = '130'
+        self.assertTrue(line.is_abnormal)
+        line.result_value = '95'
+        self.assertFalse(line.is_abnormal)
+    
+    def test_manual_critical_kept_without_bounds(self):
+        """Without critical bounds, a technician's critical flag stays"""
+        line = self._create_line()
+        line.result_value = '95'
+        line.is_critical = True
+        line._evaluate_results()
+        self.assertTrue(line.is_critical)
+        self.assertTrue(line.is_abnormal)
+    
+    def test_zero_critical_bound(self):
+        """A critical low of 0 applies once enabled"""
+        self.parameter.write({'has_critical_low': True, 'critical_low': 0.0})
+        line = self._create_line()
+        line.result_value = '-1'
+        self.assertTrue(line.is_critical)
+        line.result_value = '0'
+        self.assertFalse(line.is_critical)
+    
+    def test_detection_limit(self):
+        """A result at a detection limit is compared as a bound"""
+        line = self._create_line('<0.1')
+        line.result_value = '<0.1'
+        self.assertFalse(line.is_abnormal)
+        line.normal_range = '0.5-1'
+        self.assertTrue(line.is_abnormal)
+    
+    def test_result_status_waits_for_results(self):
+        """A new test has no result status until results come in"""
+        line = self._create_line()
+        test = line.test_id
+        self.assertFalse(test.result_status)
+        
+        line.result_value = '130'
+        self.assertEqual(test.result_status, 'abnormal')
+    
+    def test_parameter_template_follows_parameters(self):
+        """New tests get the parameters added since the last one"""
+        self.assertEqual(self._create_line().parameter_name, 'Glucose')
+        self.env['hospital.lab.test.parameter'].create({
+            'test_type_id': self.test_type.id,
+            'name': 'HbA1c',
+            'sequence': 20,
+        })
+        self.assertEqual(self._create_line().test_id.line_ids.mapped('parameter_name'), ['Glucose', 'HbA1c'])
+    
+    def test_completion_time(self):
+        """Completing a test records when it happened"""
+        line = self._create_line()
+        test = line.test_id
+        test.state = 'in_progress'
+        line.result_value = '95'
+        test.action_complete()
+        
+        self.assertEqual(test.state, 'completed')
+        self.assertTrue(test.completed_at)
+        self.assertEqual(test.result_status, 'normal')
+
+
+class TestCriticalEscalation(TransactionCase):
+    """Notification of critical results to the ordering doctor"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Escalation = cls.env['hospital.lab.escalation']
+        cls.doctor = cls.env['hospital.doctor'].create({'name': 'Unreachable Doctor'})
+        cls.patient = cls.env['hospital.patient'].create({
+            'name': 'Critical Patient',
+            'doctor_id': cls.doctor.id,
+        })
+        cls.test_type = cls.env['hospital.lab.test.type'].create({
+            'name': 'Potassium',
+            'code': 'K-T',
+            'category': 'biochemistry',
+        })
+        cls.test = cls.env['hospital.lab.test'].create({
+            'patient_id': cls.patient.id,
+            'doctor_id': cls.doctor.id,
+            'test_type': cls.test_type.id,
+        })
+    
+    def _queue(self, doctor):
+        return self.Escalation.create({
+            'test_id': self.test.id,
+            'doctor_id': doctor.id,
+            'parameter_name': 'Potassium',
+            'result_value': '7.1',
+            'dedup_key': f'{self.patient.id}:{doctor.id}',
+        })
+    
+    def test_doctor_without_contact_is_undeliverable(self):
+        """A doctor without user or email is not reported as notified"""
+        escalation = self._queue(self.doctor)
+        self.Escalation._cron_process_queue(auto_commit=False)
+        self.assertEqual(escalation.state, 'undeliverable')
+        self.assertFalse(escalation.notified_at)
+        self.assertTrue(escalation.failure_reason)
+        self.assertTrue(self.test.critical_pending)
+    
+    def test_failure_does_not_block_batch(self):
+        """A failing notification leaves the rest of the batch notified"""
+        reachable = self.env['hospital.doctor'].create({
+            'name': 'Reachable Doctor',
+            'email': 'reachable@example.com',
+        })
+        failing = self.env['hospital.doctor'].create({
+            'name': 'Failing Doctor',
+            'email': 'failing@example.com',
+        })
+        notified = self._queue(reachable)
+        broken = self._queue(failing)
+        template = self.env.ref('hospital_management.email_template_lab_critical_result')
+        send_mail = type(template).send_mail
+        
+        def send_or_fail(template, res_id, *args, **kwargs):
+            if res_id == broken.id:
+                raise ValueError('SMTP down')
+            return send_mail(template, res_id, *args, **kwargs)
+        
+        with patch.object(type(template), 'send_mail', send_or_fail), \
+                mute_logger('odoo.addons.hospital_management.models.lab_escalation'):
+            self.Escalation._cron_process_queue(auto_commit=False)
+        self.assertEqual(notified.state, 'notified')
+        self.assertTrue(notified.notified_at)
+        self.assertEqual(broken.state, 'undeliverable')
+        self.assertEqual(broken.failure_reason, 'SMTP down')
+
+
+class TestLabResultImport(TransactionCase):
+    """Import of analyzer result files"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        doctor = cls.env['hospital.doctor'].create({'name': 'Import Doctor'})
+        patient = cls.env['hospital.patient'].create({
+            'name': 'Import Patient',
+            'doctor_id': doctor.id,
+        })
+        test_type = cls.env['hospital.lab.test.type'].create({
+            'name': 'Lipid Panel',
+            'code': 'LIP-T',
+            'category': 'biochemistry',
+        })
+        cls.env['hospital.lab.test.parameter'].create([
+            {'test_type_id': test_type.id, 'name': 'LDL', 'sequence': 1},
+            {'test_type_id': test_type.id, 'name': 'HDL', 'sequence': 2},
+        ])
+        cls.tests = cls.env['hospital.lab.test'].create([{
+            'patient_id': patient.id,
+            'doctor_id': doctor.id,
+            'test_type': test_type.id,
+            'state': 'requested',
+        } for _ in range(2)])
+    
+    def test_partial_results_not_counted_completed(self):
+        """Only tests that actually complete count as completed"""
+        full, partial = self.tests
+        content = (
+            'reference,parameter,value\n'
+            f'{full.reference},LDL,100\n'
+            f'{full.reference},HDL,50\n'
+            f'{partial.reference},LDL,130\n'
+        )
+        result_import = self.env['hospital.lab.result.import'].create({})
+        result_import._import(io.BytesIO(content.encode()))
+        
+        self.assertEqual(result_import.result_count, 3)
+        self.assertEqual(result_import.test_count, 1)
+        self.assertEqual(full.state, 'completed')
+        self.assertEqual(partial.state, 'in_progress')
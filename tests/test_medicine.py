@@ -0,0 +1,60 @@
+from odoo.tests.common import TransactionCase
+
+
+class TestMedicineMatching(TransactionCase):
+    """Linking free-text prescription medicines to the catalog"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Medicine = cls.env['hospital.medicine']
+        cls.prednisone = cls.Medicine.create({'name': 'Prednisone', 'strength': '5mg'})
+        cls.doctor = cls.env['hospital.doctor'].create({'name': 'Pharmacy Doctor'})
+        cls.patient = cls.env['hospital.patient'].create({
+            'name': 'Pharmacy Patient',
+            'doctor_id': cls.doctor.id,
+        })
+    
+    def _create_line(self, medicine_name):
+        prescription = self.env['hospital.prescription'].create({
+            'patient_id': self.patient.id,
+            'doctor_id': self.doctor.id,
+            'diagnosis': 'Inflammation',
+            'medicine_line_ids': [(0, 0, {
+                'medicine_name': medicine_name,
+                'medicine_type': 'tablet',
+                'dosage': '20mg',
+                'frequency': 'once_daily',
+            })],
+        })
+        return prescription.medicine_line_ids
+    
+    def test_exact_name_linked_on_create(self):
+        """A new line naming a catalog medicine is linked, keeping its dosage"""
+        line = self._create_line('PREDNISONE 20mg')
+        self.assertEqual(line.medicine_id, self.prednisone)
+        self.assertEqual(line.dosage, '20mg')
+        self.assertEqual(line.medicine_name, 'PREDNISONE 20mg')
+    
+    def test_similar_name_queued_for_review(self):
+        """A similar but different name is never linked automatically"""
+        line = self._create_line('Prednisolone')
+        self.assertFalse(line.medicine_id)
+        
+        self.Medicine._match_prescription_lines()
+        self.assertFalse(line.medicine_id)
+        match = self.env['hospital.medicine.match'].search([('name', '=', 'prednisolone')])
+        self.assertEqual(match.suggested_medicine_id, self.prednisone)
+        self.assertEqual(match.state, 'pending')
+        
+        match.action_create_medicine()
+        self.assertEqual(match.state, 'created')
+        self.assertEqual(line.medicine_id.name, 'Prednisolone')
+    
+    def test_autocomplete(self):
+        """Autocomplete follows catalog changes and treats wildcards literally"""
+        self.assertFalse(self.Medicine.name_search('zolpi'))
+        zolpidem = self.Medicine.create({'name': 'Zolpidem'})
+        self.assertEqual([row[0] for row in self.Medicine.name_search('zolpi')], zolpidem.ids)
+        self.assertFalse(self.Medicine.name_search('_olpidem'))
+        self.assertFalse(self.Medicine.name_search('z%m'))
@@ -0,0 +1,65 @@
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, new_test_user
+
+from odoo.addons.hospital_management.reports.report_renderer import HospitalReportRenderer
+
+
+class TestReportCache(TransactionCase):
+    """Cached PDFs of the batch report renderer"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Renderer = cls.env['hospital.report.renderer']
+        cls.report = cls.env.ref('hospital_management.action_report_patient_card')
+        cls.patient = cls.env['hospital.patient'].create({'name': 'Card Patient'})
+        cls.nurse = new_test_user(cls.env, login='card_nurse', groups='base.group_user')
+    
+    def _cache(self, renderer):
+        """Store a fake PDF of the patient card as the renderer's user"""
+        keys = renderer._get_cache_keys(self.report, self.patient)
+        renderer._store(self.report, keys, {self.patient.id: b'%PDF-1.4 card'})
+        return keys
+    
+    def test_cached_until_documents_change(self):
+        """A stored card is served until a printed document is added"""
+        keys = self._cache(self.Renderer)
+        self.assertIn(self.patient.id, self.Renderer._get_cached(self.report, keys))
+        
+        self.env['hospital.lab.test'].create({
+            'patient_id': self.patient.id,
+            'test_type': self.env['hospital.lab.test.type'].create({
+                'name': 'Card Test',
+                'code': 'CARD-T',
+                'category': 'biochemistry',
+            }).id,
+        })
+        self.assertNotEqual(self.Renderer._get_cache_keys(self.report, self.patient), keys)
+    
+    def test_scope(self):
+        """Cards are not shared across languages or access rights"""
+        keys = self._cache(self.Renderer)
+        as_nurse = self.Renderer.with_user(self.nurse)
+        self.assertFalse(as_nurse._get_cached(self.report, keys))
+        self.assertFalse(self.Renderer.with_context(lang='fr_FR')._get_cached(self.report, keys))
+        
+        self._cache(as_nurse)
+        self.assertIn(self.patient.id, self.Renderer._get_cached(self.report, keys))
+        self.assertIn(self.patient.id, as_nurse._get_cached(self.report, keys))
+    
+    def test_pending_writes_rendered_inline(self):
+        """Uncommitted changes are rendered on the current cursor, never by pool threads"""
+        patients = self.patient | self.env['hospital.patient'].create([
+            {'name': f'Card Patient {index}'} for index in range(3)
+        ])
+        
+        def render_chunk(renderer, report, res_ids):
+            names = renderer.env['hospital.patient'].browse(res_ids).mapped('name')
+            return {res_id: f'%PDF-1.4 {name}'.encode() for res_id, name in zip(res_ids, names)}
+        
+        with patch.object(HospitalReportRenderer, '_render_chunk', render_chunk), \
+                patch.object(HospitalReportRenderer, '_render_chunk_in_thread', side_effect=AssertionError):
+            entries = self.Renderer.render(self.report, patients.ids, chunk_size=2)
+        self.assertEqual(set(entries), set(patients.ids))
+        self.assertTrue(self.Renderer._has_pending_writes())
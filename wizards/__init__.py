@@ -0,0 +1,3 @@
+from . import payment_wizard
+from . import data_export_wizard
+from . import lab_order_wizard
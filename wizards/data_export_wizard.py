@@ -0,0 +1,77 @@
+from urllib.parse import urlencode
+
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+
+class HospitalDataExportWizard(models.TransientModel):
+    """Wizard for month-end billing and clinical data exports"""
+    
+    _name = 'hospital.data.export.wizard'
+    _description = 'Hospital Data Export'
+    
+    dataset = fields.Selection(
+        selection='_selection_dataset',
+        string='Data',
+        required=True,
+        default='billing_lines'
+    )
+    
+    file_format = fields.Selection(
+        selection=[
+            ('csv', 'CSV'),
+            ('xlsx', 'Excel (XLSX)'),
+        ],
+        string='Format',
+        required=True,
+        default='csv'
+    )
+    
+    date_from = fields.Date(
+        string='From'
+    )
+    
+    date_to = fields.Date(
+        string='To'
+    )
+    
+    @api.model
+    def _selection_dataset(self):
+        """Datasets offered by the export service"""
+        return [
+            (dataset, definition['name'])
+            for dataset, definition in self.env['hospital.data.export']._get_datasets().items()
+        ]
+    
+    @api.constrains('date_from', 'date_to')
+    def _check_dates(self):
+        """Ensure the date range is valid"""
+        for wizard in self:
+            if wizard.date_from and wizard.date_to and wizard.date_from > wizard.date_to:
+                raise ValidationError('The start date must be before the end date!')
+    
+    def action_download(self):
+        """Stream the export directly to the browser"""
+        self.ensure_one()
+        params = {'file_format': self.file_format}
+        if self.date_from:
+            params['date_from'] = fields.Date.to_string(self.date_from)
+        if self.date_to:
+            params['date_to'] = fields.Date.to_string(self.date_to)
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/hospital_management/export/{self.dataset}?{urlencode(params)}',
+            'target': 'self',
+        }
+    
+    def action_export_attachment(self):
+        """Write the export to an attachment and download it"""
+        self.ensure_one()
+        attachment = self.env['hospital.data.export'].export_to_attachment(
+            self.dataset, self.file_format, self.date_from, self.date_to,
+        )
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content/{attachment.id}?download=true',
+            'target': 'self',
+        }
@@ -0,0 +1,77 @@
+from odoo import models, fields, api
+
+
+class HospitalLabOrderWizard(models.TransientModel):
+    """Wizard for ordering lab panels for many patients at once"""
+    
+    _name = 'hospital.lab.order.wizard'
+    _description = 'Bulk Lab Order'
+    
+    patient_ids = fields.Many2many(
+        comodel_name='hospital.patient',
+        string='Patients',
+        required=True
+    )
+    
+    test_type_ids = fields.Many2many(
+        comodel_name='hospital.lab.test.type',
+        string='Test Types',
+        required=True
+    )
+    
+    doctor_id = fields.Many2one(
+        comodel_name='hospital.doctor',
+        string='Ordering Doctor',
+        help="Leave empty to use each patient's doctor"
+    )
+    
+    priority = fields.Selection(
+        selection=[
+            ('routine', 'Routine'),
+            ('urgent', 'Urgent'),
+            ('stat', 'STAT'),
+        ],
+        string='Priority',
+        required=True,
+        default='routine'
+    )
+    
+    test_date = fields.Date(
+        string='Test Date',
+        required=True,
+        default=fields.Date.context_today
+    )
+    
+    request = fields.Boolean(
+        string='Send to Lab',
+        default=True,
+        help='Create the tests as requested instead of draft'
+    )
+    
+    @api.model
+    def default_get(self, fields_list):
+        """Preselect the patients the wizard was opened from"""
+        values = super().default_get(fields_list)
+        if self.env.context.get('active_model') == 'hospital.patient' and 'patient_ids' in fields_list:
+            values['patient_ids'] = [(6, 0, self.env.context.get('active_ids', []))]
+        return values
+    
+    def action_order(self):
+        """Create the tests and open them"""
+        self.ensure_one()
+        tests = self.env['hospital.lab.test'].create_orders(
+            self.patient_ids.ids,
+            self.test_type_ids.ids,
+            doctor_id=self.doctor_id.id,
+            priority=self.priority,
+            test_date=self.test_date,
+            request=self.request,
+        )
+        return {
+            'name': 'Ordered Lab Tests',
+            'type': 'ir.actions.act_window',
+            'res_model': 'hospital.lab.test',
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', tests.ids)],
+            'target': 'current',
+        }
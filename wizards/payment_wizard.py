@@ -0,0 +1,72 @@
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+from ..models.billing_payment import PAYMENT_METHODS
+
+
+class HospitalBillingPaymentWizard(models.TransientModel):
+    """Wizard for registering a payment on a single billing"""
+    
+    _name = 'hospital.billing.payment.wizard'
+    _description = 'Register Billing Payment'
+    
+    billing_id = fields.Many2one(
+        comodel_name='hospital.billing',
+        string='Billing',
+        required=True
+    )
+    
+    balance_amount = fields.Float(
+        related='billing_id.balance_amount',
+        string='Open Balance'
+    )
+    
+    amount = fields.Float(
+        string='Amount',
+        required=True
+    )
+    
+    payment_date = fields.Date(
+        string='Payment Date',
+        required=True,
+        default=fields.Date.today
+    )
+    
+    payment_method = fields.Selection(
+        selection=PAYMENT_METHODS,
+        string='Payment Method',
+        required=True,
+        default='cash'
+    )
+    
+    payer = fields.Char(
+        string='Payer'
+    )
+    
+    memo = fields.Char(
+        string='Memo'
+    )
+    
+    @api.constrains('amount')
+    def _check_amount(self):
+        """Ensure amount is positive and within the open balance"""
+        for wizard in self:
+            if wizard.amount <= 0:
+                raise ValidationError('Payment amount must be greater than zero!')
+            if wizard.amount > wizard.balance_amount:
+                raise ValidationError('Payment amount cannot exceed the open balance!')
+    
+    def action_register(self):
+        """Create the payment and update the billing"""
+        self.ensure_one()
+        payment = self.env['hospital.billing.payment'].create({
+            'billing_id': self.billing_id.id,
+            'amount': self.amount,
+            'payment_date': self.payment_date,
+            'payment_method': self.payment_method,
+            'payer': self.payer,
+            'memo': self.memo,
+        })
+        self.billing_id.payment_method = self.payment_method
+        self.billing_id.message_post(body=f'Payment of {payment.amount:.2f} registered.')
+        return {'type': 'ir.actions.act_window_close'}